@@ -1,12 +1,30 @@
-from flask import Flask, jsonify, render_template, request, redirect, url_for, flash, send_file
+from flask import Flask, Response, stream_with_context, jsonify, render_template, request, redirect, url_for, flash, send_file, g, abort
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 import os
+import json
+import time
+import logging
 import markdown
-from datetime import datetime
-from pdf_utils import CyberSecurityReport
-from langchain_agent import generate_report
-from file_processor import extract_text_from_file
+import base64
+from collections import Counter
+from datetime import datetime, timedelta
+from pdf_cache import PdfCache
+from bulk_export import BulkExport
+from findings import parse_findings, finding_counts
+from report_search import create_report_search
+from compressed_text import CompressedText, compress_text, decompress_text, is_compressed
+import metrics
+from metrics import timed
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from langchain_agent import generate_report, warm_up_llm, GenerationCancelled
+from llm_governor import LLMRateLimited
+from file_processor import iter_text_from_file
+from batch_ingest import BatchIngest, archive_kind
+from log_templates import is_log_file
+from job_queue import JobQueue, JobQueueFull
+from upload_store import UploadStore, UploadExpired
 from dotenv import load_dotenv
 
 # Flask app setup
@@ -22,22 +40,58 @@ if os.getenv('FLASK_ENV') == 'production':
     # PostgreSQL for production
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')  # Use the PostgreSQL URL from environment
 else:
-    # SQLite for development
-    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.join(basedir, "instance", "cybersecurity.db")}'
+    # SQLite for development; SQLITE_PATH points elsewhere, e.g. a throwaway database for load tests
+    sqlite_path = os.getenv('SQLITE_PATH', os.path.join(basedir, "instance", "cybersecurity.db"))
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.abspath(sqlite_path)}'
 
 app.config['UPLOAD_FOLDER'] = 'uploads'
+app.config['UPLOAD_TTL'] = int(os.getenv('UPLOAD_TTL', 6 * 3600))  # Seconds a staged upload is kept
+app.config['UPLOAD_PREVIEW_CHARS'] = int(os.getenv('UPLOAD_PREVIEW_CHARS', 8 * 1024))  # Shown on the upload page
+app.config['PDF_CACHE_FOLDER'] = os.getenv('PDF_CACHE_FOLDER', os.path.join(basedir, 'instance', 'pdf_cache'))
+app.config['EXPORT_MAX_REPORTS'] = int(os.getenv('EXPORT_MAX_REPORTS', 1000))  # Reports per bulk export
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False  # Disable modification tracking
+
+# Background report generation settings
+app.config['JOB_WORKERS'] = int(os.getenv('JOB_WORKERS', 2))  # Worker threads per process
+app.config['JOB_QUEUE_DEPTH'] = int(os.getenv('JOB_QUEUE_DEPTH', 50))  # Max jobs waiting per process
+app.config['JOB_MAX_RETRIES'] = int(os.getenv('JOB_MAX_RETRIES', 2))  # Retries after a failed attempt
+app.config['JOB_RETRY_DELAY'] = float(os.getenv('JOB_RETRY_DELAY', 2.0))  # Base backoff in seconds
+app.config['STREAM_CANCEL_GRACE'] = float(os.getenv('STREAM_CANCEL_GRACE', 30))  # Seconds without viewers before a streamed job stops
+app.config['JOB_LEASE_SECONDS'] = int(os.getenv('JOB_LEASE_SECONDS', 120))  # Unclaimed for this long, a job is recovered
+app.config['DASHBOARD_PAGE_SIZE'] = int(os.getenv('DASHBOARD_PAGE_SIZE', 24))  # Reports per dashboard page
+app.config['METRICS_ENABLED'] = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'  # Serve /metrics
+app.config['LLM_WARMUP'] = os.getenv('LLM_WARMUP', 'false').lower() == 'true'  # Build the Gemini client at startup
+
+# Batch uploads: several files, or zip/tar archives, merged into one report
+app.config['BATCH_WORKERS'] = int(os.getenv('BATCH_WORKERS', 4))  # Files extracted in parallel per upload
+app.config['BATCH_MAX_FILES'] = int(os.getenv('BATCH_MAX_FILES', 200))  # Files per batch
+app.config['BATCH_MAX_FILE_BYTES'] = int(os.getenv('BATCH_MAX_FILE_BYTES', 20 * 1024 * 1024))  # Per file, uncompressed
+app.config['BATCH_MAX_TOTAL_BYTES'] = int(os.getenv('BATCH_MAX_TOTAL_BYTES', 200 * 1024 * 1024))  # Per batch, uncompressed
+app.config['BATCH_FILE_TIMEOUT'] = float(os.getenv('BATCH_FILE_TIMEOUT', 60))  # Seconds to extract one file
 db = SQLAlchemy(app)
+logger = logging.getLogger(__name__)
 
 # Ensure the upload and instance folders exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(os.path.join(basedir, 'instance'), exist_ok=True)  # Create the instance folder for SQLite DB
 
+# Extracted upload text is staged on disk and referenced by token
+upload_store = UploadStore(app.config['UPLOAD_FOLDER'], ttl=app.config['UPLOAD_TTL'])
+
+# Rendered report PDFs, keyed on report id and content hash
+pdf_cache = PdfCache(app.config['PDF_CACHE_FOLDER'])
+
 # Login manager setup
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
+# Reports are rendered to HTML once and re-rendered lazily when this changes
+REPORT_HTML_VERSION = f"1:markdown-{markdown.__version__}"
+
+def render_report_html(content: str) -> str:
+    return markdown.markdown(content, extensions=['tables'])
+
 # Database models
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -46,11 +100,86 @@ class User(UserMixin, db.Model):
     password = db.Column(db.String(120), nullable=False)
 
 class Report(db.Model):
+    __table_args__ = (
+        db.Index('ix_report_user_created', 'user_id', 'created_at', 'id'),  # Dashboard keyset pagination
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(120), nullable=False)
-    content = db.Column(db.Text, nullable=False)
+    content = db.Column(CompressedText, nullable=False)  # Compressed at rest, read and written as str
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    rendered = db.relationship('ReportHtml', uselist=False, cascade='all, delete-orphan')
+    findings = db.relationship('Finding', cascade='all, delete-orphan', lazy='dynamic')
+
+    def render_html(self):
+        """Render the content to HTML and store it with the current renderer version."""
+        if self.rendered is None:
+            self.rendered = ReportHtml()
+        self.rendered.html = render_report_html(self.content)
+        self.rendered.renderer_version = REPORT_HTML_VERSION
+
+    def html(self) -> str:
+        """
+        Return the stored HTML, re-rendering it first if it is missing or was
+        produced by a different renderer version. Concurrent first views may
+        both try to store it; the one that loses serves its own rendering.
+        """
+        if self.rendered is None or self.rendered.renderer_version != REPORT_HTML_VERSION:
+            self.render_html()
+            html = self.rendered.html
+            try:
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()  # Another request stored the row first
+                return html
+        return self.rendered.html
+
+    def pdf_args(self) -> dict:
+        """Arguments identifying this report's rendered PDF in the PDF cache."""
+        return {
+            "report_id": self.id,
+            "title": self.title,
+            "content": self.content,
+            "created_at": self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+
+class ReportHtml(db.Model):
+    report_id = db.Column(db.Integer, db.ForeignKey('report.id'), primary_key=True)
+    html = db.Column(db.Text, nullable=False)
+    renderer_version = db.Column(db.String(40), nullable=False)
+
+class Finding(db.Model):
+    __table_args__ = (
+        db.Index('ix_finding_user_severity', 'user_id', 'severity'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    report_id = db.Column(db.Integer, db.ForeignKey('report.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    severity = db.Column(db.String(20), nullable=False)  # critical, high, medium, low, info
+    vulnerability = db.Column(db.String(255), nullable=False)
+    asset = db.Column(db.String(255))
+    cve = db.Column(db.String(32), index=True)
+
+class FindingStat(db.Model):
+    """Per-user dashboard counter, maintained as findings are added and removed."""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    kind = db.Column(db.String(20), primary_key=True)  # reports, severity, category, month
+    key = db.Column(db.String(40), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class Job(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    title = db.Column(db.String(120), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON-encoded input for generate_report
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text)
+    report_id = db.Column(db.Integer, db.ForeignKey('report.id'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 # Load user for Flask-Login
 @login_manager.user_loader
@@ -60,6 +189,320 @@ def load_user(user_id):
 # Initialize the database
 with app.app_context():
     db.create_all()  # Create all database tables
+    for index in Report.__table__.indexes:
+        index.create(db.engine, checkfirst=True)  # create_all skips indexes of existing tables
+
+def convert_report_content():
+    """
+    On PostgreSQL, convert a report.content column created before compressed
+    storage from TEXT to BYTEA, which CompressedText binds. Existing rows keep
+    their text as UTF-8 bytes and are read as before. The table is locked
+    first so that only one of several starting workers converts it.
+    """
+    if db.engine.dialect.name != 'postgresql':
+        return
+    with db.engine.begin() as connection:
+        column_type = connection.execute(db.text(
+            "SELECT data_type FROM information_schema.columns WHERE table_name = 'report' AND column_name = 'content'"
+        )).scalar()
+        if column_type != 'text':
+            return
+        connection.execute(db.text("LOCK TABLE report IN ACCESS EXCLUSIVE MODE"))
+        column_type = connection.execute(db.text(
+            "SELECT data_type FROM information_schema.columns WHERE table_name = 'report' AND column_name = 'content'"
+        )).scalar()
+        if column_type == 'text':
+            connection.execute(db.text("ALTER TABLE report ALTER COLUMN content TYPE BYTEA USING convert_to(content, 'UTF8')"))
+            logger.info("Converted report.content to BYTEA.")
+
+with app.app_context():
+    convert_report_content()
+
+# Full-text search: FTS5 on SQLite, a tsvector GIN index on PostgreSQL
+with app.app_context():
+    report_search = create_report_search(db.engine)
+
+@db.event.listens_for(Report, 'after_insert')
+def index_report(mapper, connection, report):
+    report_search.index(connection, report.id, report.user_id, report.title, report.content)
+
+@db.event.listens_for(Report, 'after_update')
+def reindex_report(mapper, connection, report):
+    state = db.inspect(report)
+    if state.attrs.title.history.has_changes() or state.attrs.content.history.has_changes():
+        report_search.index(connection, report.id, report.user_id, report.title, report.content)
+
+@db.event.listens_for(Report, 'after_delete')
+def unindex_report(mapper, connection, report):
+    report_search.remove(connection, report.id)
+
+def reindex_reports():
+    """Rebuild the full-text index from the stored reports."""
+    connection = db.session.connection()
+    count = 0
+    for report in Report.query.yield_per(100):
+        report_search.index(connection, report.id, report.user_id, report.title, report.content)
+        count += 1
+    db.session.commit()
+    logger.info(f"Indexed {count} reports for full-text search.")
+
+@app.cli.command('reindex-reports')
+def reindex_reports_command():
+    """Rebuild the full-text search index."""
+    reindex_reports()
+
+with app.app_context():
+    with db.engine.begin() as connection:
+        search_index_created = report_search.create_schema(connection)
+    if search_index_created:
+        reindex_reports()  # Index reports created before search existed
+
+@app.cli.command('compress-reports')
+def compress_reports():
+    """
+    Migrate stored report content to compressed storage. Rows are rewritten
+    in batches and already compressed rows are skipped, so the command can be
+    re-run safely.
+    """
+    table = Report.__table__
+    update = db.text("UPDATE report SET content = :content WHERE id = :id").bindparams(
+        db.bindparam('content', type_=db.LargeBinary)
+    )
+    last_id, migrated, saved = 0, 0, 0
+    while True:
+        rows = db.session.execute(
+            db.select(table.c.id, db.type_coerce(table.c.content, db.LargeBinary))
+            .where(table.c.id > last_id).order_by(table.c.id).limit(200)
+        ).all()
+        if not rows:
+            break
+        for report_id, raw in rows:
+            last_id = report_id
+            if is_compressed(raw):
+                continue
+            content = decompress_text(raw)
+            stored = compress_text(content)
+            if is_compressed(stored):
+                db.session.execute(update, {"id": report_id, "content": stored})
+                migrated += 1
+                saved += len(content.encode('utf-8')) - len(stored)
+        db.session.commit()
+    logger.info(f"Compressed {migrated} reports, saving about {saved // 1024} KB.")
+
+# Findings and dashboard counters
+def update_finding_stats(user_id: int, counts, sign: int = 1):
+    """
+    Add (or with sign=-1, subtract) counts keyed on (kind, key) to a user's
+    counters with an atomic upsert, so concurrent jobs cannot lose updates.
+    """
+    dialect = postgresql if db.engine.dialect.name == 'postgresql' else sqlite
+    for (kind, key), count in counts.items():
+        statement = dialect.insert(FindingStat).values(user_id=user_id, kind=kind, key=key, count=sign * count)
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=['user_id', 'kind', 'key'],
+            set_={'count': FindingStat.count + statement.excluded.count},
+        ))
+
+def report_counts(report: Report, findings) -> Counter:
+    counts = finding_counts(findings, report.created_at.strftime('%Y-%m'))
+    counts[("reports", "total")] += 1
+    return counts
+
+def record_findings(report: Report):
+    """Parse a new report's findings table into Finding rows and count them. The caller commits."""
+    findings = parse_findings(report.content)
+    for finding in findings:
+        report.findings.append(Finding(user_id=report.user_id, **finding))
+    update_finding_stats(report.user_id, report_counts(report, findings))
+
+def forget_findings(report: Report):
+    """Subtract a report's findings from its owner's counters before it is deleted. The caller commits."""
+    findings = [
+        {"vulnerability": f.vulnerability, "severity": f.severity, "asset": f.asset, "cve": f.cve}
+        for f in report.findings
+    ]
+    update_finding_stats(report.user_id, report_counts(report, findings), sign=-1)
+
+@app.cli.command('render-reports')
+def render_reports():
+    """Render and store the HTML of reports stored without it or with an older renderer."""
+    count = 0
+    for report_id, in db.session.query(Report.id).order_by(Report.id).all():
+        report = db.session.get(Report, report_id)
+        if report.rendered is None or report.rendered.renderer_version != REPORT_HTML_VERSION:
+            report.render_html()
+            count += 1
+            if count % 100 == 0:
+                db.session.commit()
+                db.session.expunge_all()  # Keep memory flat over many reports
+    db.session.commit()
+    logger.info(f"Rendered HTML for {count} reports.")
+
+@app.cli.command('backfill-findings')
+def backfill_findings():
+    """Rebuild all findings and dashboard counters from the stored reports."""
+    Finding.query.delete()
+    FindingStat.query.delete()
+    for report in Report.query.yield_per(100):
+        record_findings(report)
+    db.session.commit()
+    logger.info(f"Rebuilt findings for {Report.query.count()} reports.")
+
+# Background report generation
+def run_report_job(job_id: int, attempt: int):
+    """
+    Run generate_report for a queued job and store the resulting Report.
+    Raising lets the job queue retry the job.
+    """
+    with app.app_context(), metrics.trace("report_job", job_id=job_id, attempt=attempt):
+        job = Job.query.get(job_id)
+        if job is None or job.status == 'done':
+            return
+        job.status = 'running'
+        job.attempts += 1  # Counted across processes, so a job that keeps killing its worker stops being recovered
+        db.session.commit()
+
+        payload = json.loads(job.payload)
+        compact_logs = False
+        if "upload_token" in payload:
+            with timed("upload_read"):
+                data = upload_store.read(payload["upload_token"], user_id=job.user_id)
+            compact_logs = is_log_file(upload_store.filename(payload["upload_token"], user_id=job.user_id))
+        else:
+            data = payload["data"]
+        stream = job_queue.get_stream(job_id)
+        on_token = None
+        if stream is not None:
+            if attempt > 1:
+                stream.reset()  # Discard the partial output of the failed attempt
+
+            def on_token(text):
+                if not stream.publish(text):
+                    raise GenerationCancelled("Client disconnected from the report stream")
+
+        report_content = generate_report(
+            data,
+            on_token=on_token,
+            use_cache=payload.get("use_cache", True),
+            compact_logs=compact_logs,
+        )
+
+        report = Report(title=job.title, content=report_content, user_id=job.user_id)
+        with timed("render_html"):
+            report.render_html()
+        db.session.add(report)
+        db.session.flush()
+        with timed("findings"):
+            record_findings(report)
+        job.report_id = report.id
+        job.status = 'done'
+        job.error = None
+        with timed("db_commit"):
+            db.session.commit()
+        metrics.REPORT_JOBS.inc(outcome="done")
+        metrics.record(report_id=report.id, report_chars=len(report_content))
+        job_queue.close_stream(job_id)
+        pdf_cache.prerender(**report.pdf_args())  # So the first download is served from the cache
+        logger.info(f"Job {job_id} finished as report {report.id}.")
+
+def fail_report_job(job_id: int, exc: Exception):
+    """
+    Mark a job as failed once the job queue has given up retrying it.
+    """
+    with app.app_context():
+        db.session.rollback()
+        job = Job.query.get(job_id)
+        if job is not None:
+            job.status = 'failed'
+            job.error = str(exc)
+            db.session.commit()
+    metrics.REPORT_JOBS.inc(outcome="cancelled" if isinstance(exc, GenerationCancelled) else "failed")
+    job_queue.close_stream(job_id)
+
+def touch_jobs(job_ids):
+    """Renew the lease of the jobs this process holds, so no other process recovers them."""
+    with app.app_context():
+        Job.query.filter(Job.id.in_(job_ids), Job.status.in_(('queued', 'running'))).update(
+            {Job.updated_at: datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+
+def recover_jobs():
+    """
+    Take over jobs left queued or running by a process that died, e.g. on a
+    deploy or a worker recycle: their lease has not been renewed for
+    JOB_LEASE_SECONDS. Each job is claimed with a conditional update so only
+    one process resubmits it; jobs that already used all their attempts fail.
+    """
+    with app.app_context():
+        cutoff = datetime.utcnow() - timedelta(seconds=app.config['JOB_LEASE_SECONDS'])
+        stale = Job.query.filter(Job.status.in_(('queued', 'running')), Job.updated_at < cutoff) \
+            .order_by(Job.id).limit(app.config['JOB_QUEUE_DEPTH']).all()
+        for job in stale:
+            claimed = Job.query.filter(Job.id == job.id, Job.updated_at == job.updated_at).update(
+                {Job.status: 'queued', Job.updated_at: datetime.utcnow()}, synchronize_session=False)
+            db.session.commit()
+            if not claimed:
+                continue  # Another process got there first
+            if job.attempts > app.config['JOB_MAX_RETRIES']:
+                logger.warning(f"Job {job.id} abandoned after {job.attempts} attempts, marking it failed.")
+                fail_report_job(job.id, RuntimeError("The worker running this report stopped; please try again."))
+                continue
+            logger.info(f"Recovering job {job.id} abandoned by another process.")
+            try:
+                job_queue.submit(job.id)
+            except JobQueueFull:
+                break  # The lease runs out again and the job is picked up later
+
+job_queue = JobQueue(
+    run_report_job,
+    on_failure=fail_report_job,
+    workers=app.config['JOB_WORKERS'],
+    max_depth=app.config['JOB_QUEUE_DEPTH'],
+    max_retries=app.config['JOB_MAX_RETRIES'],
+    retry_delay=app.config['JOB_RETRY_DELAY'],
+    no_retry=(GenerationCancelled, UploadExpired, LLMRateLimited),  # The governor has already waited and retried
+    heartbeat=touch_jobs,
+    recover=recover_jobs,
+    maintenance_interval=min(30, app.config['JOB_LEASE_SECONDS'] / 4),
+    stream_cancel_grace=app.config['STREAM_CANCEL_GRACE'],
+)
+
+@app.before_request
+def start_job_queue():
+    job_queue.start()  # Recovers abandoned jobs even in a process that has not been given any yet
+
+if app.config['LLM_WARMUP']:
+    warm_up_llm()
+
+# Request metrics: one histogram sample and one structured log line per request
+UNTRACED_ENDPOINTS = {'static', 'metrics_endpoint'}
+
+@app.before_request
+def start_request_trace():
+    if request.endpoint not in UNTRACED_ENDPOINTS:
+        g.trace_token = metrics.start_trace("http_request", method=request.method, endpoint=request.endpoint)
+        g.trace_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    if 'trace_token' in g:
+        endpoint = request.endpoint or 'unknown'
+        metrics.HTTP_SECONDS.observe(time.perf_counter() - g.trace_started, endpoint=endpoint, method=request.method)
+        metrics.HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+        metrics.record(status=response.status_code)
+    return response
+
+@app.teardown_request
+def finish_request_trace(exc):
+    token = g.pop('trace_token', None)
+    if token is not None:
+        metrics.finish_trace(token, **({"error": str(exc)} if exc else {}))
+
+@app.route('/metrics')
+def metrics_endpoint():
+    if not app.config['METRICS_ENABLED']:
+        abort(404)
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
 
 # Routes
 @app.route('/')
@@ -78,95 +521,178 @@ def ad_report():
     # Render the form page
     return render_template('ad_report.html')
 
+def build_form_data(form) -> dict:
+    """
+    Collect the advanced report form fields (from ad_report.html) into the dict
+    expected by generate_report.
+    """
+    # Extract common form data
+    report_type = form.get('reportType')
+    project_name = form.get('projectName')
+    client_name = form.get('clientName')
+    assessment_date = form.get('assessmentDate')
+    assessor_name = form.get('assessorName')
+    compilance_name = form.get('complianceType')
+
+    # Initialize findings, risk_analysis, and recommendations
+    findings = ""
+    risk_analysis = ""
+    recommendations = ""
+
+    # Extract additional fields based on report type
+    if report_type == "VAPT":
+        findings = form.get('highLevelFindings', '') + "\n" + form.get('detailedFindings', '')
+        risk_analysis = form.get('riskDescription', '') + "\n" + form.get('businessImpact', '')
+        recommendations = form.get('mitigationStrategies', '') + "\n" + form.get('additionalNotes', '')
+    elif report_type == "Pentesting":
+        findings = form.get('highLevelFindings', '') + "\n" + form.get('detailedFindings', '')
+        risk_analysis = form.get('toolsUsed', '') + "\n" + form.get('stepsTaken', '')
+        recommendations = form.get('mitigationStrategies', '') + "\n" + form.get('additionalNotes', '')
+    elif report_type == "Incident Response":
+        findings = form.get('incidentDescription', '')
+        risk_analysis = form.get('actionsTaken', '')
+        recommendations = form.get('futurePreventionStrategies', '') + "\n" + form.get('lessonsLearned', '')
+    elif report_type == "Compliance":
+        findings = form.get('complianceFindings', '')
+        recommendations = form.get('recommendations', '')
+    elif report_type == "Risk Assessment":
+        findings = form.get('risksIdentified', '') + "\n" + form.get('riskSeverity', '')
+        recommendations = form.get('riskMitigationPlan', '')
+
+    # Prepare data for the LangChain agent
+    return {
+        "reportType": report_type,
+        "projectName": project_name,
+        "clientName": client_name,
+        "assessmentDate": assessment_date,
+        "assessorName": assessor_name,
+        "findings": findings,
+        "riskAnalysis": risk_analysis,
+        "recommendations": recommendations,
+        "complianceType": compilance_name
+    }
+
 @app.route('/generate-report', methods=['POST'])
 @login_required
 def generate_report_route():
-    try:
-        # Check if the request contains extracted text (from uploaded file)
-        if 'extracted_text' in request.form and 'fileName' in request.form:
-            extracted_text = request.form['extracted_text']
-            file_name = request.form['fileName']
-
-            # Generate report using the extracted text
-            report_content = generate_report(extracted_text)
-
-            # Use the file name as the report title
-            report_title = f"Report for {file_name}"
-            report = Report(title=report_title, content=report_content, user_id=current_user.id)
-            db.session.add(report)
-            db.session.commit()
-
-            flash('Report generated successfully!', 'success')
-            return redirect(url_for('report', report_id=report.id))  # Redirect to the report page
-
-        # Check if the request contains form data (from ad_html)
-        elif 'reportType' in request.form and 'projectName' in request.form:
-            # Extract common form data
-            report_type = request.form.get('reportType')
-            project_name = request.form.get('projectName')
-            client_name = request.form.get('clientName')
-            assessment_date = request.form.get('assessmentDate')
-            assessor_name = request.form.get('assessorName')
-            compilance_name = request.form.get('complianceType')
-
-            # Initialize findings, risk_analysis, and recommendations
-            findings = ""
-            risk_analysis = ""
-            recommendations = ""
-
-            # Extract additional fields based on report type
-            if report_type == "VAPT":
-                findings = request.form.get('highLevelFindings', '') + "\n" + request.form.get('detailedFindings', '')
-                risk_analysis = request.form.get('riskDescription', '') + "\n" + request.form.get('businessImpact', '')
-                recommendations = request.form.get('mitigationStrategies', '') + "\n" + request.form.get('additionalNotes', '')
-            elif report_type == "Pentesting":
-                findings = request.form.get('highLevelFindings', '') + "\n" + request.form.get('detailedFindings', '')
-                risk_analysis = request.form.get('toolsUsed', '') + "\n" + request.form.get('stepsTaken', '')
-                recommendations = request.form.get('mitigationStrategies', '') + "\n" + request.form.get('additionalNotes', '')
-            elif report_type == "Incident Response":
-                findings = request.form.get('incidentDescription', '')
-                risk_analysis = request.form.get('actionsTaken', '')
-                recommendations = request.form.get('futurePreventionStrategies', '') + "\n" + request.form.get('lessonsLearned', '')
-            elif report_type == "Compliance":
-                findings = request.form.get('complianceFindings', '')
-                recommendations = request.form.get('recommendations', '')
-            elif report_type == "Risk Assessment":
-                findings = request.form.get('risksIdentified', '') + "\n" + request.form.get('riskSeverity', '')
-                recommendations = request.form.get('riskMitigationPlan', '')
-
-            # Prepare data for the LangChain agent
-            form_data = {
-                "reportType": report_type,
-                "projectName": project_name,
-                "clientName": client_name,
-                "assessmentDate": assessment_date,
-                "assessorName": assessor_name,
-                "findings": findings,
-                "riskAnalysis": risk_analysis,
-                "recommendations": recommendations,
-                "complianceType":compilance_name
-            }
-
-            # Generate report using the LangChain agent
-            report_content = generate_report(form_data)
+    # Check if the request references a staged upload (from index.html)
+    if 'upload_token' in request.form and 'fileName' in request.form:
+        try:
+            # Only validate here; the worker reads the text from the store
+            upload_store.preview(request.form['upload_token'], 0, user_id=current_user.id)
+        except UploadExpired:
+            flash('The uploaded file has expired. Please upload it again.', 'error')
+            return redirect(url_for('index'))
+        data = None
+        # Use the file name as the report title
+        title = f"Report for {request.form['fileName']}"
+
+    # Check if the request contains extracted text (API clients)
+    elif 'extracted_text' in request.form and 'fileName' in request.form:
+        data = request.form['extracted_text']
+        # Use the file name as the report title
+        title = f"Report for {request.form['fileName']}"
+
+    # Check if the request contains form data (from ad_html)
+    elif 'reportType' in request.form and 'projectName' in request.form:
+        data = build_form_data(request.form)
+        title = f"Advanced Report for {data['projectName']}"
+
+    else:
+        flash('Invalid request data. Please try again.', 'error')
+        return redirect(url_for('index'))
 
-            # Save the report to the database
-            report_title = f"Advanced Report for {project_name}"
-            report = Report(title=report_title, content=report_content, user_id=current_user.id)
-            db.session.add(report)
-            db.session.commit()
+    # Queue the report for the background workers instead of holding this worker
+    # no_cache=true forces a fresh report even if the same input was seen before
+    payload = {"use_cache": request.form.get('no_cache') != 'true'}
+    if data is None:
+        payload["upload_token"] = request.form['upload_token']
+    else:
+        payload["data"] = data
+    job = Job(user_id=current_user.id, title=title[:120], payload=json.dumps(payload))
+    db.session.add(job)
+    db.session.commit()
+    if request.form.get('stream') == 'true':
+        job_queue.open_stream(job.id)  # Tokens are published here for /jobs/<id>/stream
+    try:
+        job_queue.submit(job.id)
+    except JobQueueFull as e:
+        job_queue.close_stream(job.id)
+        job.status = 'failed'
+        job.error = str(e)
+        db.session.commit()
+        return jsonify({"job_id": job.id, "status": job.status, "error": job.error}), 503
 
-            flash('Advanced report generated successfully!', 'success')
-            return redirect(url_for('report', report_id=report.id))  # Redirect to the report page
+    return jsonify({
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": url_for('job_status', job_id=job.id),
+        "stream_url": url_for('job_stream', job_id=job.id),
+    }), 202
 
-        else:
-            flash('Invalid request data. Please try again.', 'error')
-            return redirect(url_for('index'))
+@app.route('/jobs/<int:job_id>')
+@login_required
+def job_status(job_id):
+    job = Job.query.filter_by(id=job_id, user_id=current_user.id).first_or_404()
+    wants_html = request.accept_mimetypes.best_match(['application/json', 'text/html']) == 'text/html'
 
-    except Exception as e:
-        flash(f'An error occurred: {str(e)}', 'error')
+    if job.status == 'done' and wants_html:
+        if job.report_id is None:
+            flash('The report of this job has been deleted.', 'error')
+            return redirect(url_for('dashboard'))
+        flash('Report generated successfully!', 'success')
+        return redirect(url_for('report', report_id=job.report_id))
+    elif job.status == 'failed' and wants_html:
+        flash(f'An error occurred: {job.error}', 'error')
         return redirect(url_for('error'))
-
+    elif wants_html:
+        # Still running: show the live report page, which follows /jobs/<id>/stream
+        return render_template('report_stream.html', job=job)
+
+    return jsonify({
+        "job_id": job.id,
+        "status": job.status,
+        "attempts": job.attempts,
+        "error": job.error,
+        "report_url": url_for('report', report_id=job.report_id) if job.report_id else None,
+    })
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/jobs/<int:job_id>/stream')
+@login_required
+def job_stream(job_id):
+    job = Job.query.filter_by(id=job_id, user_id=current_user.id).first_or_404()
+
+    def events():
+        # Follow the generated tokens if the job runs in this process
+        stream = job_queue.get_stream(job.id)
+        if stream is not None:
+            for item in stream.subscribe():
+                if item is None:
+                    yield ": keepalive\n\n"  # Also surfaces a disconnected client
+                else:
+                    event, text = item
+                    yield sse_event(event, {"text": text})
+
+        # Then wait for the final outcome, which may be written by another process
+        while True:
+            db.session.rollback()  # End the previous read so the latest state is seen
+            finished = Job.query.get(job_id)
+            if finished.status == 'done':
+                yield sse_event('done', {"report_url": url_for('report', report_id=finished.report_id)})
+                return
+            if finished.status == 'failed':
+                yield sse_event('failed', {"error": finished.error})
+                return
+            yield ": keepalive\n\n"
+            time.sleep(2)
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',  # Disable proxy buffering so tokens arrive as they are generated
+    })
 
 @app.route('/index', methods=['GET', 'POST'])
 @login_required
@@ -176,20 +702,49 @@ def index():
             flash('No file uploaded', 'error')
             return redirect(url_for('index'))
 
-        file = request.files['file']
-        if file.filename == '':
+        files = [file for file in request.files.getlist('file') if file.filename]
+        if not files:
             flash('No file selected', 'error')
             return redirect(url_for('index'))
 
         try:
-            # Step 1: Extract text from the uploaded file
-            file_content = extract_text_from_file(file)
-            if not file_content:
+            # Step 1: Extract text from the uploaded file(s) straight into the staged upload store
+            if len(files) > 1 or archive_kind(files[0].filename):
+                with timed("extract_text"):
+                    batch = BatchIngest(
+                        workers=app.config['BATCH_WORKERS'],
+                        max_files=app.config['BATCH_MAX_FILES'],
+                        max_file_bytes=app.config['BATCH_MAX_FILE_BYTES'],
+                        max_total_bytes=app.config['BATCH_MAX_TOTAL_BYTES'],
+                        file_timeout=app.config['BATCH_FILE_TIMEOUT'],
+                    ).extract(files)
+                    if not batch.extracted:
+                        flash('Failed to extract text from any of the uploaded files.', 'error')
+                        return redirect(url_for('index'))
+                    file_name = batch.label
+                    # A batch of log files is staged as a log, so it is considered for compaction
+                    staged_name = file_name + ".log" if all(is_log_file(m.name) for m in batch.extracted) else file_name
+                    upload_token, size = upload_store.save(batch.iter_text(), current_user.id, staged_name)
+            else:
+                file = files[0]
+                file_name = file.filename.rsplit('.', 1)[0]
+                with timed("extract_text"):
+                    upload_token, size = upload_store.save(iter_text_from_file(file), current_user.id, file.filename)
+            metrics.REPORT_INPUT_CHARS.observe(size, source="upload")
+            metrics.record(upload_chars=size)
+            if not size:
                 flash('Failed to extract text from the file.', 'error')
                 return redirect(url_for('index'))
 
-            # Step 2: Display extracted text in the preview
-            return render_template('index.html', extracted_text=file_content)
+            # Step 2: Display the beginning of the extracted text in the preview
+            preview = upload_store.preview(upload_token, app.config['UPLOAD_PREVIEW_CHARS'])
+            return render_template(
+                'index.html',
+                upload_token=upload_token,
+                extracted_preview=preview,
+                truncated=size > len(preview),
+                file_name=file_name,
+            )
         except Exception as e:
             flash(f'An error occurred: {str(e)}', 'error')
             return redirect(url_for('index'))
@@ -248,11 +803,113 @@ def logout():
     flash('You have been logged out.', 'success')
     return redirect(url_for('home'))
 
+def encode_report_cursor(report: Report) -> str:
+    raw = f"{report.created_at.isoformat()}|{report.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_report_cursor(cursor: str):
+    try:
+        created_at, report_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(report_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor.")
+
+def report_page(user_id: int, cursor: str = None, limit: int = None):
+    """
+    Return one page of a user's reports, newest first, without loading their content.
+
+    Pages are keyed on (created_at, id) rather than an offset, so each page is
+    a range scan of the (user_id, created_at, id) index however many reports
+    the user has.
+
+    Returns:
+        Tuple[List[Report], Optional[str]]: The reports and the cursor of the next page.
+    """
+    limit = limit or app.config['DASHBOARD_PAGE_SIZE']
+    query = (
+        Report.query
+        .options(db.load_only(Report.id, Report.title, Report.created_at))
+        .filter(Report.user_id == user_id)
+    )
+    if cursor:
+        query = query.filter(db.tuple_(Report.created_at, Report.id) < decode_report_cursor(cursor))
+    reports = query.order_by(Report.created_at.desc(), Report.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_report_cursor(reports[limit - 1]) if len(reports) > limit else None
+    return reports[:limit], next_cursor
+
 @app.route('/dashboard')
 @login_required
 def dashboard():
-    reports = Report.query.filter_by(user_id=current_user.id).all()
-    return render_template('dashboard.html', reports=reports)
+    reports, next_cursor = report_page(current_user.id)
+    return render_template('dashboard.html', reports=reports, next_cursor=next_cursor)
+
+@app.route('/api/reports')
+@login_required
+def list_reports():
+    limit = min(max(request.args.get('limit', app.config['DASHBOARD_PAGE_SIZE'], type=int), 1), 100)
+    try:
+        reports, next_cursor = report_page(current_user.id, request.args.get('cursor'), limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({
+        "reports": [
+            {
+                "id": report.id,
+                "title": report.title,
+                "created_at": report.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+                "report_url": url_for('report', report_id=report.id),
+                "download_url": url_for('download', report_id=report.id),
+            }
+            for report in reports
+        ],
+        "next_cursor": next_cursor,
+    })
+
+@app.route('/api/search')
+@login_required
+def search_reports():
+    query = request.args.get('q', '').strip()
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    results = report_search.search(db.session.connection(), current_user.id, query, limit) if query else []
+    return jsonify({
+        "query": query,
+        "results": [
+            {
+                "id": result["report_id"],
+                "title": result["title"],
+                "created_at": result["created_at"].strftime('%Y-%m-%d %H:%M:%S'),
+                "rank": result["rank"],
+                "snippet": result["snippet"],
+                "report_url": url_for('report', report_id=result["report_id"]),
+                "download_url": url_for('download', report_id=result["report_id"]),
+            }
+            for result in results
+        ],
+    })
+
+@app.route('/api/stats')
+@login_required
+def stats():
+    """Dashboard chart data, read from the per-user counters rather than the reports."""
+    counters = {}
+    for stat in FindingStat.query.filter_by(user_id=current_user.id):
+        counters.setdefault(stat.kind, {})[stat.key] = stat.count
+
+    # The last six calendar months, oldest first
+    now = datetime.utcnow()
+    months = [
+        f"{year:04d}-{month:02d}"
+        for year, month in ((now.year + (now.month - offset - 1) // 12, (now.month - offset - 1) % 12 + 1)
+                            for offset in range(5, -1, -1))
+    ]
+    severity = counters.get('severity', {})
+    return jsonify({
+        "reports": counters.get('reports', {}).get('total', 0),
+        "findings": sum(severity.values()),
+        "severity": {level: severity.get(level, 0) for level in ('critical', 'high', 'medium', 'low', 'info')},
+        "categories": counters.get('category', {}),
+        "monthly_findings": {month: counters.get('month', {}).get(month, 0) for month in months},
+    })
 
 @app.route('/error')
 def error():
@@ -262,8 +919,7 @@ def error():
 @login_required
 def report(report_id):
     report = Report.query.get_or_404(report_id)
-    report_html = markdown.markdown(report.content , extensions=['tables'])
-    return render_template('report.html', report=report, report_html=report_html)
+    return render_template('report.html', report=report, report_html=report.html())
 
 @app.route('/download/<int:report_id>')
 @login_required
@@ -271,21 +927,72 @@ def download(report_id):
     # Fetch the report from the database
     report = Report.query.get_or_404(report_id)
 
-    # Generate the PDF using the utility function
-    pdf_buffer = CyberSecurityReport().generate(
-        title=report.title,
-        content=report.content,
-        created_at=report.created_at.strftime('%Y-%m-%d %H:%M:%S')
-    )
+    # Serve the cached PDF, rendering it now if it is not cached or was just evicted
+    pdf_file = pdf_cache.open(**report.pdf_args())
 
-    # Prepare the buffer for download
+    # Prepare the file for download
     return send_file(
-        pdf_buffer,
+        pdf_file,
         as_attachment=True,
         download_name=f"{report.title}.pdf",
         mimetype='application/pdf'
     )
 
+def export_report_ids(user_id: int):
+    """
+    Ids of the user's reports selected by the export query: `ids` (comma-separated
+    or repeated), or a `from`/`to` date range, both ends inclusive.
+    """
+    query = db.session.query(Report.id).filter(Report.user_id == user_id)
+    ids = [part for value in request.args.getlist('ids') for part in value.split(',') if part.strip()]
+    if ids:
+        try:
+            query = query.filter(Report.id.in_([int(report_id) for report_id in ids]))
+        except ValueError:
+            raise ValueError("ids must be report ids separated by commas")
+    elif request.args.get('from') or request.args.get('to'):
+        try:
+            if request.args.get('from'):
+                query = query.filter(Report.created_at >= datetime.strptime(request.args['from'], '%Y-%m-%d'))
+            if request.args.get('to'):
+                end = datetime.strptime(request.args['to'], '%Y-%m-%d') + timedelta(days=1)
+                query = query.filter(Report.created_at < end)
+        except ValueError:
+            raise ValueError("from and to must be dates as YYYY-MM-DD")
+    else:
+        raise ValueError("Select reports with ids or a from/to date range")
+    return [report_id for report_id, in query.order_by(Report.created_at, Report.id)]
+
+@app.route('/export')
+@login_required
+def export_reports():
+    """Stream the selected reports as a zip of PDFs, rendering uncached PDFs in a process pool."""
+    try:
+        report_ids = export_report_ids(current_user.id)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not report_ids:
+        return jsonify({"error": "No reports match the selection"}), 404
+    if len(report_ids) > app.config['EXPORT_MAX_REPORTS']:
+        return jsonify({"error": f"{len(report_ids)} reports selected; "
+                                 f"export at most {app.config['EXPORT_MAX_REPORTS']} at a time"}), 400
+
+    def pdf_args():
+        # One report is loaded at a time, so their content is never all in memory
+        for report_id in report_ids:
+            report = db.session.get(Report, report_id)
+            if report is not None:
+                args = report.pdf_args()
+                db.session.expunge(report)
+                yield args
+
+    name = (f"reports-{request.args.get('from') or 'start'}-to-{request.args.get('to') or 'now'}"
+            if not request.args.get('ids') else f"reports-{len(report_ids)}")
+    return Response(stream_with_context(BulkExport(pdf_cache).stream(pdf_args())), mimetype='application/zip', headers={
+        'Content-Disposition': f'attachment; filename="{name}.zip"',
+        'X-Accel-Buffering': 'no',  # Send each entry as it is added rather than the whole archive at the end
+    })
+
 @app.route('/delete-report/<int:report_id>', methods=['POST'])
 @login_required
 def delete_report(report_id):
@@ -294,8 +1001,11 @@ def delete_report(report_id):
         if not report:
             flash('Report not found or unauthorized.', 'error')
             return redirect(url_for('dashboard'))
+        forget_findings(report)
+        Job.query.filter_by(report_id=report.id).update({Job.report_id: None})  # Keep the job history
         db.session.delete(report)
         db.session.commit()
+        pdf_cache.evict(report_id)
         flash('Report deleted successfully.', 'success')
     except Exception as e:
         db.session.rollback()
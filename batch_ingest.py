@@ -0,0 +1,261 @@
+import io
+import logging
+import posixpath
+import tarfile
+import threading
+import time
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from werkzeug.datastructures import FileStorage
+
+from file_processor import SUPPORTED_EXTENSIONS, iter_text_from_file
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ZIP_SUFFIXES = ('.zip',)
+TAR_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+IGNORED_NAMES = ('__MACOSX/', '.DS_Store', 'Thumbs.db')
+
+
+def archive_kind(filename: str) -> Optional[str]:
+    """Return "zip" or "tar" if `filename` names a supported archive, else None."""
+    name = filename.lower()
+    if name.endswith(ZIP_SUFFIXES):
+        return "zip"
+    if name.endswith(TAR_SUFFIXES):
+        return "tar"
+    return None
+
+
+def _file_stem(filename: str) -> str:
+    """The file name without directory and extension, e.g. "logs" for "in/logs.tar.gz"."""
+    name = posixpath.basename(filename.replace("\\", "/"))
+    for suffix in ZIP_SUFFIXES + TAR_SUFFIXES:
+        if name.lower().endswith(suffix):
+            return name[:-len(suffix)]
+    return name.rsplit('.', 1)[0] if '.' in name else name
+
+
+def _extension(name: str) -> str:
+    return name.rsplit('.', 1)[-1].lower() if '.' in name else ''
+
+
+def _mb(size: int) -> str:
+    return f"{size / (1024 * 1024):.3g} MB"
+
+
+class MemberResult:
+    """The outcome of one file of a batch: its text, or why it was left out."""
+
+    __slots__ = ("name", "text", "status")
+
+    def __init__(self, name: str, text: str = "", status: str = "ok"):
+        self.name = name
+        self.text = text
+        self.status = status
+
+
+class BatchResult:
+    """
+    The files of a batch upload in upload order, merged into one document for
+    a single report: a manifest of every file, then each file's text under
+    its own heading.
+    """
+
+    def __init__(self, label: str, members: List[MemberResult]):
+        self.label = label
+        self.members = members
+
+    @property
+    def extracted(self) -> List[MemberResult]:
+        return [member for member in self.members if member.status == "ok"]
+
+    def iter_text(self) -> Iterator[str]:
+        """Yield the consolidated document in chunks, for UploadStore.save."""
+        yield f"Batch upload: {self.label} ({len(self.members)} files, {len(self.extracted)} extracted)\n"
+        for member in self.members:
+            detail = f"{len(member.text):,} characters" if member.status == "ok" else member.status
+            yield f"- {member.name}: {detail}\n"
+        for member in self.extracted:
+            yield f"\n===== File: {member.name} =====\n"
+            yield member.text
+            if not member.text.endswith("\n"):
+                yield "\n"
+
+
+class BatchIngest:
+    """
+    Extract text from several uploaded files, or from the members of zip and
+    tar archives, in a thread pool. Archive members are read into memory one
+    at a time, never extracted to disk, and every file is subject to a size
+    and a time limit. Files that exceed a limit or fail are listed in the
+    result instead of failing the batch.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        max_files: int = 200,
+        max_file_bytes: int = 20 * 1024 * 1024,
+        max_total_bytes: int = 200 * 1024 * 1024,
+        file_timeout: float = 60.0,
+    ):
+        """
+        Args:
+            workers: Files extracted in parallel.
+            max_files: Files processed per batch; further files are skipped.
+            max_file_bytes: Largest (uncompressed) file accepted.
+            max_total_bytes: Uncompressed bytes read per batch; later files are skipped.
+            file_timeout: Seconds allowed to extract one file.
+        """
+        self.workers = max(1, workers)
+        self.max_files = max_files
+        self.max_file_bytes = max_file_bytes
+        self.max_total_bytes = max_total_bytes
+        self.file_timeout = file_timeout
+
+    def _read_limited(self, stream) -> Optional[bytes]:
+        data = stream.read(self.max_file_bytes + 1)
+        return None if len(data) > self.max_file_bytes else data
+
+    def _skip_reason(self, name: str, size: Optional[int]) -> Optional[str]:
+        if _extension(name) not in SUPPORTED_EXTENSIONS:
+            return "skipped (unsupported file type)"
+        if size is not None and size > self.max_file_bytes:
+            return f"skipped (larger than {_mb(self.max_file_bytes)})"
+        return None
+
+    def _iter_zip(self, file: FileStorage) -> Iterator[Tuple[str, Optional[bytes], Optional[str]]]:
+        with zipfile.ZipFile(file.stream) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or any(ignored in info.filename for ignored in IGNORED_NAMES):
+                    continue
+                reason = self._skip_reason(info.filename, info.file_size)
+                if reason:
+                    yield info.filename, None, reason
+                    continue
+                try:
+                    with archive.open(info) as member:
+                        data = self._read_limited(member)
+                except (RuntimeError, zipfile.BadZipFile, OSError) as e:  # Encrypted or corrupt member
+                    yield info.filename, None, f"failed ({e})"
+                    continue
+                yield info.filename, data, None if data is not None else \
+                    f"skipped (larger than {_mb(self.max_file_bytes)})"
+
+    def _iter_tar(self, file: FileStorage) -> Iterator[Tuple[str, Optional[bytes], Optional[str]]]:
+        # Stream mode reads the archive front to back, so each member is read before the next
+        with tarfile.open(fileobj=file.stream, mode="r|*") as archive:
+            for member in archive:
+                if not member.isfile() or any(ignored in member.name for ignored in IGNORED_NAMES):
+                    continue
+                reason = self._skip_reason(member.name, member.size)
+                if reason:
+                    yield member.name, None, reason
+                    continue
+                data = self._read_limited(archive.extractfile(member))
+                yield member.name, data, None if data is not None else \
+                    f"skipped (larger than {_mb(self.max_file_bytes)})"
+
+    def iter_members(self, files: Iterable[FileStorage]) -> Iterator[Tuple[str, Optional[bytes], Optional[str]]]:
+        """
+        Yield (name, content, skip reason) for every file of the upload, expanding
+        archives. Content is None when the file is skipped.
+        """
+        for file in files:
+            kind = archive_kind(file.filename)
+            try:
+                if kind == "zip":
+                    yield from self._iter_zip(file)
+                elif kind == "tar":
+                    yield from self._iter_tar(file)
+                else:
+                    reason = self._skip_reason(file.filename, None)
+                    if reason:
+                        yield file.filename, None, reason
+                    else:
+                        data = self._read_limited(file.stream)
+                        yield file.filename, data, None if data is not None else \
+                            f"skipped (larger than {_mb(self.max_file_bytes)})"
+            except (zipfile.BadZipFile, tarfile.TarError) as e:
+                yield file.filename, None, f"failed (unreadable archive: {e})"
+
+    def _extract(self, name: str, data: bytes, started: dict, index: int) -> str:
+        """Extract one file's text, giving up once it runs past the time limit."""
+        started[index] = time.monotonic()
+        deadline = started[index] + self.file_timeout
+        file = FileStorage(stream=io.BytesIO(data), filename=posixpath.basename(name))
+        parts = []
+        for chunk in iter_text_from_file(file):
+            parts.append(chunk)
+            if time.monotonic() > deadline:
+                raise TimeoutError
+        return "".join(parts)
+
+    def extract(self, files: List[FileStorage]) -> BatchResult:
+        """
+        Extract every file of a batch upload.
+
+        Args:
+            files: The uploaded files; zip and tar archives are expanded.
+
+        Returns:
+            BatchResult: One entry per file, in upload order.
+        """
+        label = _file_stem(files[0].filename)
+        if len(files) > 1:
+            label = f"{label} and {len(files) - 1} more"
+
+        members: List[MemberResult] = []
+        futures: List[Tuple[int, MemberResult, Future]] = []
+        started: dict = {}
+        total_bytes = 0
+        in_flight = threading.BoundedSemaphore(self.workers * 2)  # Bounds the raw bytes held in memory
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch-ingest")
+        try:
+            for name, data, reason in self.iter_members(files):
+                member = MemberResult(name)
+                members.append(member)
+                if reason is None and len(members) > self.max_files:
+                    reason = f"skipped (more than {self.max_files} files)"
+                if reason is None and total_bytes + len(data) > self.max_total_bytes:
+                    reason = f"skipped (batch larger than {_mb(self.max_total_bytes)})"
+                if reason is not None:
+                    member.status = reason
+                    continue
+                total_bytes += len(data)
+                in_flight.acquire()
+                future = executor.submit(self._extract, name, data, started, len(members) - 1)
+                future.add_done_callback(lambda _: in_flight.release())
+                futures.append((len(members) - 1, member, future))
+
+            for index, member, future in futures:
+                while True:
+                    done, _ = wait([future], timeout=0.1)
+                    if done:
+                        break
+                    if index in started and time.monotonic() - started[index] > self.file_timeout + 1:
+                        break  # Stuck inside a single chunk; leave the thread behind
+                if not future.done():
+                    member.status = f"skipped (extraction took longer than {self.file_timeout:g}s)"
+                    continue
+                try:
+                    member.text = future.result()
+                    if not member.text.strip():
+                        member.status = "skipped (no text found)"
+                except TimeoutError:
+                    member.status = f"skipped (extraction took longer than {self.file_timeout:g}s)"
+                except Exception as e:
+                    logger.error(f"Error extracting text from {member.name}: {e}")
+                    member.status = f"failed ({e})"
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        result = BatchResult(label, members)
+        logger.info(f"Batch upload {label}: extracted {len(result.extracted)} of {len(members)} files "
+                    f"({total_bytes:,} bytes).")
+        return result
@@ -0,0 +1,3 @@
+"""
+Offline benchmarks for the report pipeline. Run with `python -m benchmarks.run`.
+"""
@@ -0,0 +1,70 @@
+import hashlib
+import time
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from benchmarks.fixtures import fake_report
+
+
+class FakeGeminiChat(BaseChatModel):
+    """
+    An offline stand-in for ChatGoogleGenerativeAI. Each call sleeps for
+    `latency` seconds, plus the output length divided by `chars_per_second`
+    if set, and returns deterministic Markdown seeded from the prompt: a report
+    of about `output_chars` characters, a proportional share of it for one
+    report section, or a short bullet list for findings and analysis prompts.
+    """
+
+    latency: float = 0.0
+    chars_per_second: float = 0.0
+    output_chars: int = 6000
+    findings_chars: int = 600
+    sections: int = 6
+    chunk_chars: int = 200
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-gemini"
+
+    def _respond(self, messages: List[BaseMessage]) -> str:
+        prompt = "".join(str(message.content) for message in messages)
+        seed = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8], 16)
+        if "reviewing part" in prompt or "analysis brief" in prompt:
+            lines = fake_report(self.findings_chars, seed).splitlines()
+            return "\n".join(f"- {line.strip('#|- ')}" for line in lines if line.strip())[:self.findings_chars]
+        if "writing one section" in prompt:
+            body = fake_report(self.output_chars // self.sections, seed).split("\n\n", 1)[1]
+            return body.replace("## ", "### ")
+        return fake_report(self.output_chars, seed)
+
+    def _delay(self, text: str) -> float:
+        return self.latency + (len(text) / self.chars_per_second if self.chars_per_second else 0.0)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        text = self._respond(messages)
+        time.sleep(self._delay(text))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        text = self._respond(messages)
+        time.sleep(self.latency)
+        for start in range(0, len(text), self.chunk_chars):
+            if self.chars_per_second:
+                time.sleep(len(text[start:start + self.chunk_chars]) / self.chars_per_second)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text[start:start + self.chunk_chars]))
@@ -0,0 +1,171 @@
+import os
+import random
+from typing import Dict, Tuple
+
+SIZES = {
+    "small": {"text_bytes": 16 * 1024, "pdf_pages": 5, "docx_paragraphs": 100, "report_chars": 8 * 1024},
+    "medium": {"text_bytes": 256 * 1024, "pdf_pages": 50, "docx_paragraphs": 1500, "report_chars": 64 * 1024},
+    "large": {"text_bytes": 2 * 1024 * 1024, "pdf_pages": 200, "docx_paragraphs": 10000, "report_chars": 256 * 1024},
+}
+KINDS = ("log", "html", "pdf", "docx")
+EXTENSIONS = {"log": ".log", "html": ".html", "pdf": ".pdf", "docx": ".docx"}
+
+SERVICES = ("sshd", "nginx", "kernel", "sudo", "postfix", "httpd", "cron")
+MESSAGES = (
+    "Failed password for invalid user {user} from {ip} port {port} ssh2",
+    "Accepted publickey for {user} from {ip} port {port} ssh2",
+    "Connection closed by {ip} port {port} [preauth]",
+    "{ip} - - \"GET /{path} HTTP/1.1\" {status} {size}",
+    "UFW BLOCK IN=eth0 SRC={ip} DST=10.0.0.5 PROTO=TCP SPT={port} DPT={dport}",
+    "pam_unix(sudo:session): session opened for user root by {user}(uid={uid})",
+    "Possible exploitation attempt of {cve} against Apache/2.4.49 from {ip}",
+    "warning: hostname {host} does not resolve to address {ip}",
+)
+USERS = ("admin", "root", "oracle", "test", "deploy", "www-data", "backup")
+PATHS = ("index.html", "wp-login.php", "admin", "cgi-bin/.%2e/.%2e/etc/passwd", "api/v1/users", "login")
+CVES = ("CVE-2021-41773", "CVE-2021-44228", "CVE-2023-4966", "CVE-2024-3400")
+FINDINGS = (
+    ("SSH brute force", "High"),
+    ("Path traversal in Apache 2.4.49", "Critical"),
+    ("Outdated TLS configuration", "Medium"),
+    ("Exposed administrative interface", "High"),
+    ("Verbose server banners", "Low"),
+    ("Log4Shell exploitation attempt", "Critical"),
+)
+
+
+def log_lines(rng: random.Random):
+    """Yield an endless, deterministic stream of syslog-style lines."""
+    second = 0
+    while True:
+        second += rng.randint(0, 3)
+        message = rng.choice(MESSAGES).format(
+            user=rng.choice(USERS),
+            ip=f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+            port=rng.randint(1024, 65535),
+            dport=rng.choice((22, 80, 443, 3389, 445)),
+            path=rng.choice(PATHS),
+            status=rng.choice((200, 301, 403, 404, 500)),
+            size=rng.randint(100, 50000),
+            uid=rng.randint(1000, 1100),
+            cve=rng.choice(CVES),
+            host=f"host{rng.randint(1, 40)}.example.com",
+        )
+        hours, remainder = divmod(second, 3600)
+        yield f"Oct {1 + hours // 24:2d} {hours % 24:02d}:{remainder // 60:02d}:{remainder % 60:02d} " \
+              f"web01 {rng.choice(SERVICES)}[{rng.randint(100, 9999)}]: {message}"
+
+
+def log_text(size_bytes: int, seed: int = 0) -> str:
+    """Return deterministic log text of about `size_bytes` characters."""
+    lines, size = [], 0
+    for line in log_lines(random.Random(seed)):
+        if size >= size_bytes:
+            break
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines) + "\n"
+
+
+def fake_report(chars: int, seed: int = 0) -> str:
+    """
+    Return a deterministic Markdown report of about `chars` characters, shaped
+    like the generated reports: headings, paragraphs, lists and findings tables.
+    """
+    rng = random.Random(seed)
+    parts = ["# Cybersecurity Report\n\n"]
+    size = len(parts[0])
+    section = 0
+    while size < chars:
+        section += 1
+        block = [f"## {section}. Analysis of observed activity\n\n"]
+        block.append(
+            "The collected logs show repeated authentication failures and exploitation attempts "
+            f"against internet-facing services, including **{rng.choice(CVES)}**, from "
+            f"{rng.randint(3, 40)} distinct source addresses. " * rng.randint(1, 3) + "\n\n"
+        )
+        block.append("| Vulnerability | Severity | Impact | Evidence |\n|---|---|---|---|\n")
+        for name, severity in rng.sample(FINDINGS, 3):
+            block.append(f"| {name} | {severity} | Unauthorized access | web01 logs, {rng.choice(CVES)} |\n")
+        block.append("\n")
+        block.extend(f"- {rng.choice(('Patch', 'Restrict', 'Monitor', 'Rotate'))} "
+                     f"{rng.choice(('sshd', 'Apache', 'credentials', 'firewall rules'))}\n" for _ in range(4))
+        block.append("\n")
+        text = "".join(block)
+        parts.append(text)
+        size += len(text)
+    return "".join(parts)
+
+
+def write_log(path: str, size_bytes: int) -> None:
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write(log_text(size_bytes))
+
+
+def write_html(path: str, size_bytes: int) -> None:
+    lines = log_text(size_bytes // 2).splitlines()
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write("<html><head><style>td { padding: 2px; }</style>"
+                     "<script>var tracking = true;</script></head><body><h1>Incident export</h1><table>\n")
+        for line in lines:
+            timestamp, _, message = line.partition(" web01 ")
+            handle.write(f"<tr><td>{timestamp}</td><td><b>web01</b></td><td>{message}</td></tr>\n")
+        handle.write("</table></body></html>\n")
+
+
+def write_pdf(path: str, pages: int) -> None:
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen.canvas import Canvas
+
+    canvas = Canvas(path, pagesize=letter)
+    lines = log_lines(random.Random(1))
+    for _ in range(pages):
+        canvas.setFont("Helvetica", 7)
+        y = 760
+        while y > 40:
+            canvas.drawString(30, y, next(lines)[:150])
+            y -= 9
+        canvas.showPage()
+    canvas.save()
+
+
+def write_docx(path: str, paragraphs: int) -> None:
+    from docx import Document
+
+    document = Document()
+    document.add_heading("Penetration test notes", level=1)
+    lines = log_lines(random.Random(2))
+    for index in range(paragraphs):
+        if index % 50 == 0:
+            document.add_heading(f"Host group {index // 50 + 1}", level=2)
+        document.add_paragraph(next(lines))
+    document.save(path)
+
+
+def ensure_fixtures(directory: str, sizes=tuple(SIZES)) -> Dict[Tuple[str, str], str]:
+    """
+    Generate the fixture files for `sizes` in `directory`, reusing files from
+    earlier runs. Fixtures are deterministic, so runs are comparable.
+
+    Returns:
+        Dict[Tuple[str, str], str]: Fixture paths keyed on (kind, size).
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    for size in sizes:
+        settings = SIZES[size]
+        for kind in KINDS:
+            path = os.path.join(directory, f"{size}{EXTENSIONS[kind]}")
+            if not os.path.exists(path):
+                temp_path = path + ".tmp"
+                if kind == "log":
+                    write_log(temp_path, settings["text_bytes"])
+                elif kind == "html":
+                    write_html(temp_path, settings["text_bytes"])
+                elif kind == "pdf":
+                    write_pdf(temp_path, settings["pdf_pages"])
+                else:
+                    write_docx(temp_path, settings["docx_paragraphs"])
+                os.replace(temp_path, path)
+            paths[(kind, size)] = path
+    return paths
@@ -0,0 +1,361 @@
+"""
+End-to-end load test of a gunicorn deployment of `app:app`.
+
+Each virtual analyst registers, logs in and then repeatedly uploads a fixture
+file through /index, queues a report with /generate-report, polls the job
+until it finishes, views /report/<id> and downloads /download/<id>. The
+report lists throughput, latency percentiles and the error rate per route.
+
+By default the harness starts its own gunicorn server on a throwaway SQLite
+database with LLM_REPLAY=replay, so Gemini and search responses come from a
+recordings file and the run is fully offline:
+
+    # Once, with a real GOOGLE_API_KEY: record real responses
+    python -m benchmarks.loadtest --mode record --users 1 --iterations 1
+    # Then, offline, as often as needed
+    python -m benchmarks.loadtest --users 8 --iterations 5 --workers 2
+
+The server runs the worker class and threads of the procfile unless
+`--worker-class` or `--threads` say otherwise. Without a recordings file,
+replay mode writes a synthetic one into the run's temporary directory, built
+from the benchmark fake LLM (`--synthetic-latency` seconds per report). Use
+`--url` to drive a server that is already running instead.
+"""
+import argparse
+import itertools
+import json
+import os
+import re
+import shlex
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import requests
+
+from benchmarks.fixtures import KINDS, SIZES, ensure_fixtures, fake_report
+from benchmarks.run import FIXTURE_DIR
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RECORDINGS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recordings.jsonl')
+PROCFILE_PATH = os.path.join(REPO_DIR, 'procfile')
+UPLOAD_TOKEN_PATTERN = re.compile(r'name="uploadToken" value="([^"]*)"')
+REPORT_ID_PATTERN = re.compile(r'/report/(\d+)')
+ROUTES = ("POST /login", "POST /index", "POST /generate-report", "GET /jobs/<id>",
+          "GET /report/<id>", "GET /download/<id>", "report job")
+
+
+class RequestFailed(Exception):
+    pass
+
+
+class RouteStats:
+    """Thread-safe latency samples and error counts per route."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def add(self, route: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self.latencies.setdefault(route, []).append(seconds)
+            if not ok:
+                self.errors[route] = self.errors.get(route, 0) + 1
+
+    def summary(self, wall_seconds: float) -> List[dict]:
+        rows = []
+        for route in sorted(self.latencies, key=lambda name: ROUTES.index(name) if name in ROUTES else len(ROUTES)):
+            samples = sorted(self.latencies[route])
+            count, errors = len(samples), self.errors.get(route, 0)
+
+            def percentile(fraction: float) -> float:
+                return samples[min(count - 1, round(fraction * (count - 1)))]
+
+            rows.append({
+                "route": route,
+                "requests": count,
+                "errors": errors,
+                "error_rate": errors / count,
+                "per_second": count / wall_seconds if wall_seconds else 0.0,
+                "p50": statistics.median(samples),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "max": samples[-1],
+            })
+        return rows
+
+
+class Analyst:
+    """One virtual user with its own session and account."""
+
+    def __init__(self, base_url: str, stats: RouteStats, timeout: float, poll_interval: float, job_timeout: float):
+        self.base_url = base_url.rstrip("/")
+        self.stats = stats
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.job_timeout = job_timeout
+        self.session = requests.Session()
+
+    def request(self, route: str, method: str, path: str, expect: int = 200, **kwargs) -> requests.Response:
+        """Send one request, timing it under `route` and counting unexpected statuses as errors."""
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+        except requests.RequestException as e:
+            self.stats.add(route, time.perf_counter() - started, ok=False)
+            raise RequestFailed(f"{route}: {e}")
+        ok = response.status_code == expect
+        self.stats.add(route, time.perf_counter() - started, ok=ok)
+        if not ok:
+            raise RequestFailed(f"{route}: HTTP {response.status_code}")
+        return response
+
+    def log_in(self) -> None:
+        name = f"loadtest-{uuid.uuid4().hex[:12]}"
+        self.session.post(self.base_url + "/register", timeout=self.timeout,
+                          data={"username": name, "email": f"{name}@example.com", "password": name})
+        response = self.request("POST /login", "POST", "/login", data={"username": name, "password": name})
+        if "/login" in response.url:
+            raise RequestFailed("POST /login: not logged in")
+
+    def upload(self, path: str) -> str:
+        with open(path, "rb") as stream:
+            response = self.request("POST /index", "POST", "/index",
+                                    files={"file": (os.path.basename(path), stream)})
+        match = UPLOAD_TOKEN_PATTERN.search(response.text)
+        if not match or not match.group(1):
+            raise RequestFailed("POST /index: no upload token in the response")
+        return match.group(1)
+
+    def generate(self, upload_token: str, file_name: str) -> int:
+        """Queue a report and wait for it; returns the report id."""
+        started = time.perf_counter()
+        ok = False
+        try:
+            response = self.request("POST /generate-report", "POST", "/generate-report", expect=202, data={
+                "upload_token": upload_token,
+                "fileName": file_name,
+                "no_cache": "true",  # Every iteration exercises the full pipeline
+            })
+            job_id = response.json()["job_id"]
+            deadline = time.monotonic() + self.job_timeout
+            while time.monotonic() < deadline:
+                time.sleep(self.poll_interval)
+                job = self.request("GET /jobs/<id>", "GET", f"/jobs/{job_id}",
+                                   headers={"Accept": "application/json"}).json()
+                if job["status"] == "done":
+                    ok = True
+                    return int(REPORT_ID_PATTERN.search(job["report_url"]).group(1))
+                if job["status"] == "failed":
+                    raise RequestFailed(f"report job {job_id} failed: {job['error']}")
+            raise RequestFailed(f"report job {job_id} did not finish in {self.job_timeout}s")
+        finally:
+            self.stats.add("report job", time.perf_counter() - started, ok=ok)
+
+    def view(self, report_id: int) -> None:
+        self.request("GET /report/<id>", "GET", f"/report/{report_id}")
+        response = self.request("GET /download/<id>", "GET", f"/download/{report_id}")
+        if not response.content.startswith(b"%PDF"):
+            raise RequestFailed("GET /download/<id>: not a PDF")
+
+    def run(self, files: List[str], iterations: int, deadline: Optional[float], errors: List[str]) -> None:
+        try:
+            self.log_in()
+        except RequestFailed as e:
+            errors.append(str(e))
+            return
+        for iteration in itertools.count():
+            if (deadline is None and iteration >= iterations) or (deadline is not None and time.monotonic() >= deadline):
+                return
+            path = files[iteration % len(files)]
+            try:
+                report_id = self.generate(self.upload(path), os.path.basename(path))
+                self.view(report_id)
+            except (RequestFailed, KeyError, ValueError, AttributeError) as e:
+                errors.append(str(e))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def write_synthetic_recordings(path: str, latency: float, output_chars: int) -> None:
+    """
+    Write a recordings file without calling Gemini: one report-sized response
+    streamed evenly over `latency` seconds. Replay serves it for every prompt.
+    """
+    text = fake_report(output_chars)
+    pieces = [text[start:start + 200] for start in range(0, len(text), 200)]
+    chunks = [[round(latency * (index + 1) / len(pieces), 4), piece] for index, piece in enumerate(pieces)]
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write(json.dumps({"kind": "llm", "key": "synthetic", "prompt_chars": 4000, "chunks": chunks}) + "\n")
+
+
+def procfile_options(path: str = PROCFILE_PATH) -> Dict[str, str]:
+    """
+    Return the gunicorn worker options of the procfile's web process, so the
+    started server runs the way it is deployed. Options left out fall back to
+    gunicorn's defaults (sync workers, one thread).
+    """
+    options = {"worker-class": "sync", "threads": "1"}
+    try:
+        with open(path) as handle:
+            line = next((line for line in handle if line.startswith("web:")), "")
+    except OSError:
+        return options
+    words = shlex.split(line[len("web:"):])
+    for index, word in enumerate(words):
+        for name in options:
+            if word == f"--{name}" and index + 1 < len(words):
+                options[name] = words[index + 1]
+            elif word.startswith(f"--{name}="):
+                options[name] = word.split("=", 1)[1]
+    if "-k" in words[:-1]:
+        options["worker-class"] = words[words.index("-k") + 1]
+    return options
+
+
+def start_server(args, workdir: str) -> subprocess.Popen:
+    """Start gunicorn on a throwaway SQLite database and wait until it serves requests."""
+    env = dict(os.environ)
+    env.update({
+        "SECRET_KEY": env.get("SECRET_KEY", "loadtest"),
+        "FLASK_ENV": "development",
+        "SQLITE_PATH": os.path.join(workdir, "loadtest.db"),
+        "CACHE_PATH": os.path.join(workdir, "cache.db"),
+        "PDF_CACHE_FOLDER": os.path.join(workdir, "pdf_cache"),
+        "LLM_REPLAY": args.mode,
+        "LLM_REPLAY_PATH": os.path.abspath(args.recordings),
+        "LLM_REPLAY_SPEED": str(args.speed),
+        "JOB_WORKERS": str(args.job_workers),
+        "JOB_QUEUE_DEPTH": str(max(50, args.users * 2)),
+    })
+    command = [
+        sys.executable, "-m", "gunicorn", "app:app",
+        "--preload",  # Create the schema once, before forking
+        "--chdir", workdir, "--pythonpath", REPO_DIR,
+        "--bind", f"127.0.0.1:{args.port}",
+        "--workers", str(args.workers),
+        "--worker-class", args.worker_class, "--threads", str(args.threads),
+        "--timeout", "300", "--graceful-timeout", "5",
+        "--log-level", "warning",
+    ]
+    log = open(os.path.join(workdir, "gunicorn.log"), "wb")
+    server = subprocess.Popen(command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with status {server.returncode}; see {log.name}")
+        try:
+            requests.get(f"http://127.0.0.1:{args.port}/login", timeout=1)
+            return server
+        except requests.RequestException:
+            time.sleep(0.25)
+    server.terminate()
+    raise RuntimeError(f"gunicorn did not start within 60s; see {log.name}")
+
+
+def print_report(rows: List[dict], wall_seconds: float, users: int, errors: List[str]) -> None:
+    print(f"\n{users} analysts, {wall_seconds:.1f}s")
+    print(f"{'route':<24} {'requests':>9} {'errors':>7} {'err %':>6} {'req/s':>8} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for row in rows:
+        print(f"{row['route']:<24} {row['requests']:>9} {row['errors']:>7} {row['error_rate']:>6.1%} "
+              f"{row['per_second']:>8.2f} {row['p50'] * 1000:>9.0f} {row['p95'] * 1000:>9.0f} "
+              f"{row['p99'] * 1000:>9.0f} {row['max'] * 1000:>9.0f}")
+    if errors:
+        print(f"\n{len(errors)} failed iteration(s), first: {errors[0]}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the report workflow end to end.")
+    parser.add_argument("--url", help="Drive this running server instead of starting gunicorn")
+    parser.add_argument("--mode", choices=("replay", "record"), default="replay",
+                        help="replay recorded responses offline, or record real ones (needs GOOGLE_API_KEY)")
+    parser.add_argument("--recordings", default=RECORDINGS_PATH, help="Recorded responses (JSON Lines)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed relative to the recorded timing")
+    parser.add_argument("--synthetic-latency", type=float, default=5.0,
+                        help="Seconds per report in a synthetic recordings file")
+    parser.add_argument("--users", type=int, default=4, help="Concurrent analysts")
+    parser.add_argument("--iterations", type=int, default=3, help="Reports per analyst")
+    parser.add_argument("--duration", type=float, help="Run for this many seconds instead of --iterations")
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=["log", "pdf"], help="Fixture types to upload")
+    parser.add_argument("--size", choices=list(SIZES), default="small", help="Fixture size to upload")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes")
+    deployed = procfile_options()
+    parser.add_argument("--worker-class", default=deployed["worker-class"],
+                        help="gunicorn worker class (default: as in the procfile)")
+    parser.add_argument("--threads", type=int, default=int(deployed["threads"]),
+                        help="gunicorn threads per worker (default: as in the procfile)")
+    parser.add_argument("--job-workers", type=int, default=2, help="Report job threads per worker (JOB_WORKERS)")
+    parser.add_argument("--port", type=int, default=0, help="Port for the started server (default: a free port)")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="Seconds between job status polls")
+    parser.add_argument("--timeout", type=float, default=60, help="Seconds allowed per HTTP request")
+    parser.add_argument("--job-timeout", type=float, default=600, help="Seconds allowed per report job")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args(argv)
+
+    paths = ensure_fixtures(FIXTURE_DIR, [args.size])
+    files = [paths[(kind, args.size)] for kind in args.kinds]
+
+    server = None
+    workdir = tempfile.mkdtemp(prefix="cyberapp-loadtest-")
+    base_url = args.url
+    if base_url is None:
+        if args.mode == "replay" and not os.path.exists(args.recordings):
+            # Written to the workdir, so later runs never replay synthetic responses as recorded ones
+            print(f"No recordings at {args.recordings}; writing synthetic ones "
+                  f"({args.synthetic_latency}s per report).")
+            args.recordings = os.path.join(workdir, "recordings.jsonl")
+            write_synthetic_recordings(args.recordings, args.synthetic_latency, 6000)
+        if (args.worker_class, str(args.threads)) != (deployed["worker-class"], deployed["threads"]):
+            print(f"Note: testing {args.worker_class} x {args.threads} threads; the procfile deploys "
+                  f"{deployed['worker-class']} x {deployed['threads']} threads.")
+        args.port = args.port or free_port()
+        server = start_server(args, workdir)
+        base_url = f"http://127.0.0.1:{args.port}"
+        print(f"gunicorn app:app on {base_url} ({args.workers} {args.worker_class} workers x {args.threads} threads, "
+              f"LLM_REPLAY={args.mode}, logs in {workdir})")
+
+    stats, errors = RouteStats(), []
+    deadline = time.monotonic() + args.duration if args.duration else None
+    analysts = [Analyst(base_url, stats, args.timeout, args.poll_interval, args.job_timeout)
+                for _ in range(args.users)]
+    threads = [threading.Thread(target=analyst.run, args=(files, args.iterations, deadline, errors))
+               for analyst in analysts]
+    started = time.perf_counter()
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        wall_seconds = time.perf_counter() - started
+        if server is not None:
+            server.send_signal(signal.SIGTERM)
+            try:
+                server.wait(30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    rows = stats.summary(wall_seconds)
+    print_report(rows, wall_seconds, args.users, errors)
+    if args.json:
+        with open(args.json, "w") as handle:
+            json.dump({"users": args.users, "wall_seconds": wall_seconds, "mode": args.mode,
+                       "routes": rows, "errors": errors}, handle, indent=2)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
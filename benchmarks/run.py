@@ -0,0 +1,287 @@
+"""
+Offline benchmarks for the report pipeline stages.
+
+Every stage runs the application's own code: `extract_text_from_file`,
+`extract_keywords_and_numeric_values`, `generate_report` and
+`CyberSecurityReport.generate`. Gemini is replaced by a fake chat model with
+configurable latency and output size, and web search by the stub provider,
+so runs need no network access and are repeatable.
+
+Usage:
+    python -m benchmarks.run                       # all stages, all sizes
+    python -m benchmarks.run --sizes small medium --iterations 3
+    python -m benchmarks.run --save-baseline       # record benchmarks/baseline.json
+    python -m benchmarks.run --compare             # fail if p50 regressed
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from typing import List
+
+from benchmarks.fixtures import KINDS, SIZES, ensure_fixtures, fake_report, log_text
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(BENCHMARK_DIR, '.fixtures')
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, 'baseline.json')
+STAGES = ("extract_text", "keywords", "generate_report", "pdf_render")
+MB = 1024 * 1024
+
+
+def _peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Linux reports KB, macOS bytes
+
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _case_runner(case: dict):
+    """
+    Build the callable for one benchmark case in the worker process. Imports
+    happen here, after the benchmark environment is set, because the app's
+    modules read their configuration at import time.
+
+    Returns:
+        Tuple[Callable[[], None], int]: The operation and its input size in bytes.
+    """
+    stage, size = case["stage"], case["size"]
+
+    if stage == "extract_text":
+        from werkzeug.datastructures import FileStorage
+        from file_processor import extract_text_from_file
+
+        path = case["path"]
+
+        def run():
+            with open(path, "rb") as stream:
+                text = extract_text_from_file(FileStorage(stream=stream, filename=os.path.basename(path)))
+            if not text:
+                raise RuntimeError(f"No text extracted from {path}")
+
+        return run, os.path.getsize(path)
+
+    if stage == "keywords":
+        from file_processor import extract_keywords_and_numeric_values
+
+        text = log_text(SIZES[size]["text_bytes"])
+        return (lambda: extract_keywords_and_numeric_values(text)), len(text.encode("utf-8"))
+
+    if stage == "generate_report":
+        import langchain_agent
+        from benchmarks.fake_llm import FakeGeminiChat
+
+        langchain_agent.use_llm(FakeGeminiChat(latency=case["llm_latency"], output_chars=case["llm_output_chars"],
+                                               chars_per_second=case["llm_chars_per_second"]))
+        text = log_text(SIZES[size]["text_bytes"])
+        return (lambda: langchain_agent.generate_report(text, use_cache=False, compact_logs=True)), len(text.encode("utf-8"))
+
+    if stage == "pdf_render":
+        from pdf_utils import CyberSecurityReport
+
+        content = fake_report(SIZES[size]["report_chars"])
+
+        def run():
+            CyberSecurityReport().generate(title="Benchmark report", content=content, created_at="2024-01-01 00:00:00")
+
+        return run, len(content.encode("utf-8"))
+
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+def _run_case(case: dict, results) -> None:
+    """Worker process entry point: time one case and report through `results`."""
+    try:
+        logging.disable(logging.CRITICAL)
+        run, input_bytes = _case_runner(case)
+        rss_before = _peak_rss_bytes()
+        run()  # Warm-up: lazy imports, caches and process pools
+        timings = []
+        for _ in range(case["iterations"]):
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+        results.put({"timings": timings, "input_bytes": input_bytes,
+                     "rss_before": rss_before, "peak_rss": _peak_rss_bytes()})
+    except BaseException as e:
+        results.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def run_case(case: dict) -> dict:
+    """
+    Run one case in a fresh process, so its peak RSS belongs to that stage and
+    size alone.
+
+    Returns:
+        dict: The case's summary statistics, or an "error" entry.
+    """
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_run_case, args=(case, results))
+    process.start()
+    try:
+        outcome = results.get(timeout=case["timeout"])
+    except Exception:
+        outcome = {"error": f"Timed out after {case['timeout']}s"}
+    process.join(5)
+    if process.is_alive():
+        process.terminate()
+
+    summary = {"stage": case["stage"], "size": case["size"], "kind": case.get("kind")}
+    if "error" in outcome:
+        return {**summary, "error": outcome["error"]}
+    timings, input_bytes = outcome["timings"], outcome["input_bytes"]
+    total = sum(timings)
+    return {
+        **summary,
+        "iterations": len(timings),
+        "input_bytes": input_bytes,
+        "p50": statistics.median(timings),
+        "p95": _percentile(timings, 0.95),
+        "ops_per_sec": len(timings) / total if total else 0.0,
+        "mb_per_sec": input_bytes * len(timings) / MB / total if total else 0.0,
+        "rss_before_mb": outcome["rss_before"] / MB,
+        "peak_rss_mb": outcome["peak_rss"] / MB,
+    }
+
+
+def case_name(result: dict) -> str:
+    parts = [result["stage"], result.get("kind"), result["size"]]
+    return "/".join(part for part in parts if part)
+
+
+def build_cases(args) -> List[dict]:
+    paths = ensure_fixtures(FIXTURE_DIR, args.sizes) if "extract_text" in args.stages else {}
+    common = {
+        "iterations": args.iterations,
+        "timeout": args.timeout,
+        "llm_latency": args.llm_latency,
+        "llm_output_chars": args.llm_output_chars,
+        "llm_chars_per_second": args.llm_chars_per_second,
+    }
+    cases = []
+    for stage in args.stages:
+        for size in args.sizes:
+            if stage == "extract_text":
+                cases.extend({**common, "stage": stage, "size": size, "kind": kind, "path": paths[(kind, size)]}
+                             for kind in KINDS)
+            else:
+                cases.append({**common, "stage": stage, "size": size})
+    return cases
+
+
+def print_header() -> None:
+    print(f"{'case':<28} {'p50 ms':>10} {'p95 ms':>10} {'ops/s':>9} {'MB/s':>9} {'peak RSS MB':>12}")
+
+
+def print_result(result: dict) -> None:
+    if "error" in result:
+        print(f"{case_name(result):<28} ERROR {result['error']}")
+        return
+    print(f"{case_name(result):<28} {result['p50'] * 1000:>10.1f} {result['p95'] * 1000:>10.1f} "
+          f"{result['ops_per_sec']:>9.2f} {result['mb_per_sec']:>9.2f} {result['peak_rss_mb']:>12.1f}")
+
+
+def compare(results: List[dict], baseline: dict, threshold: float) -> List[str]:
+    """
+    Compare p50 latency and peak RSS against a saved baseline.
+
+    Returns:
+        List[str]: A description of each case that regressed by more than `threshold`.
+    """
+    previous = {case_name(result): result for result in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        before = previous.get(case_name(result))
+        if before is None or "error" in before:
+            continue
+        if "error" in result:
+            regressions.append(f"{case_name(result)}: failed ({result['error']})")
+            continue
+        for metric in ("p50", "peak_rss_mb"):
+            if before[metric] and result[metric] > before[metric] * (1 + threshold):
+                change = result[metric] / before[metric] - 1
+                regressions.append(f"{case_name(result)}: {metric} {before[metric]:.4g} -> {result[metric]:.4g} "
+                                   f"(+{change:.0%})")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the report pipeline offline.")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=list(SIZES))
+    parser.add_argument("--iterations", type=int, default=5, help="Timed runs per case, after one warm-up run")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds the fake LLM waits per call")
+    parser.add_argument("--llm-output-chars", type=int, default=6000, help="Size of the fake LLM's reports")
+    parser.add_argument("--llm-chars-per-second", type=float, default=0.0,
+                        help="Fake LLM output speed; adds output length / speed to each call (0 = off)")
+    parser.add_argument("--search-latency", type=float, default=0.0, help="Seconds the stub search waits per query")
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds allowed per case")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline file to save or compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Save these results as the baseline")
+    parser.add_argument("--compare", action="store_true", help="Exit with status 1 if a case regressed")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed regression before failing (0.2 = 20%%)")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args(argv)
+
+    # Worker processes inherit this environment and import the app's modules under it
+    cache_dir = tempfile.mkdtemp(prefix="cyberapp-bench-")
+    os.environ.update({
+        "SEARCH_PROVIDER": "stub",
+        "SEARCH_STUB_LATENCY": str(args.search_latency),
+        "CACHE_PATH": os.path.join(cache_dir, "cache.db"),
+        "GOOGLE_API_KEY": os.environ.get("GOOGLE_API_KEY", "offline-benchmark"),
+    })
+
+    results = []
+    print_header()
+    for case in build_cases(args):
+        result = run_case(case)
+        results.append(result)
+        print_result(result)
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {"iterations": args.iterations, "llm_latency": args.llm_latency,
+                     "llm_output_chars": args.llm_output_chars, "llm_chars_per_second": args.llm_chars_per_second,
+                     "search_latency": args.search_latency},
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w") as handle:
+            json.dump(report, handle, indent=2)
+
+    status = 1 if any("error" in result for result in results) else 0
+    if args.save_baseline:
+        with open(args.baseline, "w") as handle:
+            json.dump(report, handle, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"\nNo baseline at {args.baseline}; run with --save-baseline first.")
+            return 1
+        with open(args.baseline) as handle:
+            regressions = compare(results, json.load(handle), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            status = 1
+        else:
+            print(f"\nNo regressions above {args.threshold:.0%}.")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+import logging
+import multiprocessing
+import os
+import re
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional
+
+from metrics import CACHE_REQUESTS
+from pdf_cache import PdfCache
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EXPORT_WORKERS = int(os.getenv('EXPORT_WORKERS', max(1, min(4, (os.cpu_count() or 1)))))
+EXPORT_BLOCK_SIZE = 64 * 1024  # Bytes of a PDF copied into the archive at a time
+UNSAFE_NAME_PATTERN = re.compile(r'[\\/:*?"<>|\x00-\x1f]+')
+
+_render_pool: Optional[ProcessPoolExecutor] = None
+_render_pool_pid: Optional[int] = None
+_worker_caches: Dict[str, PdfCache] = {}
+
+
+def _get_render_pool() -> ProcessPoolExecutor:
+    """
+    Return the process pool that renders PDFs for bulk exports, created on
+    first use in each process. Workers are spawned rather than forked because
+    the web worker that owns the pool also runs threads.
+    """
+    global _render_pool, _render_pool_pid
+    if _render_pool is None or _render_pool_pid != os.getpid():
+        _render_pool = ProcessPoolExecutor(max_workers=EXPORT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        _render_pool_pid = os.getpid()
+    return _render_pool
+
+
+def _submit_render(directory: str, pdf_args: dict) -> Future:
+    """Queue a render, replacing the pool if a worker died (e.g. killed for memory) and broke it."""
+    global _render_pool
+    try:
+        return _get_render_pool().submit(_render_pdf, directory, pdf_args)
+    except BrokenProcessPool:
+        logger.warning("PDF render pool broken, starting a new one.")
+        _render_pool = None
+        return _get_render_pool().submit(_render_pdf, directory, pdf_args)
+
+
+def _render_pdf(directory: str, pdf_args: dict) -> str:
+    """Render a report PDF into the PDF cache and return its path. Runs in a pool worker."""
+    cache = _worker_caches.get(directory)
+    if cache is None:
+        cache = _worker_caches[directory] = PdfCache(directory)
+    return cache.render(**pdf_args)
+
+
+def entry_name(pdf_args: dict) -> str:
+    """The archive name of a report's PDF: date, title and id, which keeps names unique."""
+    title = UNSAFE_NAME_PATTERN.sub("_", pdf_args["title"]).strip(" .") or "report"
+    return f"{pdf_args['created_at'][:10]} {title} ({pdf_args['report_id']}).pdf"
+
+
+class _ZipSink:
+    """
+    A write-only, unseekable file for ZipFile that keeps what was written
+    until it is drained, so the archive can be sent while it is built.
+    """
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+class BulkExport:
+    """
+    Stream many report PDFs as one zip archive. Cached PDFs are added at once;
+    the others are rendered in a process pool into the PDF cache, and each is
+    added to the archive as soon as it is ready, so entries follow completion
+    order. At most `window` renders are outstanding, PDFs are copied into the
+    archive in blocks and written bytes are handed on immediately, so memory
+    stays bounded however many reports are exported.
+    """
+
+    def __init__(self, pdf_cache: PdfCache, window: Optional[int] = None):
+        """
+        Args:
+            pdf_cache: Cache the PDFs are read from and rendered into.
+            window: Renders submitted to the pool at a time (default twice EXPORT_WORKERS).
+        """
+        self.pdf_cache = pdf_cache
+        self.window = window or 2 * EXPORT_WORKERS
+
+    def _add(self, archive: zipfile.ZipFile, sink: _ZipSink, pdf_args: dict, source: BinaryIO) -> Iterator[bytes]:
+        info = zipfile.ZipInfo(
+            entry_name(pdf_args),
+            date_time=datetime.strptime(pdf_args["created_at"], '%Y-%m-%d %H:%M:%S').timetuple()[:6],
+        )
+        info.compress_type = zipfile.ZIP_STORED  # PDF streams are already compressed
+        info.file_size = os.fstat(source.fileno()).st_size  # Lets ZipFile pick ZIP64 for huge entries up front
+        with source, archive.open(info, 'w') as target:
+            while True:
+                block = source.read(EXPORT_BLOCK_SIZE)
+                if not block:
+                    break
+                target.write(block)
+                data = sink.drain()
+                if data:
+                    yield data
+        data = sink.drain()  # The entry's data descriptor
+        if data:
+            yield data
+
+    def stream(self, reports: Iterable[dict]) -> Iterator[bytes]:
+        """
+        Build the archive, yielding its bytes as they are produced.
+
+        Args:
+            reports: PDF arguments (Report.pdf_args()) of the reports to export,
+                loaded lazily if the caller wants memory bounded.
+
+        Yields:
+            bytes: Consecutive pieces of the zip archive.
+        """
+        sink = _ZipSink()
+        pending: Dict[Future, dict] = {}
+        failures: List[str] = []
+        exported = 0
+
+        def finished(done) -> Iterator[bytes]:
+            nonlocal exported
+            for future in done:
+                pdf_args = pending.pop(future)
+                try:
+                    source = open(future.result(), 'rb')
+                except Exception as e:
+                    logger.error(f"Bulk export failed to render report {pdf_args['report_id']}: {str(e)}")
+                    failures.append(f"{entry_name(pdf_args)}: {str(e)}")
+                    continue
+                yield from self._add(archive, sink, pdf_args, source)
+                exported += 1
+
+        try:
+            with zipfile.ZipFile(sink, 'w', allowZip64=True) as archive:
+                for pdf_args in reports:
+                    path = self.pdf_cache.get(**pdf_args)
+                    CACHE_REQUESTS.inc(cache="pdf", outcome="hits" if path else "misses")
+                    try:
+                        source = open(path, 'rb') if path is not None else None
+                    except FileNotFoundError:  # Evicted by another process since the lookup
+                        source = None
+                    if source is not None:
+                        yield from self._add(archive, sink, pdf_args, source)
+                        exported += 1
+                    else:
+                        pending[_submit_render(self.pdf_cache.directory, pdf_args)] = pdf_args
+                    # Add renders that have finished meanwhile; block only when the window is full
+                    done = [future for future in pending if future.done()]
+                    if len(pending) - len(done) >= self.window:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    yield from finished(done)
+
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    yield from finished(done)
+
+                if failures:
+                    archive.writestr("errors.txt", "Reports that could not be rendered:\n" + "\n".join(failures) + "\n")
+            yield sink.drain()  # The central directory
+            logger.info(f"Bulk export finished: {exported} reports, {len(failures)} failed.")
+        finally:
+            for future in pending:  # The client went away; drop renders that have not started
+                future.cancel()
@@ -0,0 +1,83 @@
+import logging
+import os
+import zlib
+from typing import Optional, Union
+
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Stored values start with a NUL byte and a format byte. Plain UTF-8 text,
+# including every row written before compression existed, never starts with NUL.
+ZLIB_MARKER = b"\x00Z"
+ZSTD_MARKER = b"\x00S"
+
+COMPRESSION = os.getenv('REPORT_COMPRESSION', 'zlib').lower()  # zlib, zstd or none
+COMPRESS_MIN_BYTES = int(os.getenv('REPORT_COMPRESS_MIN_BYTES', 1024))  # Smaller bodies are stored as plain text
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 10
+
+if COMPRESSION == 'zstd' and zstandard is None:
+    logger.warning("REPORT_COMPRESSION=zstd but zstandard is not installed; using zlib.")
+    COMPRESSION = 'zlib'
+
+
+def is_compressed(raw: Union[bytes, str, None]) -> bool:
+    return isinstance(raw, (bytes, bytearray, memoryview)) and bytes(raw[:2]) in (ZLIB_MARKER, ZSTD_MARKER)
+
+
+def compress_text(value: str, compression: str = None) -> bytes:
+    """
+    Encode text for storage, compressed with a format marker if it is large
+    enough for compression to pay off.
+    """
+    compression = compression or COMPRESSION
+    data = value.encode("utf-8")
+    if compression == 'none' or len(data) < COMPRESS_MIN_BYTES:
+        return data
+    if compression == 'zstd':
+        return ZSTD_MARKER + zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return ZLIB_MARKER + zlib.compress(data, ZLIB_LEVEL)
+
+
+def decompress_text(raw: Union[bytes, str, None]) -> Optional[str]:
+    """
+    Decode a stored value: compressed bytes, plain UTF-8 bytes or a legacy
+    text value as returned by the driver.
+    """
+    if raw is None or isinstance(raw, str):
+        return raw
+    raw = bytes(raw)
+    marker = raw[:2]
+    if marker == ZLIB_MARKER:
+        return zlib.decompress(raw[2:]).decode("utf-8")
+    if marker == ZSTD_MARKER:
+        if zstandard is None:
+            raise RuntimeError("Report content is zstd-compressed but zstandard is not installed.")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(raw[2:]).decode("utf-8")
+    return raw.decode("utf-8")
+
+
+class CompressedText(TypeDecorator):
+    """
+    A text column stored as compressed bytes. Python code reads and writes
+    `str` as with `Text`; rows written before compression are read as-is.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return compress_text(value)
+
+    def process_result_value(self, value, dialect):
+        return decompress_text(value)
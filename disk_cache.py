@@ -0,0 +1,126 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from metrics import CACHE_REQUESTS
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class DiskCache:
+    """
+    A persistent key/value cache of text values backed by a local SQLite file.
+
+    Entries expire after `ttl` seconds and each namespace is bounded to
+    `max_entries`, evicting the least recently used entries first. The file is
+    shared by every worker process on the host; hit/miss counters are kept per
+    process.
+    """
+
+    def __init__(self, path: str, namespace: str, ttl: float, max_entries: int):
+        """
+        Args:
+            path: Location of the SQLite file. Its directory is created if needed.
+            namespace: Separates independent caches stored in the same file.
+            ttl: Lifetime of an entry in seconds.
+            max_entries: Maximum number of entries kept in this namespace.
+        """
+        self.path = path
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._counter_lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "errors": 0}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_lru ON cache (namespace, accessed_at)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # One short-lived connection per operation keeps the cache safe to use from threads
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:  # Commit on success, roll back on error
+                yield conn
+        finally:
+            conn.close()
+
+    def _count(self, name: str):
+        with self._counter_lock:
+            self._counters[name] += 1
+        CACHE_REQUESTS.inc(cache=self.namespace, outcome=name)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value for `key`, or None if it is missing or expired."""
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                    (self.namespace, key),
+                ).fetchone()
+                if row is not None and row[1] < now:
+                    conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+                    row = None
+                if row is not None:
+                    conn.execute(
+                        "UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                        (now, self.namespace, key),
+                    )
+        except sqlite3.Error as e:
+            logger.error(f"Cache read failed ({self.namespace}): {str(e)}")
+            self._count("errors")
+            return None
+
+        self._count("hits" if row is not None else "misses")
+        return row[0] if row is not None else None
+
+    def set(self, key: str, value: str) -> None:
+        """Store `value` under `key` and evict expired and least recently used entries."""
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (self.namespace, key, value, now + self.ttl, now),
+                )
+                conn.execute("DELETE FROM cache WHERE namespace = ? AND expires_at < ?", (self.namespace, now))
+                conn.execute(
+                    "DELETE FROM cache WHERE namespace = ? AND key IN ("
+                    " SELECT key FROM cache WHERE namespace = ?"
+                    " ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.namespace, self.namespace, self.max_entries),
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Cache write failed ({self.namespace}): {str(e)}")
+            self._count("errors")
+
+    def delete(self, key: str) -> None:
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+        except sqlite3.Error as e:
+            logger.error(f"Cache delete failed ({self.namespace}): {str(e)}")
+            self._count("errors")
+
+    def stats(self) -> Dict[str, int]:
+        """Return this process's hit, miss and error counters."""
+        with self._counter_lock:
+            return dict(self._counters)
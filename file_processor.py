@@ -1,14 +1,198 @@
-from bs4 import BeautifulSoup
 import PyPDF2
 from docx import Document
+import codecs
 import logging
+import os
 import re
-from typing import Tuple, List, Dict
+import shutil
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+from collections import Counter
+from typing import Iterator, Optional, Tuple, List, Dict
+
+try:
+    from charset_normalizer import from_bytes as detect_encoding  # Installed with requests
+except ImportError:  # pragma: no cover
+    detect_encoding = None
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+TEXT_EXTENSIONS = ['txt', 'log', 'csv', 'json']
+SUPPORTED_EXTENSIONS = TEXT_EXTENSIONS + ['html', 'xml', 'pdf', 'doc', 'docx']
+READ_BLOCK_SIZE = 64 * 1024  # Bytes read from an upload at a time
+PDF_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', 40))  # Smaller PDFs are read serially
+PDF_PAGES_PER_TASK = 10
+PDF_WORKERS = int(os.getenv('PDF_WORKERS', max(1, min(4, (os.cpu_count() or 1)))))
+
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+_pdf_pool_pid: Optional[int] = None
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    """
+    Return the process pool used for PDF page extraction, created on first use
+    in each process. Workers are spawned rather than forked because the web
+    worker that owns the pool also runs threads.
+    """
+    global _pdf_pool, _pdf_pool_pid
+    if _pdf_pool is None or _pdf_pool_pid != os.getpid():
+        _pdf_pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        _pdf_pool_pid = os.getpid()
+    return _pdf_pool
+
+def _extract_pdf_pages(path: str, start: int, stop: int) -> str:
+    """
+    Extract the text of pages [start, stop) of the PDF at `path`. Runs in a pool worker.
+    """
+    with open(path, 'rb') as pdf_file:
+        pdf_reader = PyPDF2.PdfReader(pdf_file)
+        return "".join(pdf_reader.pages[i].extract_text() or '' for i in range(start, stop))
+
+def _spool_to_disk(file, suffix: str) -> str:
+    """
+    Copy an upload to a temporary file in blocks and return its path.
+    The caller is responsible for deleting the file.
+    """
+    handle, path = tempfile.mkstemp(suffix=f".{suffix}")
+    with os.fdopen(handle, 'wb') as spooled:
+        shutil.copyfileobj(file.stream, spooled, READ_BLOCK_SIZE)
+    return path
+
+def _detect_encoding(sample: bytes) -> str:
+    """
+    Guess the encoding of a text upload from its first block.
+    """
+    for bom, encoding in ((codecs.BOM_UTF8, 'utf-8-sig'), (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16')):
+        if sample.startswith(bom):
+            return encoding
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    if detect_encoding is not None and len(sample) >= 1024:  # Detection is unreliable on tiny samples
+        best = detect_encoding(sample).best()
+        if best is not None:
+            return best.encoding
+    return 'cp1252'
+
+def _iter_decoded(stream) -> Iterator[str]:
+    """
+    Decode a binary stream block by block, detecting the encoding from the first block.
+    """
+    block = stream.read(READ_BLOCK_SIZE)
+    if not block:
+        return
+    decoder = codecs.getincrementaldecoder(_detect_encoding(block))(errors='replace')
+    while block:
+        text = decoder.decode(block)
+        if text:
+            yield text
+        block = stream.read(READ_BLOCK_SIZE)
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+class _MarkupTextParser(HTMLParser):
+    """
+    Incrementally collect the text content of HTML/XML markup.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+
+    def handle_data(self, data):
+        self.parts.append(data)
+
+    def drain(self) -> str:
+        text = "".join(self.parts)
+        self.parts = []
+        return text
+
+def _iter_pdf(path: str) -> Iterator[str]:
+    with open(path, 'rb') as pdf_file:
+        page_count = len(PyPDF2.PdfReader(pdf_file).pages)
+
+    if page_count < PDF_PARALLEL_MIN_PAGES or PDF_WORKERS < 2:
+        with open(path, 'rb') as pdf_file:
+            pdf_reader = PyPDF2.PdfReader(pdf_file)
+            for page in pdf_reader.pages:
+                yield page.extract_text() or ''
+        return
+
+    # Large PDFs: extract batches of pages in parallel, yielding them in order
+    ranges = [(start, min(start + PDF_PAGES_PER_TASK, page_count)) for start in range(0, page_count, PDF_PAGES_PER_TASK)]
+    pool = _get_pdf_pool()
+    futures = [pool.submit(_extract_pdf_pages, path, start, stop) for start, stop in ranges]
+    try:
+        for future in futures:
+            yield future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+def _iter_docx(path: str) -> Iterator[str]:
+    doc = Document(path)
+    for paragraph in doc.paragraphs:
+        yield paragraph.text + '\n'
+
+def _iter_markup(stream) -> Iterator[str]:
+    parser = _MarkupTextParser()
+    for text in _iter_decoded(stream):
+        parser.feed(text)
+        chunk = parser.drain()
+        if chunk:
+            yield chunk
+    parser.close()
+    chunk = parser.drain()
+    if chunk:
+        yield chunk
+
+def iter_text_from_file(file) -> Iterator[str]:
+    """
+    Extract text from an uploaded file as a stream of chunks, without holding
+    the whole upload in memory.
+    Supported file types: .txt, .log, .pdf, .doc, .docx, .html, .xml, .csv, .json
+
+    Text, log and markup files are decoded incrementally. PDF and Word files
+    are spooled to a temporary file first; large PDFs are extracted page-parallel
+    in a process pool.
+
+    Args:
+        file: The uploaded file object (with .filename and .stream).
+
+    Yields:
+        str: Consecutive chunks of the extracted text.
+
+    Raises:
+        ValueError: If the file type is not supported.
+    """
+    filename = file.filename
+    file_extension = filename.split('.')[-1].lower()
+
+    if file_extension in TEXT_EXTENSIONS:
+        yield from _iter_decoded(file.stream)
+
+    elif file_extension in ['html', 'xml']:
+        yield from _iter_markup(file.stream)
+
+    elif file_extension in ['pdf', 'doc', 'docx']:
+        path = _spool_to_disk(file, file_extension)
+        try:
+            if file_extension == 'pdf':
+                yield from _iter_pdf(path)
+            else:
+                yield from _iter_docx(path)
+        finally:
+            os.remove(path)
+
+    else:
+        raise ValueError(f"Unsupported file type: {file_extension}")
+
 def extract_text_from_file(file):
     """
     Extract text from a file based on its extension.
@@ -20,100 +204,234 @@ def extract_text_from_file(file):
     Returns:
         str: The extracted text, or an empty string if extraction fails.
     """
-    filename = file.filename
-    file_extension = filename.split('.')[-1].lower()
-
     try:
-        if file_extension in ['txt', 'log', 'csv', 'json']:
-            # Read text directly from .txt, .log, .csv, or .json files
-            file_content = file.read().decode('utf-8')
-            file.seek(0)  # Reset file pointer
-            return file_content
-
-        elif file_extension == 'pdf':
-            # Extract text from PDF files
-            pdf_reader = PyPDF2.PdfReader(file.stream)
-            text = ''
-            for page in pdf_reader.pages:
-                text += page.extract_text()
-            file.seek(0)  # Reset file pointer
-            return text
-
-        elif file_extension in ['doc', 'docx']:
-            # Extract text from Word documents
-            doc = Document(file.stream)
-            text = ''
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + '\n'
-            file.seek(0)  # Reset file pointer
-            return text
-
-        elif file_extension in ['html', 'xml']:
-            # Extract text from HTML/XML files using BeautifulSoup
-            file_content = file.read().decode('utf-8')
-            soup = BeautifulSoup(file_content, 'html.parser')
-            file.seek(0)  # Reset file pointer
-            return soup.get_text()
+        return "".join(iter_text_from_file(file))
+    except Exception as e:
+        logger.error(f"Error extracting text from {file.filename}: {e}")
+        return ""  # Return an empty string if extraction fails
+    finally:
+        file.seek(0)  # Reset file pointer
 
+KEYWORD_TOP_K = int(os.getenv('KEYWORD_TOP_K', 25))
+ENTITY_LIMIT = int(os.getenv('ENTITY_LIMIT', 50))  # Distinct values kept per entity type
+ADDRESS_ENTITY_LIMIT = int(os.getenv('ADDRESS_ENTITY_LIMIT', 10000))  # Distinct IPs and CIDRs kept
+# Distinct values kept per entity type where ENTITY_LIMIT is too few; CVE IDs are never dropped
+ENTITY_LIMITS = {"cve": None, "ip": ADDRESS_ENTITY_LIMIT, "cidr": ADDRESS_ENTITY_LIMIT}
+
+STOP_WORDS = frozenset("""
+    the and for are but not you all any can had her was one our out has his how its may new now old see two who
+    did get let put say she too use from have this that with they will your what when them then than there their
+    been were which would could should about after again also into just like more most much only other over same
+    some such very well where while being each few many nor off own why here both down does done doing during
+    before below above between through under until upon once further these those itself himself herself
+    yourself ourselves themselves because against whom null none true false http https www com html
+""".split())
+
+ENTITY_PATTERN = re.compile(
+    r"""
+    (?P<cve>\bCVE-\d{4}-\d{4,7}\b)
+    | (?P<hash>\b(?:[a-f0-9]{64}|[a-f0-9]{40}|[a-f0-9]{32})\b)
+    | (?P<cidr>\b(?:\d{1,3}\.){3}\d{1,3}/\d{1,2}\b)
+    | (?P<ip>\b(?:\d{1,3}\.){3}\d{1,3}\b)(?::(?P<ip_port>\d{1,5})\b)?
+    | \bport\s+(?P<port>\d{1,5})\b
+    | \b(?P<proto_port>\d{1,5})/(?:tcp|udp)\b
+    | (?P<domain>\b(?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+
+        (?:com|net|org|io|gov|edu|mil|int|info|biz|co|us|uk|de|fr|ru|cn|in|jp|eu|local|internal|corp|lan|app|dev|cloud)\b)
+    | (?P<version>\bv?\d+(?:\.\d+){1,3}\b)
+    | (?P<word>\b[a-z]{3,}\b)
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+class SpaceSaving:
+    """
+    Approximate counts of the most frequent items in a stream using at most
+    `capacity` counters (Space-Saving). A new item replaces the least counted
+    one and inherits its count, which is recorded as the item's error: counts
+    never undercount, and overcount by at most the recorded error. Any item
+    occurring more than n / capacity times in a stream of n items is kept.
+    Items are bucketed by count so that every update takes constant time.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self._buckets: Dict[int, Dict[str, None]] = {}  # Count -> items, oldest first
+        self._min = 0
+
+    def _place(self, item: str, count: int) -> None:
+        self.counts[item] = count
+        self._buckets.setdefault(count, {})[item] = None
+
+    def _unplace(self, item: str) -> int:
+        count = self.counts.pop(item)
+        bucket = self._buckets[count]
+        del bucket[item]
+        if not bucket:
+            del self._buckets[count]
+        return count
+
+    def add(self, item: str) -> None:
+        if item in self.counts:
+            count = self._unplace(item)
+            self._place(item, count + 1)
+            if count == self._min and count not in self._buckets:
+                self._min = count + 1
+        elif len(self.counts) < self.capacity:
+            self._place(item, 1)
+            self.errors[item] = 0
+            self._min = 1
         else:
-            logger.error(f"Unsupported file type: {file_extension}")
-            return ""  # Return an empty string for unsupported file types
+            evicted = next(iter(self._buckets[self._min]))
+            floor = self._unplace(evicted)
+            del self.errors[evicted]
+            self._place(item, floor + 1)
+            self.errors[item] = floor
+            if floor not in self._buckets:
+                self._min = floor + 1
 
-    except Exception as e:
-        logger.error(f"Error extracting text from {filename}: {e}")
-        return ""  # Return an empty string if extraction fails
+    def top(self, k: int) -> List[Tuple[str, int]]:
+        return sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+class CappedCounter:
+    """
+    Exact counts of the first `limit` distinct items of a stream, or of every
+    item if `limit` is None. Occurrences of further distinct items are not
+    kept but tallied in `dropped`, so counts are never silently wrong.
+    """
+
+    def __init__(self, limit: Optional[int]):
+        self.limit = limit
+        self.counts: Counter = Counter()
+        self.dropped = 0
+
+    def add(self, item: str) -> None:
+        if item in self.counts or self.limit is None or len(self.counts) < self.limit:
+            self.counts[item] += 1
+        else:
+            self.dropped += 1
+
+    def top(self, k: Optional[int] = None) -> List[Tuple[str, int]]:
+        return sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+class SecurityEntityScanner:
+    """
+    Scan text in a single pass for keywords and security entities (IPs, CIDRs,
+    CVE IDs, ports, hashes, domains and versions). Text may be fed in chunks;
+    memory is bounded by the configured limits, not by the input vocabulary.
+    Entity counts are exact; keyword counts are Space-Saving estimates.
+    """
+
+    CARRY_LIMIT = 256  # Longest partial token carried over between chunks
+
+    def __init__(self, top_k: int = KEYWORD_TOP_K, entity_limit: int = ENTITY_LIMIT):
+        self.top_k = top_k
+        self.entity_limit = entity_limit
+        self.keywords = SpaceSaving(top_k * 4)
+        self.entities: Dict[str, CappedCounter] = {}
+        self._carry = ""
+
+    def _add_entity(self, kind: str, value: str):
+        if kind not in self.entities:
+            self.entities[kind] = CappedCounter(ENTITY_LIMITS.get(kind, self.entity_limit))
+        self.entities[kind].add(value)
+
+    def _scan(self, text: str):
+        for match in ENTITY_PATTERN.finditer(text):
+            kind = match.lastgroup
+            if kind == "word":
+                word = match.group().lower()
+                if word not in STOP_WORDS:
+                    self.keywords.add(word)
+            elif kind in ("ip", "ip_port"):
+                ip = match.group("ip")
+                if all(int(octet) <= 255 for octet in ip.split(".")):
+                    self._add_entity("ip", ip)
+                    if match.group("ip_port"):
+                        self._add_port(match.group("ip_port"))
+            elif kind in ("port", "proto_port"):
+                self._add_port(match.group(kind))
+            elif kind == "cve":
+                self._add_entity("cve", match.group().upper())
+            else:
+                self._add_entity(kind, match.group().lower())
 
-def extract_keywords_and_numeric_values(text: str) -> Tuple[List[str], Dict[str, str]]:
+    def _add_port(self, port: str):
+        if 0 < int(port) <= 65535:
+            self._add_entity("port", str(int(port)))
+
+    def _split_point(self, text: str) -> int:
+        # Scan up to a line break when the rest of the line is short, otherwise up
+        # to the last whitespace, never separating "port" from the number after it
+        newline = text.rfind("\n")
+        if newline != -1 and len(text) - newline <= self.CARRY_LIMIT:
+            return newline + 1
+        cut = max(text.rfind(" "), text.rfind("\t")) + 1
+        head = text[:cut].rstrip(" \t")
+        if head[-4:].lower() == "port" and not head[-5:-4].isalnum():
+            cut = len(head) - 4
+        if cut <= 0 or len(text) - cut > self.CARRY_LIMIT:
+            return len(text) if len(text) > self.CARRY_LIMIT else 0
+        return cut
+
+    def feed(self, chunk: str) -> None:
+        """
+        Scan the next chunk of text. Tokens near the end of the chunk are held
+        back and rejoined with the next chunk before scanning.
+        """
+        text = self._carry + chunk
+        cut = self._split_point(text)
+        self._carry = text[cut:]
+        self._scan(text[:cut])
+
+    def result(self) -> Tuple[List[str], Dict[str, Dict[str, int]]]:
+        """
+        Finish the scan and return the ranked keywords and the entities with their counts.
+        """
+        if self._carry:
+            self._scan(self._carry)
+            self._carry = ""
+        keywords = [word for word, _ in self.keywords.top(self.top_k)]
+        entities = {kind: dict(items.top()) for kind, items in sorted(self.entities.items())}
+        for kind, items in sorted(self.entities.items()):
+            if items.dropped:
+                logger.info(f"Kept the first {items.limit} distinct {kind} values; "
+                            f"{items.dropped} occurrences of further values were not counted.")
+        return keywords, entities
+
+def extract_keywords_and_numeric_values(text) -> Tuple[List[str], Dict[str, Dict[str, int]]]:
     """
-    Extract all keywords and numeric values (e.g., IPs, versions) from the input text using regex.
+    Extract the most frequent keywords and the security entities (IPs, CIDRs,
+    CVE IDs, ports, hashes, domains, versions) from the input text in one pass.
     
     Args:
-        text (str): The input text to extract keywords and numeric values from.
+        text: The input text, or an iterable of text chunks (e.g. from iter_text_from_file).
     
     Returns:
-        Tuple[List[str], Dict[str, str]]: A tuple containing:
-            - List of all keywords.
-            - Dictionary of numeric values with their types (e.g., {"ip": "192.168.1.1"}).
+        Tuple[List[str], Dict[str, Dict[str, int]]]: A tuple containing:
+            - The top KEYWORD_TOP_K keywords by frequency, stop words removed.
+            - Entities by type with their exact counts, most frequent first
+              (e.g. {"ip": {"192.168.1.1": 4}, "cve": {"CVE-2021-41773": 1}}).
     """
     try:
         # Check if the input text is empty or None
-        if not text or not isinstance(text, str):
+        if not text:
             logger.warning("Input text is empty or invalid. Returning empty results.")
             return [], {}
 
-        # Convert text to lowercase
-        text = text.lower()
-        
-        # Extract keywords using regex (words with 3 or more letters)
-        keywords = re.findall(r'\b[a-zA-Z]{3,}\b', text)
-        
-        # Remove duplicates
-        keywords = list(set(keywords))
-        
-        # Extract numeric values (IPs, versions, etc.)
-        numeric_values = {}
-        
-        # Regex to match IP addresses
-        ip_pattern = r'\b(?:\d{1,3}\.){3}\d{1,3}\b'
-        ips = re.findall(ip_pattern, text)
-        if ips:
-            numeric_values["ip"] = ips[0]  # Store the first IP found
-        
-        # Regex to match version numbers (e.g., 2.4.49)
-        version_pattern = r'\b(?:\d+\.)+\d+\b'
-        versions = re.findall(version_pattern, text)
-        if versions:
-            numeric_values["version"] = versions[0]  # Store the first version found
-        
-        # Regex to match other numeric values (e.g., ports, IDs)
-        numeric_pattern = r'\b\d+\b'
-        numbers = re.findall(numeric_pattern, text)
-        if numbers:
-            numeric_values["numeric"] = numbers  # Store all numeric values
-        
-        logger.info(f"Extracted keywords: {keywords}")
-        logger.info(f"Extracted numeric values: {numeric_values}")
+        scanner = SecurityEntityScanner()
+        for chunk in ([text] if isinstance(text, str) else text):
+            scanner.feed(chunk)
+        keywords, numeric_values = scanner.result()
+
+        logger.info(
+            f"Extracted {len(keywords)} keywords and "
+            f"{sum(len(values) for values in numeric_values.values())} entities."
+        )
+        logger.debug(f"Extracted keywords: {keywords}")
+        logger.debug(f"Extracted numeric values: {numeric_values}")
         return keywords, numeric_values
     except Exception as e:
         logger.error(f"Failed to extract keywords and numeric values: {str(e)}")
-        return [], {}  # Return empty results if extraction fails
\ No newline at end of file
+        return [], {}  # Return empty results if extraction fails
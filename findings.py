@@ -0,0 +1,157 @@
+import logging
+import re
+from collections import Counter
+from typing import Dict, List, Optional
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SEVERITIES = ("critical", "high", "medium", "low", "info")
+SEVERITY_ALIASES = {
+    "critical": "critical",
+    "severe": "critical",
+    "high": "high",
+    "medium": "medium",
+    "moderate": "medium",
+    "low": "low",
+    "info": "info",
+    "informational": "info",
+    "none": "info",
+}
+
+# Threat categories shown on the dashboard, matched against finding names
+CATEGORY_KEYWORDS = {
+    "phishing": ("phish", "spoof", "social engineering"),
+    "ransomware": ("ransom",),
+    "malware": ("malware", "trojan", "virus", "worm", "backdoor", "rootkit", "botnet", "spyware"),
+    "ddos": ("ddos", "denial of service", "denial-of-service", "flood"),
+    "brute_force": ("brute", "password spray", "credential stuffing"),
+    "authentication": ("authentication", "login", "credential", "password", "session", "privilege"),
+    "network": ("firewall", "port", "exposed", "network", "tls", "ssl", "ssh", "rdp", "smb"),
+    "data_breach": ("breach", "exfiltrat", "leak", "disclosure", "sql injection", "data exposure"),
+}
+
+# Table header keywords identifying each finding field
+COLUMN_KEYWORDS = {
+    "vulnerability": ("vulnerability", "finding", "issue", "weakness", "threat"),
+    "severity": ("severity", "risk", "rating"),
+    "asset": ("asset", "host", "target", "affected", "system", "component"),
+    "cve": ("cve",),
+}
+
+CVE_PATTERN = re.compile(r'\bCVE-\d{4}-\d{4,7}\b', re.IGNORECASE)
+ASSET_PATTERN = re.compile(r'\b(?:\d{1,3}\.){3}\d{1,3}(?::\d{1,5})?\b|\b(?:[a-z0-9-]+\.)+[a-z]{2,}\b', re.IGNORECASE)
+SEPARATOR_PATTERN = re.compile(r'^\|?\s*:?-{3,}:?\s*(\|\s*:?-{3,}:?\s*)*\|?$')
+MARKUP_PATTERN = re.compile(r'[*_`]|<[^>]+>')
+
+CATEGORY_PATTERNS = {
+    category: re.compile(r'\b(?:' + '|'.join(re.escape(keyword) for keyword in keywords) + ')', re.IGNORECASE)
+    for category, keywords in CATEGORY_KEYWORDS.items()
+}
+
+MAX_FIELD_LENGTH = 255
+
+
+def _cells(line: str) -> List[str]:
+    line = line.strip()
+    if line.startswith("|"):
+        line = line[1:]
+    if line.endswith("|"):
+        line = line[:-1]
+    return [MARKUP_PATTERN.sub("", cell).strip() for cell in line.split("|")]
+
+
+def _column_map(header: List[str]) -> Dict[str, int]:
+    columns = {}
+    for index, name in enumerate(header):
+        name = name.lower()
+        for field, keywords in COLUMN_KEYWORDS.items():
+            if field not in columns and any(keyword in name for keyword in keywords):
+                columns[field] = index
+                break
+    return columns
+
+
+def normalize_severity(value: str) -> Optional[str]:
+    """Map a severity cell such as "**High**" or "Critical (9.8)" to one of SEVERITIES."""
+    words = re.findall(r'[a-z]+', value.lower())
+    for word in words:
+        if word in SEVERITY_ALIASES:
+            return SEVERITY_ALIASES[word]
+    return None
+
+
+def categorize(name: str) -> List[str]:
+    """Return the threat categories with a keyword starting a word of the finding name."""
+    return [category for category, pattern in CATEGORY_PATTERNS.items() if pattern.search(name)]
+
+
+def parse_findings(content: str) -> List[Dict[str, Optional[str]]]:
+    """
+    Extract findings from the Markdown tables of a generated report.
+
+    Only tables with both a vulnerability-like and a severity column are
+    used. Assets and CVE IDs come from their own columns when the table has
+    them, otherwise from the first IP address/hostname and CVE ID in the row.
+
+    Returns:
+        List[Dict[str, Optional[str]]]: Findings with "vulnerability", "severity",
+        "asset" and "cve" keys, without duplicates.
+    """
+    findings = []
+    seen = set()
+    lines = content.splitlines()
+    for position in range(1, len(lines)):
+        if not SEPARATOR_PATTERN.match(lines[position].strip()) or "|" not in lines[position - 1]:
+            continue
+        columns = _column_map(_cells(lines[position - 1]))
+        if "vulnerability" not in columns or "severity" not in columns:
+            continue
+
+        for line in lines[position + 1:]:
+            if "|" not in line:
+                break
+            cells = _cells(line)
+            if len(cells) <= max(columns.values()):
+                continue
+            vulnerability = cells[columns["vulnerability"]]
+            severity = normalize_severity(cells[columns["severity"]])
+            if not vulnerability or severity is None:
+                continue
+
+            row = " ".join(cells)
+            asset = cells[columns["asset"]] if "asset" in columns else None
+            if not asset:
+                match = ASSET_PATTERN.search(row)
+                asset = match.group(0) if match else None
+            cve_match = CVE_PATTERN.search(cells[columns["cve"]] if "cve" in columns else row)
+            cve = cve_match.group(0).upper() if cve_match else None
+
+            finding = {
+                "vulnerability": vulnerability[:MAX_FIELD_LENGTH],
+                "severity": severity,
+                "asset": asset[:MAX_FIELD_LENGTH] if asset else None,
+                "cve": cve,
+            }
+            key = tuple(finding.values())
+            if key not in seen:
+                seen.add(key)
+                findings.append(finding)
+
+    logger.info(f"Parsed {len(findings)} findings from report tables.")
+    return findings
+
+
+def finding_counts(findings: List[Dict[str, Optional[str]]], month: str) -> Counter:
+    """
+    Count findings into (kind, key) dashboard counters: per severity, per
+    threat category and per month the report was created.
+    """
+    counts = Counter()
+    for finding in findings:
+        counts[("severity", finding["severity"])] += 1
+        for category in categorize(finding["vulnerability"]):
+            counts[("category", category)] += 1
+        counts[("month", month)] += 1
+    return counts
@@ -0,0 +1,260 @@
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple, Type
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the queue is at its configured depth."""
+
+
+class JobQueue:
+    """
+    A bounded in-process job queue served by a pool of worker threads.
+
+    Jobs are identified by an id only; the handler is responsible for loading
+    whatever it needs (e.g. a database row) and persisting the outcome.
+    Worker threads are started lazily on the first submit so that the pool is
+    created in each gunicorn worker after fork rather than in the master.
+
+    Jobs live in process memory only, so a maintenance thread periodically
+    reports the jobs this process holds through `heartbeat` and calls `recover`
+    to take over jobs whose process died (e.g. on a deploy or worker recycle).
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[int, int], None],
+        on_failure: Optional[Callable[[int, Exception], None]] = None,
+        workers: int = 2,
+        max_depth: int = 50,
+        max_retries: int = 2,
+        retry_delay: float = 2.0,
+        no_retry: Tuple[Type[Exception], ...] = (),
+        heartbeat: Optional[Callable[[List[int]], None]] = None,
+        recover: Optional[Callable[[], None]] = None,
+        maintenance_interval: float = 30.0,
+        stream_cancel_grace: float = 30.0,
+    ):
+        """
+        Args:
+            handler: Called as handler(job_id, attempt) to run a job. Raising retries the job.
+            on_failure: Called as on_failure(job_id, exc) once all retries are exhausted.
+            workers: Number of worker threads.
+            max_depth: Maximum number of jobs waiting in the queue.
+            max_retries: Number of retries after the first failed attempt.
+            retry_delay: Base delay in seconds between retries, doubled on each attempt.
+            no_retry: Exception types that fail the job immediately without retrying.
+            heartbeat: Called with the ids of the jobs queued or running in this process,
+                every `maintenance_interval` seconds.
+            recover: Called every `maintenance_interval` seconds, and once at start,
+                to resubmit jobs abandoned by other processes.
+            maintenance_interval: Seconds between heartbeat and recover calls.
+            stream_cancel_grace: Seconds a token stream may go without subscribers
+                before its job is cancelled.
+        """
+        self.handler = handler
+        self.on_failure = on_failure
+        self.workers = max(1, workers)
+        self.max_retries = max(0, max_retries)
+        self.retry_delay = retry_delay
+        self.no_retry = no_retry
+        self.heartbeat = heartbeat
+        self.recover = recover
+        self.maintenance_interval = maintenance_interval
+        self.stream_cancel_grace = stream_cancel_grace
+        self._active: Set[int] = set()
+        self._maintenance: Optional[threading.Thread] = None
+        self._streams: Dict[int, TokenStream] = {}
+        self._queue = queue.Queue(maxsize=max(1, max_depth))
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(
+                    target=self._worker,
+                    name=f"report-worker-{len(self._threads)}",
+                    daemon=True,
+                )
+                thread.start()
+                self._threads.append(thread)
+            if (self.heartbeat or self.recover) and not (self._maintenance and self._maintenance.is_alive()):
+                self._maintenance = threading.Thread(target=self._maintain, name="report-maintenance", daemon=True)
+                self._maintenance.start()
+
+    def start(self) -> None:
+        """Start the worker and maintenance threads in this process if they are not running."""
+        self._ensure_started()
+
+    def submit(self, job_id: int) -> None:
+        """
+        Enqueue a job for background processing.
+
+        Raises:
+            JobQueueFull: If the queue already holds max_depth jobs.
+        """
+        self._ensure_started()
+        with self._lock:
+            if job_id in self._active:
+                return  # Already held by this process
+            try:
+                self._queue.put_nowait(job_id)
+            except queue.Full:
+                raise JobQueueFull(f"Job queue is full ({self._queue.maxsize} jobs waiting)")
+            self._active.add(job_id)
+        logger.info(f"Job {job_id} queued (depth {self._queue.qsize()}).")
+
+    def depth(self) -> int:
+        """Return the number of jobs currently waiting to be picked up."""
+        return self._queue.qsize()
+
+    def open_stream(self, job_id: int) -> "TokenStream":
+        """Create the token stream that a job's output is published to."""
+        with self._lock:
+            stream = self._streams[job_id] = TokenStream(self.stream_cancel_grace)
+        return stream
+
+    def get_stream(self, job_id: int) -> Optional["TokenStream"]:
+        """Return the job's token stream if it lives in this process."""
+        return self._streams.get(job_id)
+
+    def close_stream(self, job_id: int) -> None:
+        """Close and forget a job's token stream; subscribers drain what is left."""
+        with self._lock:
+            stream = self._streams.pop(job_id, None)
+        if stream:
+            stream.close()
+
+    def _worker(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                self._run(job_id)
+            finally:
+                with self._lock:
+                    self._active.discard(job_id)
+                self._queue.task_done()
+
+    def _maintain(self):
+        while True:
+            if self.recover:
+                try:
+                    self.recover()
+                except Exception as e:
+                    logger.error(f"Job recovery failed: {str(e)}")
+            time.sleep(self.maintenance_interval)
+            if self.heartbeat:
+                with self._lock:
+                    active = sorted(self._active)
+                if active:
+                    try:
+                        self.heartbeat(active)
+                    except Exception as e:
+                        logger.error(f"Job heartbeat failed: {str(e)}")
+
+    def _run(self, job_id: int):
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                self.handler(job_id, attempt)
+                return
+            except Exception as e:
+                if attempt > self.max_retries or isinstance(e, self.no_retry):
+                    logger.error(f"Job {job_id} failed after {attempt} attempts: {str(e)}")
+                    if self.on_failure:
+                        try:
+                            self.on_failure(job_id, e)
+                        except Exception as failure_error:
+                            logger.error(f"Failed to record failure of job {job_id}: {str(failure_error)}")
+                    return
+                delay = self.retry_delay * (2 ** (attempt - 1))
+                logger.warning(f"Job {job_id} attempt {attempt} failed: {str(e)}. Retrying in {delay:.1f}s.")
+                time.sleep(delay)
+
+
+class TokenStream:
+    """
+    An append-only buffer of generated text that any number of subscribers can follow.
+
+    Subscribers replay everything published so far and then block for new
+    chunks. When the last subscriber has been gone for `cancel_grace` seconds
+    the stream is marked cancelled, so the producer can stop generating early.
+    The grace period lets an EventSource reconnect after a network blip, or a
+    reload, pick the stream up again instead of failing the job.
+    """
+
+    def __init__(self, cancel_grace: float = 30.0):
+        self._cond = threading.Condition()
+        self._events = []
+        self._subscribers = 0
+        self._abandoned_at: Optional[float] = None
+        self.cancel_grace = cancel_grace
+        self.closed = False
+        self.cancelled = False
+
+    def publish(self, text: str) -> bool:
+        """
+        Append a chunk of text.
+
+        Returns:
+            bool: False if every subscriber has disconnected and the producer should stop.
+        """
+        with self._cond:
+            if self._abandoned_at is not None and time.monotonic() - self._abandoned_at > self.cancel_grace:
+                self.cancelled = True
+            if self.cancelled:
+                return False
+            self._events.append(("token", text))
+            self._cond.notify_all()
+            return True
+
+    def reset(self) -> None:
+        """Tell subscribers to discard what they have received, e.g. before a retry."""
+        with self._cond:
+            self._events.append(("reset", ""))
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def subscribe(self, keepalive: float = 15.0) -> Iterator[Optional[Tuple[str, str]]]:
+        """
+        Yield (event, text) tuples until the stream is closed.
+
+        None is yielded every `keepalive` seconds without new data so that the
+        caller can write a heartbeat and notice a disconnected client.
+        """
+        position = 0
+        with self._cond:
+            self._subscribers += 1
+            self._abandoned_at = None
+        try:
+            while True:
+                with self._cond:
+                    if position >= len(self._events) and not self.closed:
+                        self._cond.wait(keepalive)
+                    pending = self._events[position:]
+                    position += len(pending)
+                    finished = self.closed and position >= len(self._events)
+                if not pending and not finished:
+                    yield None
+                for event in pending:
+                    yield event
+                if finished:
+                    return
+        finally:
+            with self._cond:
+                self._subscribers -= 1
+                if self._subscribers == 0 and not self.closed:
+                    self._abandoned_at = time.monotonic()
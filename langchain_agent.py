@@ -1,14 +1,41 @@
 import os
+import json
+import hashlib
 import logging
-import re
-import requests
-from typing import Dict, Any, List
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Callable, Optional, Tuple
 from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
 from langchain.memory import ConversationBufferMemory
 from langchain_google_genai import ChatGoogleGenerativeAI
+from google.api_core import exceptions as google_exceptions
 from dotenv import load_dotenv
 from file_processor import extract_keywords_and_numeric_values
+from disk_cache import DiskCache
+from search_enrichment import SearchEnricher, build_queries, create_provider
+from log_templates import compact_log_text
+from llm_governor import LLMGovernor, LLMRateLimited, call_key
+from prompt_budget import (
+    PROMPT_TOKEN_BUDGET,
+    estimate_tokens,
+    fit_prompt,
+    format_entities,
+    format_form_data,
+    format_keywords,
+    truncate_lines,
+    truncate_middle,
+)
+from replay import (
+    RecordingChatModel,
+    RecordingSearchProvider,
+    ReplayChatModel,
+    ReplaySearchProvider,
+    ReplayStore,
+)
+import metrics
+from metrics import timed
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -19,18 +46,84 @@ load_dotenv()
 # Load API key from environment variable for security
 API_KEY = os.getenv('GOOGLE_API_KEY')
 
+MODEL_NAME = "gemini-1.5-flash-latest"
+PROMPT_VERSION = "7"  # Bump whenever the prompt or its input (entities, truncation, compaction, serialization) changes so cached reports are not reused
+
+# Persistent cache of generated reports, keyed on the normalized input
+CACHE_PATH = os.getenv('CACHE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'cache.db'))
+report_cache = DiskCache(
+    CACHE_PATH,
+    namespace="report",
+    ttl=float(os.getenv('REPORT_CACHE_TTL', 7 * 24 * 3600)),
+    max_entries=int(os.getenv('REPORT_CACHE_MAX_ENTRIES', 1000)),
+)
+
+# Load testing: LLM_REPLAY="record" saves every Gemini and search response with
+# its timing to LLM_REPLAY_PATH; "replay" serves them back offline instead
+LLM_REPLAY = os.getenv('LLM_REPLAY', '').lower()
+LLM_REPLAY_SPEED = float(os.getenv('LLM_REPLAY_SPEED', 1.0))  # 2.0 replays twice as fast as recorded
+if LLM_REPLAY not in ('', 'record', 'replay'):
+    raise ValueError(f"LLM_REPLAY must be 'record' or 'replay', not {LLM_REPLAY!r}")
+replay_store = ReplayStore(
+    os.getenv('LLM_REPLAY_PATH', os.path.join(os.path.dirname(CACHE_PATH), 'replay.jsonl'))
+) if LLM_REPLAY else None
+
+# Web search enrichment: SEARCH_PROVIDER is "google", "stub" (offline) or "none"
+search_provider = create_provider(os.getenv('SEARCH_PROVIDER', 'google'), float(os.getenv('SEARCH_STUB_LATENCY', 0)))
+if LLM_REPLAY == 'record':
+    search_provider = RecordingSearchProvider(search_provider, replay_store)
+elif LLM_REPLAY == 'replay':
+    search_provider = ReplaySearchProvider(replay_store, speed=LLM_REPLAY_SPEED)
+search_enricher = SearchEnricher(
+    search_provider,
+    cache=DiskCache(
+        CACHE_PATH,
+        namespace="search",
+        ttl=float(os.getenv('SEARCH_CACHE_TTL', 24 * 3600)),
+        max_entries=int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', 5000)),
+    ),
+    connect_timeout=float(os.getenv('SEARCH_CONNECT_TIMEOUT', 3)),
+    read_timeout=float(os.getenv('SEARCH_READ_TIMEOUT', 5)),
+    total_timeout=float(os.getenv('SEARCH_TOTAL_TIMEOUT', 8)),
+    workers=int(os.getenv('SEARCH_WORKERS', 4)),
+)
+
+# Every Gemini call goes through the governor: per-process and optional host-wide
+# concurrency limits, a call rate limit, backoff on quota errors and coalescing
+# of identical concurrent calls
+governor = LLMGovernor(
+    max_concurrency=int(os.getenv('LLM_MAX_CONCURRENCY', 4)),
+    global_concurrency=int(os.getenv('LLM_GLOBAL_CONCURRENCY', 0)),
+    lock_dir=os.getenv('LLM_LOCK_DIR', os.path.join(os.path.dirname(CACHE_PATH), 'llm_slots')),
+    rate_per_minute=float(os.getenv('LLM_RATE_PER_MINUTE', 0)),
+    burst=int(os.getenv('LLM_RATE_BURST', 5)),
+    max_retries=int(os.getenv('LLM_MAX_RETRIES', 5)),
+    backoff_base=float(os.getenv('LLM_BACKOFF_BASE', 2.0)),
+    backoff_max=float(os.getenv('LLM_BACKOFF_MAX', 60.0)),
+    acquire_timeout=float(os.getenv('LLM_ACQUIRE_TIMEOUT', 600)),
+)
+
 def initialize_llm() -> ChatGoogleGenerativeAI:
     """
-    Initialize and return the Gemini LLM model.
+    Initialize and return the Gemini LLM model, or its recording or replaying
+    stand-in when LLM_REPLAY is set.
     """
+    if LLM_REPLAY == 'replay':
+        logger.info(f"Replaying recorded Gemini responses from {replay_store.path}.")
+        return ReplayChatModel(store=replay_store, speed=LLM_REPLAY_SPEED)
     try:
         llm = ChatGoogleGenerativeAI(
-            model="gemini-1.5-flash-latest",
+            model=MODEL_NAME,
             api_key=API_KEY,
             temperature=0.7,
             max_tokens=3000,  # Allow for detailed responses
+            # One attempt per call: llm_governor is the only retry layer. Counts
+            # attempts, and 0 means "SDK default" in newer releases, so not 0.
+            max_retries=1,
         )
         logger.info("Gemini LLM initialized successfully.")
+        if LLM_REPLAY == 'record':
+            return RecordingChatModel(inner=llm, store=replay_store)
         return llm
     except Exception as e:
         logger.error(f"Failed to initialize Gemini LLM: {str(e)}")
@@ -53,36 +146,11 @@ def initialize_memory() -> ConversationBufferMemory:
 
 def scrape_google_search(query: str) -> str:
     """
-    Scrape Google search results for a given query without using any frameworks.
+    Search the web for a single query through the shared search enricher
+    (pooled session, timeouts and cache). Returns the top result titles,
+    or an empty string if the search failed.
     """
-    try:
-        # Prepare the search URL
-        search_url = f"https://www.google.com/search?q={query}"
-        
-        # Set headers to mimic a browser request
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-        
-        # Send a GET request to Google
-        response = requests.get(search_url, headers=headers)
-        response.raise_for_status()  # Raise an error for bad status codes
-        
-        # Extract search results using regex
-        search_results = []
-        pattern = r'<h3[^>]*>(.*?)<\/h3>'  # Regex to match search result titles
-        matches = re.findall(pattern, response.text)
-        
-        # Clean up the results
-        for match in matches:
-            clean_result = re.sub(r'<[^>]+>', '', match)  # Remove HTML tags
-            search_results.append(clean_result)
-        
-        # Return the top 3 results
-        return "\n".join(search_results[:3])
-    except Exception as e:
-        logger.error(f"Failed to scrape Google search results: {str(e)}")
-        raise
+    return "\n".join(search_enricher.search(query))
 
 def create_report_chain(llm: ChatGoogleGenerativeAI) -> LLMChain:
     """
@@ -158,6 +226,456 @@ def create_report_chain(llm: ChatGoogleGenerativeAI) -> LLMChain:
         logger.error(f"Failed to create report chain: {str(e)}")
         raise
 
+def create_findings_chain(llm: ChatGoogleGenerativeAI) -> LLMChain:
+    """
+    Create and return the LLMChain that extracts findings from one chunk of a large input.
+    """
+    try:
+        prompt_template = PromptTemplate(
+            input_variables=["chunk", "index", "total"],
+            template="""
+            **Role**: You are a cybersecurity analyst reviewing part {index} of {total} of a larger security document (scan output, logs, pentest report or similar).
+
+            **Task**: Extract every security-relevant finding from this excerpt as a concise Markdown bullet list. For each finding include:
+            - The vulnerability, misconfiguration or suspicious activity.
+            - Its apparent severity (Critical, High, Medium or Low).
+            - Affected assets (hosts, IP addresses, ports, services, versions) and any CVE IDs.
+            - The evidence from the excerpt that supports it.
+
+            Merge duplicates, omit anything not security-relevant, and do not write an introduction or conclusion.
+            If the excerpt contains no findings, answer "No findings."
+
+            **Excerpt**:
+            {chunk}
+            """
+        )
+        findings_chain = LLMChain(llm=llm, prompt=prompt_template)
+        logger.info("Findings extraction chain created successfully.")
+        return findings_chain
+    except Exception as e:
+        logger.error(f"Failed to create findings chain: {str(e)}")
+        raise
+
+# Sections of the report, in order, with what each must cover. In sectioned
+# mode (REPORT_MODE=sectioned) each one is written by its own concurrent call.
+REPORT_SECTIONS = [
+    ("Strategic Overview", """
+                - Contextualize the findings in the organization's cybersecurity landscape.
+                - Identify high-level risks and potential attack vectors based on the provided data."""),
+    ("Multi-Layered Analysis", """
+                - **Layer 1 (CoT)**: Sequentially analyze each vulnerability or risk to identify root causes and potential impacts.
+                - **Layer 2 (ToT)**: Explore alternative scenarios or threat vectors that could exploit the vulnerabilities.
+                - **Layer 3 (RPA)**: Combine reasoning approaches to identify overlooked risks or mitigation strategies."""),
+    ("Detailed Key Findings", """
+                - Present detailed descriptions of identified vulnerabilities, their severity, and their impact.
+                - Provide correlation with relevant data (e.g., IP addresses, logs, system configurations).
+                - **Include a table in Markdown format** with the columns Vulnerability, Severity, Impact and Evidence."""),
+    ("Actionable Recommendations", """
+                - Short-term measures: Patches, configuration adjustments, immediate containment strategies.
+                - Long-term measures: Policy changes, incident response improvements, and advanced monitoring solutions.
+                - Prioritize recommendations based on risk levels and potential impact."""),
+    ("Advanced Insights", """
+                - Highlight emerging threats and trends derived from search results and external knowledge.
+                - Correlate findings with industry benchmarks or standards like NIST, ISO 27001, or OWASP."""),
+    ("Summary and Roadmap", """
+                - Summarize the organization’s current security posture.
+                - Provide a roadmap for implementing recommendations and achieving a robust security framework."""),
+]
+
+def create_analysis_chain(llm: ChatGoogleGenerativeAI) -> LLMChain:
+    """
+    Create and return the LLMChain for the shared analysis that every report
+    section is written from in sectioned mode.
+    """
+    try:
+        prompt_template = PromptTemplate(
+            input_variables=["data", "search_results", "keywords", "numeric_values"],
+            template="""
+            **Role**: You are an advanced cybersecurity AI agent with expertise in vulnerability assessment, penetration testing, and incident response. Your task is to analyze the input data and write an analysis brief that several report writers will work from.
+
+            **Input Data**:
+            - Raw Data: {data}
+            - Search Results: {search_results}
+            - Extracted Keywords: {keywords}
+            - Extracted Numeric Values: {numeric_values}
+
+            **Brief**: Write concise Markdown bullet lists, without an introduction or conclusion, covering:
+            - Every vulnerability, misconfiguration or suspicious activity, with its severity (Critical, High, Medium or Low), affected assets (hosts, IP addresses, ports, services, versions), CVE IDs and the supporting evidence from the data.
+            - Root causes, likely attack vectors and how the findings relate to each other.
+            - The organization's apparent environment and security posture.
+            - Relevant threats, trends and standards from the search results.
+
+            Be specific and complete: the writers will not see the raw data.
+            """
+        )
+        analysis_chain = LLMChain(llm=llm, prompt=prompt_template)
+        logger.info("Analysis chain created successfully.")
+        return analysis_chain
+    except Exception as e:
+        logger.error(f"Failed to create analysis chain: {str(e)}")
+        raise
+
+def create_section_chain(llm: ChatGoogleGenerativeAI) -> LLMChain:
+    """
+    Create and return the LLMChain that writes one report section from the shared analysis.
+    """
+    try:
+        prompt_template = PromptTemplate(
+            input_variables=["title", "instructions", "analysis", "search_results", "keywords", "numeric_values"],
+            template="""
+            **Role**: You are an advanced cybersecurity AI agent with expertise in vulnerability assessment, penetration testing, and incident response. You are writing one section of a detailed and actionable security report.
+
+            **Analysis of the input data**:
+            {analysis}
+
+            **Supporting Data**:
+            - Search Results: {search_results}
+            - Extracted Keywords: {keywords}
+            - Extracted Numeric Values: {numeric_values}
+
+            **Section**: {title}
+            {instructions}
+
+            **Guidelines**:
+            - Write only this section; other sections are written separately. Do not repeat the section title, and use `###` for any subheadings.
+            - Use precise, technical language and maintain professionalism.
+            - Justify all findings with reasoning and evidence.
+            - Ensure the section is concise but comprehensive, with no redundant information.
+            - Include hyperlinks to tools, standards, and additional resources.
+            - **Use Markdown syntax for tables and other structured data**.
+            """
+        )
+        section_chain = LLMChain(llm=llm, prompt=prompt_template)
+        logger.info("Report section chain created successfully.")
+        return section_chain
+    except Exception as e:
+        logger.error(f"Failed to create report section chain: {str(e)}")
+        raise
+
+CHAIN_BUILDERS = {
+    "report": create_report_chain,
+    "findings": create_findings_chain,
+    "analysis": create_analysis_chain,
+    "section": create_section_chain,
+}
+
+# REPORT_MODE is "single" (one completion for the whole report) or "sectioned"
+# (a shared analysis, then the sections written concurrently)
+REPORT_MODE = os.getenv('REPORT_MODE', 'single').lower()
+SECTION_CONCURRENCY = int(os.getenv('SECTION_CONCURRENCY', 3))
+SECTION_MAX_RETRIES = int(os.getenv('SECTION_MAX_RETRIES', 2))  # Retries of one failed section
+SECTION_RETRY_DELAY = 1.0  # Base backoff in seconds, doubled on each retry
+if REPORT_MODE not in ('single', 'sectioned'):
+    raise ValueError(f"REPORT_MODE must be 'single' or 'sectioned', not {REPORT_MODE!r}")
+
+# Inputs larger than this are analyzed chunk by chunk before writing the report
+CHUNK_TOKEN_BUDGET = int(os.getenv('CHUNK_TOKEN_BUDGET', 8000))
+CHUNK_CONCURRENCY = int(os.getenv('CHUNK_CONCURRENCY', 4))
+MAX_REDUCE_ROUNDS = 3
+
+def split_into_chunks(text: str, max_tokens: int) -> List[str]:
+    """
+    Split text into chunks of at most `max_tokens` estimated tokens, breaking on
+    line boundaries where possible.
+    """
+    chunks = []
+    current = []
+    size = 0
+    for line in text.splitlines(keepends=True):
+        tokens = estimate_tokens(line)
+        while tokens > max_tokens and len(line) > 1:  # A single line longer than a whole chunk
+            if current:
+                chunks.append("".join(current))
+                current, size = [], 0
+            cut = max(1, len(line) * max_tokens // tokens)
+            chunks.append(line[:cut])
+            line = line[cut:]
+            tokens = estimate_tokens(line)
+        if size + tokens > max_tokens and current:
+            chunks.append("".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += tokens
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+def extract_findings(text: str) -> str:
+    """
+    Map-reduce a large input down to its findings: split it into token-budgeted
+    chunks, extract findings from the chunks concurrently, and repeat on the
+    combined findings until they fit in one prompt.
+
+    Returns:
+        str: The combined findings, in chunk order.
+    """
+    chunk_tokens = min(CHUNK_TOKEN_BUDGET, PROMPT_TOKEN_BUDGET - template_tokens("findings"))
+    for round_number in range(1, MAX_REDUCE_ROUNDS + 1):
+        chunks = split_into_chunks(text, chunk_tokens)
+        logger.info(f"Extracting findings from {len(chunks)} chunks of at most {chunk_tokens} tokens "
+                    f"(round {round_number}).")
+        with ThreadPoolExecutor(max_workers=max(1, CHUNK_CONCURRENCY)) as executor:
+            partials = list(executor.map(
+                lambda item: run_chain("findings", {"chunk": item[1], "index": item[0], "total": len(chunks)}),
+                enumerate(chunks, start=1),
+            ))
+        text = "\n\n".join(
+            f"### Findings from part {index} of {len(chunks)}\n{partial.strip()}"
+            for index, partial in enumerate(partials, start=1)
+            if partial.strip() and partial.strip() != "No findings."
+        )
+        if estimate_tokens(text) <= CHUNK_TOKEN_BUDGET:
+            break
+    return text
+
+class GenerationCancelled(Exception):
+    """Raised from a streaming callback to stop generating a report early."""
+
+# Process-wide LLM client and chains, built lazily once per worker process
+_registry_lock = threading.Lock()
+_registry: Dict[str, Any] = {"pid": None, "llm": None, "chains": {}}
+
+# Errors after which the cached client is considered broken and is rebuilt
+CONNECTION_ERRORS = (
+    ConnectionError,
+    TimeoutError,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+)
+
+def get_chain(name: str) -> LLMChain:
+    """
+    Return a shared chain by name ("report" or "findings"), creating the
+    client and the chain on first use.
+
+    The client is keyed on the process id so that a chain built before a
+    gunicorn fork is never reused by the child process.
+    """
+    pid = os.getpid()
+    chain = _registry["chains"].get(name) if _registry["pid"] == pid else None
+    if chain is not None:
+        return chain
+    with _registry_lock:
+        if _registry["pid"] != pid or _registry["llm"] is None:
+            _registry["llm"] = initialize_llm()
+            _registry["chains"] = {}
+            _registry["pid"] = pid
+        if name not in _registry["chains"]:
+            _registry["chains"][name] = CHAIN_BUILDERS[name](_registry["llm"])
+        return _registry["chains"][name]
+
+def template_tokens(name: str) -> int:
+    """
+    Estimated tokens of a chain's prompt template with its variables left empty.
+    """
+    prompt = get_chain(name).prompt
+    return estimate_tokens(prompt.format(**{variable: "" for variable in prompt.input_variables}))
+
+def build_prompt_input(name: str, fields: Dict[str, Callable[[Optional[int]], str]]) -> Tuple[Dict[str, str], int]:
+    """
+    Render the input of chain `name` within PROMPT_TOKEN_BUDGET and log the
+    size of the prompt by field.
+
+    Args:
+        name: The chain the input is for.
+        fields: Renderers by prompt variable, as taken by prompt_budget.fit_prompt.
+
+    Returns:
+        Tuple[Dict[str, str], int]: The chain input and the prompt's estimated tokens.
+    """
+    overhead = template_tokens(name)
+    input_data, sizes = fit_prompt(fields, overhead, PROMPT_TOKEN_BUDGET)
+    total = overhead + sum(sizes.values())
+    breakdown = ", ".join(f"{field} {size}" for field, size in sizes.items())
+    logger.info(f"Prompt for {name}: ~{total} of {PROMPT_TOKEN_BUDGET} tokens (template {overhead}, {breakdown}).")
+    return input_data, total
+
+def get_report_chain() -> LLMChain:
+    """
+    Return the shared report chain, creating it on first use.
+    """
+    return get_chain("report")
+
+def reset_report_chain() -> None:
+    """
+    Drop the shared client and chains so the next call rebuilds them.
+    """
+    with _registry_lock:
+        _registry["pid"] = None
+        _registry["llm"] = None
+        _registry["chains"] = {}
+    logger.info("Gemini client registry reset.")
+
+def use_llm(llm) -> None:
+    """
+    Install `llm` as this process's shared client, e.g. an offline stand-in
+    for ChatGoogleGenerativeAI in benchmarks. Chains are rebuilt around it.
+    """
+    with _registry_lock:
+        _registry["pid"] = os.getpid()
+        _registry["llm"] = llm
+        _registry["chains"] = {}
+
+def warm_up_llm() -> bool:
+    """
+    Build the shared client and chain ahead of the first request.
+
+    Returns:
+        bool: True if the chain is ready, False if initialization failed.
+    """
+    try:
+        get_report_chain()
+        get_chain("findings")
+        if REPORT_MODE == 'sectioned':
+            get_chain("analysis")
+            get_chain("section")
+        return True
+    except Exception as e:
+        logger.warning(f"LLM warm-up failed, will retry on first request: {str(e)}")
+        return False
+
+def stream_report_chain(input_data: Dict[str, Any], on_token: Callable[[str], None]) -> str:
+    """
+    Run the shared report chain in streaming mode, passing each chunk of text
+    to `on_token` as Gemini produces it. The call goes through the governor;
+    a quota error is only retried before the first chunk was passed on.
+
+    Returns:
+        str: The full generated report.
+    """
+    report_chain = get_report_chain()
+    prompt = report_chain.prompt.format(**input_data)
+    parts = []
+
+    def stream() -> str:
+        with metrics.LLM_IN_FLIGHT.track_in_progress(chain="report"):
+            for chunk in report_chain.llm.stream(prompt):
+                text = chunk.content if isinstance(chunk.content, str) else "".join(
+                    part.get("text", "") if isinstance(part, dict) else str(part) for part in chunk.content
+                )
+                if text:
+                    parts.append(text)
+                    on_token(text)
+        return "".join(parts)
+
+    return governor.call(stream, can_retry=lambda: not parts)
+
+def run_chain(name: str, input_data: Dict[str, Any]) -> str:
+    """
+    Run a shared chain through the governor, rebuilding the client once if the
+    connection broke. Identical concurrent calls share one Gemini call.
+    """
+    def call() -> str:
+        with metrics.LLM_IN_FLIGHT.track_in_progress(chain=name):
+            try:
+                return get_chain(name).run(input_data)
+            except CONNECTION_ERRORS as e:
+                logger.warning(f"Gemini connection error, rebuilding client: {str(e)}")
+                reset_report_chain()
+                return get_chain(name).run(input_data)
+
+    return governor.call(call, key=call_key(name, input_data))
+
+def run_report_chain(input_data: Dict[str, Any], on_token: Optional[Callable[[str], None]] = None) -> str:
+    """
+    Run the shared report chain, rebuilding the client once if the connection broke.
+    When `on_token` is given the report is streamed through it.
+    """
+    emitted = []
+
+    def track(text: str):
+        emitted.append(text)
+        on_token(text)
+
+    if on_token is None:
+        return run_chain("report", input_data)
+
+    try:
+        return stream_report_chain(input_data, track)
+    except CONNECTION_ERRORS as e:
+        if emitted:
+            raise  # Part of the report was already streamed; let the caller retry
+        logger.warning(f"Gemini connection error, rebuilding client: {str(e)}")
+        reset_report_chain()
+        return stream_report_chain(input_data, track)
+
+def generate_section(title: str, input_data: Dict[str, Any]) -> str:
+    """
+    Write one report section, retrying just this section if it fails. Rate
+    limiting is not retried here: the governor has already waited for it.
+
+    Returns:
+        str: The section body, without its heading.
+    """
+    for attempt in range(SECTION_MAX_RETRIES + 1):
+        try:
+            text = run_chain("section", input_data).strip()
+            heading, _, body = text.partition("\n")
+            if heading.startswith("#") and title.lower() in heading.lower():
+                text = body.strip()  # The model repeated the heading the report adds
+            return text
+        except LLMRateLimited:
+            raise
+        except Exception as e:
+            if attempt == SECTION_MAX_RETRIES:
+                raise
+            logger.warning(f"Section '{title}' failed (attempt {attempt + 1}), retrying: {str(e)}")
+            time.sleep(SECTION_RETRY_DELAY * 2 ** attempt)
+
+def run_sectioned_report(input_data: Dict[str, Any], on_token: Optional[Callable[[str], None]] = None) -> str:
+    """
+    Generate the report section by section: one shared analysis of the input,
+    then every section in REPORT_SECTIONS written concurrently from it and
+    assembled in order. When `on_token` is given, each section is passed to it
+    as soon as it and all sections before it are done.
+
+    Returns:
+        str: The full generated report.
+    """
+    with timed("analysis"):
+        analysis = run_chain("analysis", input_data).strip()
+    shared, _ = build_prompt_input("section", {
+        "analysis": lambda limit: truncate_middle(analysis, limit),
+        "search_results": lambda limit: truncate_lines(input_data["search_results"], limit),
+        "keywords": lambda limit: truncate_lines(input_data["keywords"], limit),
+        "numeric_values": lambda limit: truncate_lines(input_data["numeric_values"], limit),
+    })
+    parts = []
+    executor = ThreadPoolExecutor(max_workers=max(1, SECTION_CONCURRENCY))
+    try:
+        futures = [
+            executor.submit(generate_section, title, {**shared, "title": title, "instructions": instructions})
+            for title, instructions in REPORT_SECTIONS
+        ]
+        with timed("sections"):
+            for number, ((title, _), future) in enumerate(zip(REPORT_SECTIONS, futures), start=1):
+                part = f"## {number}. {title}\n\n{future.result()}\n\n"
+                parts.append(part)
+                if on_token:
+                    on_token(part)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)  # A failed or cancelled report stops the rest
+    return "".join(parts).rstrip() + "\n"
+
+def report_cache_key(data: Any, compact_logs: bool = False) -> str:
+    """
+    Hash the normalized input together with the prompt version, model name,
+    report mode, prompt token budget and whether log compaction applies.
+    Whitespace-only differences in text and key order in form data map to the
+    same key.
+    """
+    if isinstance(data, str):
+        lines = data.replace("\r\n", "\n").strip().split("\n")
+        normalized = "\n".join(line.rstrip() for line in lines)
+    else:
+        normalized = json.dumps(
+            {key: value.strip() if isinstance(value, str) else value for key, value in data.items()},
+            sort_keys=True,
+        )
+    return hashlib.sha256(
+        f"{PROMPT_VERSION}\0{MODEL_NAME}\0{REPORT_MODE}\0{PROMPT_TOKEN_BUDGET}\0{int(compact_logs)}\0{normalized}".encode("utf-8")
+    ).hexdigest()
+
 def validate_data(data: Any) -> bool:
     """
     Validate the input data for report generation.
@@ -167,12 +685,19 @@ def validate_data(data: Any) -> bool:
         return False
     return True
 
-def generate_report(data: Any) -> str:
+def generate_report(data: Any, on_token: Optional[Callable[[str], None]] = None, use_cache: bool = True,
+                    compact_logs: bool = False) -> str:
     """
     Generate a cybersecurity report using Gemini LLM and LangChain.
     
     Args:
         data (Any): The raw file content or form data to generate the report from.
+        on_token (Callable[[str], None], optional): Streaming mode; called with each
+            chunk of the report as it is generated. It may raise GenerationCancelled.
+        use_cache (bool): Return a previously generated report for the same input
+            if one is cached. Pass False to force a fresh report.
+        compact_logs (bool): The text is a log file (see log_templates.is_log_file);
+            repetitive logs are sent as a template summary instead of verbatim.
     
     Returns:
         str: The generated report.
@@ -183,39 +708,80 @@ def generate_report(data: Any) -> str:
     try:
         if not validate_data(data):
             raise ValueError("Invalid input data.")
-        
-        llm = initialize_llm()
-        report_chain = create_report_chain(llm)
-        
-        # Extract keywords and numeric values from the input data
-        if isinstance(data, str):
-            keywords, numeric_values = extract_keywords_and_numeric_values(data)
-        elif isinstance(data, dict):
-            # For advanced form inputs, extract keywords and numeric values from the findings
-            findings = data.get("findings", "")
-            keywords, numeric_values = extract_keywords_and_numeric_values(findings)
-        else:
+
+        if not isinstance(data, (str, dict)):
             raise ValueError("Unsupported data type. Expected str or dict.")
+
+        source_text = data if isinstance(data, str) else data.get("findings", "")
+        metrics.REPORT_INPUT_CHARS.observe(len(source_text), source="text" if isinstance(data, str) else "form")
+        metrics.record(input_chars=len(source_text))
+
+        cache_key = report_cache_key(data, compact_logs)
+        if use_cache:
+            with timed("cache_lookup"):
+                cached = report_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"Report cache hit ({cache_key[:12]}).")
+                metrics.record(cache="hit")
+                if on_token:
+                    on_token(cached)
+                return cached
         
-        logger.info(f"Extracted keywords: {keywords}")
-        logger.info(f"Extracted numeric values: {numeric_values}")
-        
-        # Gather additional information from the web using scraping
-        search_query = f"Cybersecurity trends and insights related to: {', '.join(keywords)}"
-        search_results = scrape_google_search(search_query)
+        # Extract keywords and numeric values from the input data; for advanced
+        # form inputs, from the findings
+        with timed("keywords"):
+            keywords, numeric_values = extract_keywords_and_numeric_values(source_text)
         
-        # Wrap the data, search results, keywords, and numeric values in a dictionary
-        input_data = {
-            "data": data if isinstance(data, str) else str(data),  # Convert dict to string if necessary
-            "search_results": search_results,
-            "keywords": keywords,
-            "numeric_values": numeric_values,
-        }
+        # Gather additional information from the web with a few focused queries
+        with timed("search"):
+            search_results = search_enricher.enrich(build_queries(source_text, keywords, numeric_values))
         
+        # Repetitive log files are summarized as templates with counts instead of sent
+        # verbatim; form data is sent as labelled lines
+        prompt_data = data if isinstance(data, str) else format_form_data(data)
+        if isinstance(data, str) and compact_logs:
+            with timed("log_compaction"):
+                prompt_data = compact_log_text(data) or data
+
+        # Large inputs do not fit in one prompt: reduce them to their findings first
+        if estimate_tokens(prompt_data) > CHUNK_TOKEN_BUDGET:
+            with timed("findings_map"):
+                prompt_data = (
+                    "Findings extracted from a large input document, part by part:\n\n"
+                    + extract_findings(prompt_data)
+                )
+
+        # Fit the data, search results, keywords and numeric values into the prompt budget,
+        # shortening the least important fields first
+        input_data, prompt_tokens = build_prompt_input(
+            "analysis" if REPORT_MODE == 'sectioned' else "report",
+            {
+                "data": lambda limit: truncate_middle(prompt_data, limit),
+                "search_results": lambda limit: truncate_lines(search_results, limit),
+                "keywords": lambda limit: format_keywords(keywords, limit),
+                "numeric_values": lambda limit: format_entities(numeric_values, limit),
+            },
+        )
+
         # Generate the report using the LangChain
-        report = report_chain.run(input_data)
+        with timed("llm"):
+            if REPORT_MODE == 'sectioned':
+                report = run_sectioned_report(input_data, on_token)
+            else:
+                report = run_report_chain(input_data, on_token)
+        completion_tokens = estimate_tokens(report)
+        metrics.REPORT_TOKENS.observe(prompt_tokens, kind="prompt")
+        metrics.REPORT_TOKENS.observe(completion_tokens, kind="completion")
+        metrics.record(cache="miss", prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        report_cache.set(cache_key, report)
         logger.info("Report generated successfully.")
         return report
+    except GenerationCancelled:
+        logger.info("Report generation cancelled by the client.")
+        raise
+    except LLMRateLimited as e:
+        logger.warning(f"Report generation rate limited: {str(e)}")
+        raise
     except Exception as e:
         logger.error(f"Failed to generate report: {str(e)}")
         raise Exception(f"Failed to generate report: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,281 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, TypeVar
+
+from google.api_core import exceptions as google_exceptions
+
+from metrics import LLM_COALESCED, LLM_RETRIES, timed
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+QUOTA_ERRORS = (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests)
+QUOTA_MESSAGE_PATTERN = re.compile(r'\b429\b|quota|rate limit|resource has been exhausted', re.IGNORECASE)
+RETRY_DELAY_PATTERN = re.compile(r'retry[_ ]delay\s*\{\s*seconds:\s*(\d+)|retry in (\d+(?:\.\d+)?)\s*s', re.IGNORECASE)
+
+
+class LLMRateLimited(Exception):
+    """Gemini kept rejecting calls for quota, or no call slot became free in time."""
+
+
+def is_quota_error(exc: BaseException) -> bool:
+    """True if `exc` is Gemini signalling a rate limit or exhausted quota."""
+    return isinstance(exc, QUOTA_ERRORS) or bool(QUOTA_MESSAGE_PATTERN.search(str(exc)))
+
+
+def retry_delay_hint(exc: BaseException) -> Optional[float]:
+    """The delay the API asked for in a quota error, if any."""
+    match = RETRY_DELAY_PATTERN.search(str(exc))
+    if not match:
+        return None
+    return float(match.group(1) or match.group(2))
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket: `rate` calls per second on average, with
+    bursts of up to `burst` calls.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline: float) -> bool:
+        """Take one token, waiting until `deadline` (monotonic time) at most."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class FileSemaphore:
+    """
+    A semaphore shared by every process on the host: `slots` lock files in
+    `directory`, each held with an exclusive flock by at most one caller.
+    Locks are released by the OS if the holder dies.
+    """
+
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, directory: str, slots: int):
+        self.paths = [os.path.join(directory, f"slot-{index}.lock") for index in range(slots)]
+        os.makedirs(directory, exist_ok=True)
+
+    def acquire(self, deadline: float) -> Optional[int]:
+        """Lock a free slot; returns its file descriptor, or None at `deadline`."""
+        start = random.randrange(len(self.paths))  # Spread callers over the slots
+        while True:
+            for offset in range(len(self.paths)):
+                fd = os.open(self.paths[(start + offset) % len(self.paths)], os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return fd
+                except OSError:
+                    os.close(fd)
+            if time.monotonic() + self.POLL_INTERVAL > deadline:
+                return None
+            time.sleep(self.POLL_INTERVAL)
+
+    @staticmethod
+    def release(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key: the first caller runs the
+    call, and callers arriving while it runs wait for and share its result
+    (or its exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+
+    def do(self, key: str, fn: Callable[[], T]) -> T:
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            LLM_COALESCED.inc()
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+
+class LLMGovernor:
+    """
+    Gate every Gemini call: at most `max_concurrency` calls per process and,
+    optionally, `global_concurrency` per host (file locks in `lock_dir`), no
+    more than `rate_per_minute` call starts, exponential backoff with jitter
+    on quota errors, and single-flight coalescing of identical calls.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        global_concurrency: int = 0,
+        lock_dir: Optional[str] = None,
+        rate_per_minute: float = 0,
+        burst: int = 5,
+        max_retries: int = 5,
+        backoff_base: float = 2.0,
+        backoff_max: float = 60.0,
+        acquire_timeout: float = 600.0,
+    ):
+        """
+        Args:
+            max_concurrency: Calls in flight per process.
+            global_concurrency: Calls in flight across all processes on the host; 0 disables.
+            lock_dir: Directory for the cross-process slot files.
+            rate_per_minute: Average call starts per minute per process; 0 disables.
+            burst: Calls that may start at once when the rate limiter is full.
+            max_retries: Retries of a call rejected for quota.
+            backoff_base: Delay before the first retry, doubled on each retry.
+            backoff_max: Longest delay between retries.
+            acquire_timeout: Seconds a call may wait for a slot before failing.
+        """
+        self.semaphore = threading.BoundedSemaphore(max(1, max_concurrency))
+        self.file_semaphore = None
+        if global_concurrency > 0:
+            if fcntl is None:
+                logger.warning("Cross-process LLM limit needs fcntl; only the per-process limit applies.")
+            else:
+                self.file_semaphore = FileSemaphore(lock_dir, global_concurrency)
+        self.bucket = TokenBucket(rate_per_minute / 60.0, burst) if rate_per_minute > 0 else None
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.acquire_timeout = acquire_timeout
+        self.single_flight = SingleFlight()
+
+    @contextmanager
+    def slot(self):
+        """Hold a call slot: the process semaphore, a host-wide slot and a rate token."""
+        deadline = time.monotonic() + self.acquire_timeout
+        with timed("llm_wait"):
+            if not self.semaphore.acquire(timeout=self.acquire_timeout):
+                raise LLMRateLimited(f"No Gemini call slot free after {self.acquire_timeout:.0f}s")
+            fd = None
+            try:
+                if self.file_semaphore is not None:
+                    fd = self.file_semaphore.acquire(deadline)
+                    if fd is None:
+                        raise LLMRateLimited(f"No host-wide Gemini call slot free after {self.acquire_timeout:.0f}s")
+                if self.bucket is not None and not self.bucket.acquire(deadline):
+                    raise LLMRateLimited(f"Gemini call rate limit not cleared after {self.acquire_timeout:.0f}s")
+            except BaseException:
+                if fd is not None:
+                    FileSemaphore.release(fd)
+                self.semaphore.release()
+                raise
+        try:
+            yield
+        finally:
+            if fd is not None:
+                FileSemaphore.release(fd)
+            self.semaphore.release()
+
+    def backoff(self, attempt: int, exc: BaseException) -> float:
+        """Seconds to wait before retry `attempt` (0-based): the API's hint or full-jitter backoff."""
+        hint = retry_delay_hint(exc)
+        ceiling = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        if hint is not None:
+            return min(self.backoff_max, hint) + random.uniform(0, self.backoff_base)
+        return random.uniform(ceiling / 2, ceiling)
+
+    def call(self, fn: Callable[[], T], key: Optional[str] = None,
+             can_retry: Callable[[], bool] = lambda: True) -> T:
+        """
+        Run `fn` under the governor.
+
+        Args:
+            fn: The Gemini call.
+            key: Identifies the call's inputs; concurrent calls with the same key
+                share one upstream call. None disables coalescing.
+            can_retry: Checked before retrying a quota error, e.g. to stop once a
+                streamed response has been partly delivered.
+
+        Returns:
+            The result of `fn`.
+
+        Raises:
+            LLMRateLimited: If quota errors persist after all retries, or no slot
+                became free in time.
+        """
+        if key is not None:
+            return self.single_flight.do(key, lambda: self._call_with_backoff(fn, can_retry))
+        return self._call_with_backoff(fn, can_retry)
+
+    def _call_with_backoff(self, fn: Callable[[], T], can_retry: Callable[[], bool]) -> T:
+        for attempt in range(self.max_retries + 1):
+            with self.slot():
+                try:
+                    return fn()
+                except Exception as e:
+                    if not is_quota_error(e):
+                        raise
+                    if attempt == self.max_retries or not can_retry():
+                        raise LLMRateLimited(
+                            f"Gemini is rate limiting requests, please try again shortly ({str(e)})"
+                        ) from e
+                    error = e
+            delay = self.backoff(attempt, error)  # Waited outside the slot so other calls can proceed
+            LLM_RETRIES.inc(reason="quota")
+            logger.warning(f"Gemini quota error, retrying in {delay:.1f}s (attempt {attempt + 1}): {str(error)}")
+            time.sleep(delay)
+
+
+def call_key(*parts) -> str:
+    """A single-flight key for a call with these inputs."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
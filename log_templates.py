@@ -0,0 +1,250 @@
+import io
+import logging
+import os
+import re
+from typing import Dict, Iterable, List, Optional
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PARAM = "<*>"
+
+LOG_COMPACT_MIN_LINES = int(os.getenv('LOG_COMPACT_MIN_LINES', 200))  # Shorter inputs are sent verbatim
+LOG_COMPACT_MAX_RATIO = float(os.getenv('LOG_COMPACT_MAX_RATIO', 0.5))  # Templates per line needed to compact
+LOG_SUMMARY_MAX_TEMPLATES = int(os.getenv('LOG_SUMMARY_MAX_TEMPLATES', 200))
+# Share of lines that may fall in templates whose wildcards absorbed many distinct words
+LOG_COMPACT_MAX_LOSSY = float(os.getenv('LOG_COMPACT_MAX_LOSSY', 0.1))
+LOG_FILE_EXTENSIONS = ('log', 'txt')  # Uploads whose text is considered for compaction
+
+TIMESTAMP_PATTERN = re.compile(
+    r'^\s*[\[(]?('
+    r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?'  # ISO 8601
+    r'|[A-Z][a-z]{2} +\d{1,2} \d{2}:\d{2}:\d{2}'  # syslog
+    r'|\d{2}/[A-Z][a-z]{2}/\d{4}:\d{2}:\d{2}:\d{2}(?: [+-]\d{4})?'  # Apache/Nginx access log
+    r')[\])]?\s*'
+)
+VARIABLE_PATTERN = re.compile(
+    r'^(?:'
+    r'[\[(<"\']*(?:\d{1,3}\.){3}\d{1,3}(?::\d+)?[\])>"\',;]*'  # IPv4 with optional port
+    r'|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}'  # UUID
+    r'|(?:0x)?[0-9a-f]{8,}'  # Hex ids and hashes
+    r'|[\[(<"\']*[-+]?\d+(?:[.:,/]\d+)*[a-z%]{0,3}[\])>"\',;]*'  # Numbers, sizes, durations, times
+    r'|\S*=\S*\d\S*'  # key=value pairs with numeric values
+    r')$',
+    re.IGNORECASE,
+)
+
+
+def is_log_file(filename: str) -> bool:
+    """True if an upload with this name holds log text worth compacting."""
+    return '.' in filename and filename.rsplit('.', 1)[-1].lower() in LOG_FILE_EXTENSIONS
+
+
+class LogCluster:
+    """
+    A log template with its occurrence count, first/last-seen timestamps and
+    a few sample values for each parameter position. It also tracks how many
+    distinct words (tokens without digits) each wildcard has absorbed: a
+    wildcard standing for many different words, such as finding or service
+    names, hides content the summary cannot show.
+    """
+
+    MAX_SAMPLES = 3
+    MAX_WORD_VALUES = 20  # Distinct words a wildcard may absorb before the template is lossy
+
+    __slots__ = ("template", "count", "first_seen", "last_seen", "samples", "words", "lossy")
+
+    def __init__(self, tokens: List[str], timestamp: Optional[str]):
+        self.template = list(tokens)
+        self.count = 0
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.samples: Dict[int, List[str]] = {}
+        self.words: Dict[int, set] = {}
+        self.lossy = False
+
+    def similarity(self, tokens: List[str]) -> float:
+        matches = sum(1 for ours, theirs in zip(self.template, tokens) if ours == theirs or ours == PARAM)
+        return matches / len(tokens)
+
+    def add(self, tokens: List[str], raw: List[str], timestamp: Optional[str]):
+        self.count += 1
+        for position, (ours, theirs) in enumerate(zip(self.template, tokens)):
+            if ours != theirs and ours != PARAM:
+                self.template[position] = PARAM
+        for position, token in enumerate(self.template):
+            if token == PARAM:
+                samples = self.samples.setdefault(position, [])
+                if len(samples) < self.MAX_SAMPLES and raw[position] not in samples:
+                    samples.append(raw[position])
+                if tokens[position] != PARAM and not self.lossy and not any(c.isdigit() for c in raw[position]):
+                    words = self.words.setdefault(position, set())
+                    words.add(raw[position])
+                    if len(words) > self.MAX_WORD_VALUES:
+                        self.lossy = True
+                        self.words.clear()
+        if timestamp:
+            self.first_seen = self.first_seen or timestamp
+            self.last_seen = timestamp
+
+
+class LogTemplateMiner:
+    """
+    Cluster log lines into templates in a single streaming pass, in the style
+    of Drain: lines are routed through a fixed-depth tree keyed on their token
+    count and first token, then matched against the clusters in that leaf by
+    token similarity. Variable-looking tokens (IPs, numbers, ids) are masked
+    before matching, and first tokens containing digits share one branch.
+
+    Per-line cost is bounded: lines whose masked tokens were seen before are
+    looked up directly, and a leaf holds at most `max_leaf_clusters` templates.
+    Lines that fit no template once a limit is reached are counted in
+    `unmatched` and `capped` is set.
+    """
+
+    MAX_EXACT_ENTRIES = 50000  # Masked lines remembered for the direct lookup
+
+    def __init__(self, similarity_threshold: float = 0.5, max_children: int = 100, max_clusters: int = 5000,
+                 max_leaf_clusters: int = 100):
+        """
+        Args:
+            similarity_threshold: Fraction of matching tokens needed to join a cluster.
+            max_children: Maximum number of first-token branches per token count.
+            max_clusters: Upper bound on the number of templates kept in memory.
+            max_leaf_clusters: Upper bound on the templates compared with each line.
+        """
+        self.similarity_threshold = similarity_threshold
+        self.max_children = max_children
+        self.max_clusters = max_clusters
+        self.max_leaf_clusters = max_leaf_clusters
+        self.tree: Dict[int, Dict[str, List[LogCluster]]] = {}
+        self.clusters: List[LogCluster] = []
+        self._exact: Dict[tuple, LogCluster] = {}
+        self.lines = 0
+        self.unmatched = 0
+        self.capped = False
+
+    @staticmethod
+    def _mask(token: str) -> str:
+        return PARAM if VARIABLE_PATTERN.match(token) else token
+
+    def add_line(self, line: str) -> None:
+        line = line.strip()
+        if not line:
+            return
+        self.lines += 1
+
+        timestamp = None
+        match = TIMESTAMP_PATTERN.match(line)
+        if match:
+            timestamp = match.group(1)
+            line = line[match.end():]
+        raw = line.split()
+        if not raw:
+            return
+        tokens = [self._mask(token) for token in raw]
+        masked = tuple(tokens)
+        cluster = self._exact.get(masked)
+        if cluster is not None:
+            cluster.add(tokens, raw, timestamp)
+            return
+
+        branches = self.tree.setdefault(len(tokens), {})
+        key = tokens[0]
+        if any(char.isdigit() for char in key) or (key not in branches and len(branches) >= self.max_children):
+            key = PARAM
+        leaf = branches.setdefault(key, [])
+
+        best, best_similarity = None, 0.0
+        for cluster in leaf:
+            similarity = cluster.similarity(tokens)
+            if similarity > best_similarity:
+                best, best_similarity = cluster, similarity
+        if best is None or best_similarity < self.similarity_threshold:
+            if len(self.clusters) >= self.max_clusters or len(leaf) >= self.max_leaf_clusters:
+                self.unmatched += 1
+                self.capped = True
+                return
+            best = LogCluster(tokens, timestamp)
+            leaf.append(best)
+            self.clusters.append(best)
+        best.add(tokens, raw, timestamp)
+        if len(self._exact) >= self.MAX_EXACT_ENTRIES:
+            self._exact.clear()
+        self._exact[masked] = best
+
+    def add_lines(self, lines: Iterable[str]) -> "LogTemplateMiner":
+        for line in lines:
+            self.add_line(line)
+        return self
+
+    def lossy_lines(self) -> int:
+        """Lines in templates whose wildcards absorbed too many distinct words to summarize."""
+        return sum(cluster.count for cluster in self.clusters if cluster.lossy)
+
+    def summary(self, max_templates: int = LOG_SUMMARY_MAX_TEMPLATES) -> str:
+        """
+        Render the templates, most frequent first, as compact text for the report prompt.
+        """
+        clusters = sorted(self.clusters, key=lambda cluster: -cluster.count)
+        lines = [f"Log summary: {self.lines} lines clustered into {len(clusters)} templates ({PARAM} marks a variable field)."]
+        for cluster in clusters[:max_templates]:
+            seen = ""
+            if cluster.first_seen:
+                seen = f" first={cluster.first_seen} last={cluster.last_seen}"
+            lines.append(f"[count={cluster.count}{seen}] {' '.join(cluster.template)}")
+            if cluster.samples:
+                params = " | ".join(
+                    f"#{index}: {', '.join(values)}"
+                    for index, (_, values) in enumerate(sorted(cluster.samples.items()), start=1)
+                )
+                lines.append(f"    samples {params}")
+        remaining = clusters[max_templates:]
+        if remaining:
+            lines.append(f"... {len(remaining)} rarer templates covering {sum(c.count for c in remaining)} lines omitted.")
+        if self.unmatched:
+            lines.append(f"... {self.unmatched} lines did not fit any template and were omitted.")
+        lossy = [cluster for cluster in clusters[:max_templates] if cluster.lossy]
+        if lossy:
+            lines.append(f"... {sum(c.count for c in lossy)} lines fall in templates whose {PARAM} fields "
+                         f"take many distinct values; only samples are shown.")
+        return "\n".join(lines)
+
+
+def compact_log_text(text: str) -> Optional[str]:
+    """
+    Replace repetitive log text with its template summary. Mining stops early
+    once the text proves too varied, so non-repetitive input costs little.
+
+    Returns:
+        Optional[str]: The summary, or None if the text is too short, not
+        repetitive enough, or would lose content: lines left out because a
+        template limit was reached, more templates than the summary shows, or
+        many lines in templates whose wildcards stand for many distinct words.
+    """
+    miner = LogTemplateMiner()
+    for line in io.StringIO(text):
+        miner.add_line(line)
+        if miner.capped or miner.unmatched:
+            logger.info(f"Not compacting log: template limit reached after {miner.lines} lines.")
+            return None
+        if len(miner.clusters) > LOG_SUMMARY_MAX_TEMPLATES:
+            # The summary would omit the rarest templates, the lines that matter most
+            logger.info(f"Not compacting log: more than {LOG_SUMMARY_MAX_TEMPLATES} templates "
+                        f"after {miner.lines} lines.")
+            return None
+        if miner.lines >= LOG_COMPACT_MIN_LINES and miner.lines % 1000 == 0 \
+                and len(miner.clusters) > miner.lines * LOG_COMPACT_MAX_RATIO:
+            return None  # Too varied already; the rest will not change that much
+    if miner.lines < LOG_COMPACT_MIN_LINES or len(miner.clusters) > miner.lines * LOG_COMPACT_MAX_RATIO:
+        return None
+    lossy = miner.lossy_lines()
+    if lossy > miner.lines * LOG_COMPACT_MAX_LOSSY:
+        logger.info(f"Not compacting log: {lossy} of {miner.lines} lines fall in templates "
+                    f"that hide many distinct values.")
+        return None
+    summary = miner.summary()
+    logger.info(f"Compacted {miner.lines} log lines into {len(miner.clusters)} templates "
+                f"({len(text)} -> {len(summary)} characters).")
+    return summary
@@ -0,0 +1,233 @@
+import bisect
+import contextvars
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+SIZE_BUCKETS = tuple(256 * 4 ** power for power in range(10))  # 256 characters to 64M
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Metric(ABC):
+    """
+    A named metric with a fixed set of label names. Each distinct combination
+    of label values is a separate series. Updates take one short lock.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    @abstractmethod
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._series.get(self._key(labels), 0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            series = list(self._series.items())
+        for key, value in series:
+            yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._series[self._key(labels)] = value
+
+    @contextmanager
+    def track_in_progress(self, **labels):
+        """Increment the gauge for the duration of the block."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][position] += 1  # Per-bucket counts, made cumulative when rendered
+            series[1] += value
+            series[2] += 1
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            series = [(key, (list(counts), total, count)) for key, (counts, total, count) in self._series.items()]
+        for key, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.label_names, key)} {count}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "cyberapp_stage_duration_seconds", "Time spent in each report pipeline stage.", labels=("stage",)))
+STAGE_ERRORS = REGISTRY.register(Counter(
+    "cyberapp_stage_errors_total", "Pipeline stages that raised an error.", labels=("stage",)))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "cyberapp_cache_requests_total", "Cache lookups by cache and outcome.", labels=("cache", "outcome")))
+LLM_IN_FLIGHT = REGISTRY.register(Gauge(
+    "cyberapp_llm_calls_in_flight", "Gemini calls currently running.", labels=("chain",)))
+LLM_RETRIES = REGISTRY.register(Counter(
+    "cyberapp_llm_retries_total", "Gemini calls retried after backoff, by reason.", labels=("reason",)))
+LLM_COALESCED = REGISTRY.register(Counter(
+    "cyberapp_llm_coalesced_total", "Gemini calls served by an identical call already in flight."))
+REPORT_INPUT_CHARS = REGISTRY.register(Histogram(
+    "cyberapp_report_input_characters", "Size of report inputs in characters.", labels=("source",),
+    buckets=SIZE_BUCKETS))
+REPORT_TOKENS = REGISTRY.register(Histogram(
+    "cyberapp_report_tokens", "Estimated tokens per report call.", labels=("kind",), buckets=SIZE_BUCKETS))
+REPORT_JOBS = REGISTRY.register(Counter(
+    "cyberapp_report_jobs_total", "Finished report jobs by outcome.", labels=("outcome",)))
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "cyberapp_http_requests_total", "HTTP requests by endpoint and status.", labels=("endpoint", "method", "status")))
+HTTP_SECONDS = REGISTRY.register(Histogram(
+    "cyberapp_http_request_duration_seconds", "HTTP request handling time.", labels=("endpoint", "method")))
+
+# The trace of the request or job running in this context, logged as one line when it ends
+_current_trace: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("trace", default=None)
+
+
+def start_trace(event: str, **fields) -> contextvars.Token:
+    trace = {"event": event, **fields, "stages": {}, "_started": time.perf_counter()}
+    return _current_trace.set(trace)
+
+
+def record(**fields) -> None:
+    """Add fields to the current trace, if any."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.update(fields)
+
+
+def finish_trace(token: contextvars.Token, **fields) -> Optional[dict]:
+    """End the current trace and log it as one JSON line."""
+    trace = _current_trace.get()
+    try:
+        _current_trace.reset(token)
+    except ValueError:  # Finished from a different context, e.g. after a streamed response
+        pass
+    if trace is None:
+        return None
+    trace.update(fields)
+    trace["duration"] = round(time.perf_counter() - trace.pop("_started"), 4)
+    logger.info(json.dumps(trace, default=str, separators=(",", ":")))
+    return trace
+
+
+@contextmanager
+def trace(event: str, **fields):
+    """Trace a block; its status is "error" if it raises."""
+    token = start_trace(event, **fields)
+    status = "error"
+    try:
+        yield
+        status = "ok"
+    finally:
+        finish_trace(token, status=status)
+
+
+@contextmanager
+def timed(stage: str):
+    """
+    Time a pipeline stage into the stage histogram and the current trace,
+    counting an error if the block raises.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        trace = _current_trace.get()
+        if trace is not None:
+            stages = trace["stages"]
+            stages[stage] = round(stages.get(stage, 0) + elapsed, 4)
@@ -0,0 +1,143 @@
+import glob
+import hashlib
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Optional
+
+from pdf_utils import PDF_RENDERER_VERSION, CyberSecurityReport
+from metrics import CACHE_REQUESTS, timed
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PDF_CACHE_MAX_BYTES = int(os.getenv('PDF_CACHE_MAX_MB', 1024)) * 1024 * 1024  # 0 for no limit
+
+
+class PdfCache:
+    """
+    Rendered report PDFs stored on disk, keyed on the report id and a hash of
+    everything that goes into the PDF, including the renderer version. A
+    changed report or renderer therefore never serves a stale file, and
+    deleting a report evicts all of its files. Past `max_bytes` the least
+    recently used PDFs are removed; they are rendered again when requested.
+    """
+
+    def __init__(self, directory: str, workers: int = 1, max_bytes: int = PDF_CACHE_MAX_BYTES):
+        """
+        Args:
+            directory: Folder the rendered PDFs are written to.
+            workers: Threads used for background pre-rendering.
+            max_bytes: Size of the cache folder above which old PDFs are removed; 0 for no limit.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="pdf-render")
+
+    @staticmethod
+    def content_hash(title: str, content: str, created_at: str) -> str:
+        digest = hashlib.sha256()
+        for part in (PDF_RENDERER_VERSION, title, content, created_at):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()[:16]
+
+    def path_for(self, report_id: int, title: str, content: str, created_at: str) -> str:
+        return os.path.join(self.directory, f"{report_id}-{self.content_hash(title, content, created_at)}.pdf")
+
+    def get(self, report_id: int, title: str, content: str, created_at: str) -> Optional[str]:
+        """Return the path of the cached PDF, or None on a miss."""
+        path = self.path_for(report_id, title, content, created_at)
+        try:
+            os.utime(path)  # Marks the PDF recently used for eviction
+        except OSError:
+            return None
+        return path
+
+    def render(self, report_id: int, title: str, content: str, created_at: str) -> str:
+        """
+        Render the PDF, store it atomically and return its path.
+        """
+        path = self.path_for(report_id, title, content, created_at)
+        with timed("pdf_render"):
+            pdf_buffer = CyberSecurityReport().generate(title=title, content=content, created_at=created_at)
+        handle, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as temp_file:
+                temp_file.write(pdf_buffer.getvalue())
+            os.replace(temp_path, path)  # Readers never see a partially written file
+        except Exception:
+            os.remove(temp_path)
+            raise
+        if self.max_bytes:
+            self._evict_to_limit(keep=path)
+        return path
+
+    def _evict_to_limit(self, keep: Optional[str] = None) -> None:
+        """
+        Remove the least recently used PDFs until the folder is within max_bytes.
+        `keep`, the PDF just rendered, is never removed, even if it alone is larger.
+        """
+        entries = []
+        for path in glob.glob(os.path.join(self.directory, "*.pdf")):
+            if path == keep:
+                continue
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        if keep is not None and os.path.exists(keep):
+            total += os.path.getsize(keep)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # Removed by another process
+            total -= size
+
+    def get_or_render(self, report_id: int, title: str, content: str, created_at: str) -> str:
+        """Return the cached PDF path, rendering it synchronously on a miss."""
+        path = self.get(report_id, title, content, created_at)
+        CACHE_REQUESTS.inc(cache="pdf", outcome="hits" if path else "misses")
+        if path is None:
+            logger.info(f"PDF cache miss for report {report_id}, rendering.")
+            path = self.render(report_id, title, content, created_at)
+        return path
+
+    def open(self, report_id: int, title: str, content: str, created_at: str) -> BinaryIO:
+        """
+        Open the cached PDF, rendering it on a miss. A PDF evicted by another
+        process between the lookup and the open is rendered again; once open,
+        the file stays readable even if it is removed.
+        """
+        try:
+            return open(self.get_or_render(report_id, title, content, created_at), "rb")
+        except FileNotFoundError:
+            logger.info(f"PDF for report {report_id} was evicted before it was read, rendering again.")
+            return open(self.render(report_id, title, content, created_at), "rb")
+
+    def prerender(self, report_id: int, title: str, content: str, created_at: str) -> None:
+        """Render the PDF in the background so the first download is served from the cache."""
+        def task():
+            try:
+                if self.get(report_id, title, content, created_at) is None:
+                    self.render(report_id, title, content, created_at)
+            except Exception as e:
+                logger.error(f"Background PDF render failed for report {report_id}: {str(e)}")
+
+        self._executor.submit(task)
+
+    def evict(self, report_id: int) -> None:
+        """Remove every cached PDF of a report."""
+        for path in glob.glob(os.path.join(self.directory, f"{report_id}-*.pdf")):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
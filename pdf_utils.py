@@ -1,102 +1,205 @@
+import functools
+import html
+import os
+import re
+import threading
 from io import BytesIO
+from types import MappingProxyType
+from typing import List, Optional
+from xml.etree.ElementTree import Element
+
+import reportlab
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
 from reportlab.platypus import (
-    SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, 
-    PageTemplate, Frame, PageBreak, ListFlowable, ListItem, Image
+    SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle,
+    PageTemplate, Frame, PageBreak, ListFlowable, ListItem, Image, Preformatted
 )
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
 from reportlab.pdfgen.canvas import Canvas
 from reportlab.lib.colors import HexColor
 import markdown
-from bs4 import BeautifulSoup
+from markdown import util as markdown_util
+
+ACCENT_COLOR = HexColor('#2c3e50')
+SECONDARY_COLOR = HexColor('#e74c3c')
+# Part of the PDF cache key: bump whenever the rendered output changes (layout, styles)
+# so PDFs produced by an older renderer are not served
+PDF_RENDERER_VERSION = f"3:reportlab-{reportlab.Version}"
+LOGO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'imgs', 'detective.png')
+
+THREAT_COLORS = {
+    'critical': HexColor('#e74c3c'),
+    'high': HexColor('#e67e22'),
+    'medium': HexColor('#f1c40f'),
+    'low': HexColor('#2ecc71')
+}
+HEADING_STYLES = {
+    'h1': 'SectionHeader',
+    'h2': 'SubsectionHeader',
+    'h3': 'RecommendationHeader',
+    'h4': 'RecommendationHeader',
+    'h5': 'RecommendationHeader',
+    'h6': 'RecommendationHeader',
+}
+INLINE_TAGS = {
+    'strong': ('<b>', '</b>'),
+    'b': ('<b>', '</b>'),
+    'em': ('<i>', '</i>'),
+    'i': ('<i>', '</i>'),
+    'code': ('<font face="Courier">', '</font>'),
+}
+TABLE_WIDTH = 450
+TAG_PATTERN = re.compile(r'<[^>]+>')
+
+
+def _define_styles():
+    """
+    Build the report style sheet. Called once per process; the result is
+    shared read-only by every render.
+    """
+    styles = getSampleStyleSheet()
+    custom = {
+        'CoverTitle': ParagraphStyle(
+            name='CoverTitle',
+            fontSize=32,
+            textColor=ACCENT_COLOR,
+            alignment=TA_CENTER,
+            fontName='Helvetica-Bold',
+            spaceAfter=15,
+            leading=34
+        ),
+        'SectionHeader': ParagraphStyle(
+            name='SectionHeader',
+            fontSize=18,
+            textColor=SECONDARY_COLOR,
+            alignment=TA_LEFT,
+            fontName='Helvetica-Bold',
+            spaceBefore=20,
+            spaceAfter=12,
+            leftIndent=10
+        ),
+        'SubsectionHeader': ParagraphStyle(
+            name='SubsectionHeader',
+            fontSize=14,
+            textColor=ACCENT_COLOR,
+            alignment=TA_LEFT,
+            fontName='Helvetica-Bold',
+            spaceBefore=15,
+            spaceAfter=8,
+            leftIndent=20
+        ),
+        'BodyText': ParagraphStyle(
+            name='BodyText',
+            fontSize=14,
+            textColor=HexColor('#444'),
+            alignment=TA_JUSTIFY,
+            fontName='Helvetica',
+            leading=18,
+            spaceAfter=12
+        ),
+        'BulletPoint': ParagraphStyle(
+            name='BulletPoint',
+            fontSize=12,
+            textColor=HexColor('#444'),
+            alignment=TA_LEFT,
+            fontName='Helvetica',
+            leftIndent=25,
+            spaceAfter=6
+        ),
+        'RecommendationHeader': ParagraphStyle(
+            name='RecommendationHeader',
+            fontSize=13,
+            textColor=HexColor('#2c3e50'),
+            alignment=TA_LEFT,
+            fontName='Helvetica-Bold',
+            spaceBefore=15,
+            spaceAfter=8,
+            leftIndent=10
+        )
+    }
+
+    by_name = dict(styles.byName)
+    for name, style in custom.items():
+        by_name.setdefault(name, style)  # The sample sheet's BodyText stays in use, as it always has
+    return MappingProxyType(by_name)
+
+
+STYLES = _define_styles()
+
+
+@functools.lru_cache(maxsize=1)
+def _logo_reader() -> ImageReader:
+    """Load and decode the cover logo once per process."""
+    with open(LOGO_PATH, 'rb') as logo_file:
+        return ImageReader(BytesIO(logo_file.read()))
+
+
+class PreloadedImage(Image):
+    """
+    An Image flowable drawing a shared, already decoded ImageReader instead
+    of re-reading and re-decoding its file for every document.
+    """
+
+    def __init__(self, reader: ImageReader, width: float, height: float):
+        self._img = reader
+        super().__init__(BytesIO(), width=width, height=height)
+
+
+_markdown_local = threading.local()
+
+
+def _markdown() -> markdown.Markdown:
+    """Return this thread's Markdown instance; instances are not thread-safe."""
+    md = getattr(_markdown_local, 'md', None)
+    if md is None:
+        md = markdown.Markdown(extensions=['tables'])
+        md.treeprocessors.deregister('prettify')  # Only adds whitespace for serialization
+        _markdown_local.md = md
+    return md
+
+
+def parse_markdown(content: str) -> Element:
+    """
+    Parse Markdown into python-markdown's element tree, running the same
+    preprocessors and tree processors as `markdown.markdown` but skipping
+    HTML serialization.
+    """
+    md = _markdown()
+    md.reset()
+    lines = content.split('\n')
+    for preprocessor in md.preprocessors:
+        lines = preprocessor.run(lines)
+    root = md.parser.parseDocument(lines).getroot()
+    for treeprocessor in md.treeprocessors:
+        new_root = treeprocessor.run(root)
+        if new_root is not None:
+            root = new_root
+    return root
+
 
 class CyberSecurityReport:
     def __init__(self):
         self.buffer = BytesIO()
         self.pagesize = letter
-        self.styles = getSampleStyleSheet()
-        self.accent_color = HexColor('#2c3e50')
-        self.secondary_color = HexColor('#e74c3c')
-        self._define_styles()
-        
-    def _define_styles(self):
-        styles = {
-            'CoverTitle': ParagraphStyle(
-                name='CoverTitle',
-                fontSize=32,
-                textColor=self.accent_color,
-                alignment=TA_CENTER,
-                fontName='Helvetica-Bold',
-                spaceAfter=15,
-                leading=34
-            ),
-            'SectionHeader': ParagraphStyle(
-                name='SectionHeader',
-                fontSize=18,
-                textColor=self.secondary_color,
-                alignment=TA_LEFT,
-                fontName='Helvetica-Bold',
-                spaceBefore=20,
-                spaceAfter=12,
-                leftIndent=10
-            ),
-            'SubsectionHeader': ParagraphStyle(
-                name='SubsectionHeader',
-                fontSize=14,
-                textColor=self.accent_color,
-                alignment=TA_LEFT,
-                fontName='Helvetica-Bold',
-                spaceBefore=15,
-                spaceAfter=8,
-                leftIndent=20
-            ),
-            'BodyText': ParagraphStyle(
-                name='BodyText',
-                fontSize=14,
-                textColor=HexColor('#444'),
-                alignment=TA_JUSTIFY,
-                fontName='Helvetica',
-                leading=18,
-                spaceAfter=12
-            ),
-            'BulletPoint': ParagraphStyle(
-                name='BulletPoint',
-                fontSize=12,
-                textColor=HexColor('#444'),
-                alignment=TA_LEFT,
-                fontName='Helvetica',
-                leftIndent=25,
-                spaceAfter=6
-            ),
-            'RecommendationHeader': ParagraphStyle(
-                name='RecommendationHeader',
-                fontSize=13,
-                textColor=HexColor('#2c3e50'),
-                alignment=TA_LEFT,
-                fontName='Helvetica-Bold',
-                spaceBefore=15,
-                spaceAfter=8,
-                leftIndent=10
-            )
-        }
-
-        for name, style in styles.items():
-            if name not in self.styles.byName:
-                self.styles.add(style)
+        self.styles = STYLES
+        self.accent_color = ACCENT_COLOR
+        self.secondary_color = SECONDARY_COLOR
+        self._stash = []
 
     def _header_footer(self, canvas: Canvas, doc):
         if doc.page == 1:  # Skip header/footer for cover page
             return
-        
+
         canvas.saveState()
         # Header
         canvas.setStrokeColor(self.accent_color)
         canvas.setLineWidth(1)
         canvas.line(50, 750, 550, 750)
-        
+
         # Footer
         canvas.setFont('Helvetica-Oblique', 9)
         canvas.setFillColor(HexColor('#666'))
@@ -108,17 +211,17 @@ class CyberSecurityReport:
         cover = []
         # Vertical centering with logo
         cover.append(Spacer(1, 1.2*inch))
-        
+
         # Add centered logo
-        logo = Image('static/imgs/detective.png', width=3.5*inch, height=3.5*inch)
+        logo = PreloadedImage(_logo_reader(), width=3.5*inch, height=3.5*inch)
         logo.hAlign = 'CENTER'
         cover.append(logo)
         cover.append(Spacer(1, 0.4*inch))
-        
+
         # Report title
-        title_paragraph = Paragraph(title, self.styles['CoverTitle'])
+        title_paragraph = Paragraph(html.escape(title, quote=False), self.styles['CoverTitle'])
         cover.append(title_paragraph)
-        
+
         # Decorative line
         cover.append(Spacer(1, 0.3*inch))
         line = Table([[""]], colWidths=[5*inch], rowHeights=[2])
@@ -126,22 +229,16 @@ class CyberSecurityReport:
             ('LINEABOVE', (0,0), (-1,-1), 2, self.secondary_color),
         ]))
         cover.append(line)
-        
+
         cover.append(Spacer(1, 1.5*inch))
         cover.append(PageBreak())
         return cover
 
     def _create_threat_indicator(self, level):
-        threat_colors = {
-            'critical': HexColor('#e74c3c'),
-            'high': HexColor('#e67e22'),
-            'medium': HexColor('#f1c40f'),
-            'low': HexColor('#2ecc71')
-        }
         return Table(
             [[level.upper()]],
             style=[
-                ('BACKGROUND', (0,0), (0,0), threat_colors[level.lower()]),
+                ('BACKGROUND', (0,0), (0,0), THREAT_COLORS[level.lower()]),
                 ('TEXTCOLOR', (0,0), (0,0), colors.white),
                 ('BOX', (0,0), (-1,-1), 1, colors.black),
                 ('ROUNDEDCORNERS', [5]),
@@ -151,67 +248,127 @@ class CyberSecurityReport:
             rowHeights=20
         )
 
-    def _process_content(self, html_content):
+    def _unstash(self, match) -> str:
+        """Replace a raw HTML placeholder with the escaped text of that HTML."""
+        raw = self._stash[int(match.group(1))]
+        return html.escape(html.unescape(TAG_PATTERN.sub('', str(raw))), quote=False)
+
+    def _text(self, text: Optional[str], escaped: bool = False) -> str:
+        """Convert tree text into Paragraph markup. Code text is already escaped by the parser."""
+        if not text:
+            return ''
+        if not escaped:
+            text = html.escape(text, quote=False)
+        text = markdown_util.HTML_PLACEHOLDER_RE.sub(self._unstash, text)
+        return text.replace(markdown_util.AMP_SUBSTITUTE, '&')
+
+    def _inline(self, element: Element, stop_at_blocks: bool = False) -> str:
+        """
+        Render an element's text and inline children as Paragraph markup.
+        With `stop_at_blocks`, nested lists and paragraphs are left to the caller.
+        """
+        parts = [self._text(element.text, escaped=element.tag == 'code')]
+        for child in element:
+            if stop_at_blocks and child.tag in ('ul', 'ol', 'p', 'pre', 'table', 'blockquote'):
+                break
+            if child.tag == 'br':
+                parts.append('<br/>')
+            elif child.tag == 'img':
+                parts.append(self._text(child.get('alt')))
+            else:
+                start, end = INLINE_TAGS.get(child.tag, ('', ''))
+                if child.tag == 'a' and child.get('href'):
+                    start, end = f'<a href="{html.escape(child.get("href"))}">', '</a>'
+                parts.append(start + self._inline(child) + end)
+            parts.append(self._text(child.tail))
+        return ''.join(parts).strip()
+
+    def _list(self, element: Element) -> ListFlowable:
+        items = []
+        for li in element:
+            if li.tag != 'li':
+                continue
+            flowables = []
+            text = self._inline(li, stop_at_blocks=True)
+            if text:
+                flowables.append(Paragraph(text, self.styles['BulletPoint']))
+            for child in li:
+                if child.tag in ('ul', 'ol'):
+                    flowables.append(self._list(child))
+                elif child.tag == 'p':
+                    flowables.append(Paragraph(self._inline(child), self.styles['BulletPoint']))
+            if flowables:
+                items.append(ListItem(flowables))
+        return ListFlowable(
+            items,
+            bulletType='bullet' if element.tag == 'ul' else '1',
+            leftIndent=25,
+            bulletColor=self.secondary_color
+        )
+
+    def _table(self, element: Element) -> Table:
+        table_data = []
+        for row in element.iter('tr'):
+            row_data = []
+            for cell in row:
+                cell_text = self._inline(cell)
+                if cell_text.lower() in ['high', 'medium', 'low']:
+                    row_data.append(self._create_threat_indicator(cell_text.lower()))
+                else:
+                    row_data.append(Paragraph(cell_text, self.styles['Normal']))
+            table_data.append(row_data)
+
+        columns = max(len(row) for row in table_data)
+        col_widths = [150, 200, 100] if columns == 3 else [TABLE_WIDTH / columns] * columns
+        threat_table = Table(
+            table_data,
+            colWidths=col_widths,
+            repeatRows=1
+        )
+        threat_table.setStyle(TableStyle([
+            ('BACKGROUND', (0,0), (-1,0), HexColor('#f7ead1')),
+            ('TEXTCOLOR', (0,0), (-1,0), colors.white),
+            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+            ('GRID', (0,0), (-1,-1), 1, HexColor('#ecf0f1')),
+            ('ROWBACKGROUNDS', (0,1), (-1,-1), [HexColor('#ffffff'), HexColor('#f8f9fa')]),
+            ('BOX', (0,0), (-1,-1), 2, self.accent_color),
+        ]))
+        return threat_table
+
+    def _process_content(self, root: Element) -> List:
+        """
+        Walk the parsed Markdown tree once, emitting flowables for each block.
+        Nested lists and table cells are rendered by their parent block only.
+        """
         elements = []
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        for element in soup.find_all(True):
-            if element.name in ['h1', 'h2', 'h3']:
-                style_map = {
-                    'h1': 'SectionHeader',
-                    'h2': 'SubsectionHeader',
-                    'h3': 'RecommendationHeader'
-                }
-                elements.append(Paragraph(element.get_text(), self.styles[style_map[element.name]]))
-                
-            elif element.name == 'table':
-                table_data = []
-                for row in element.find_all('tr'):
-                    row_data = []
-                    for cell in row.find_all(['td', 'th']):
-                        cell_text = cell.get_text(strip=True)
-                        if cell_text.lower() in ['high', 'medium', 'low']:
-                            row_data.append(self._create_threat_indicator(cell_text.lower()))
-                        else:
-                            row_data.append(Paragraph(cell_text, self.styles['Normal']))
-                    table_data.append(row_data)
-                
-                threat_table = Table(
-                    table_data,
-                    colWidths=[150, 200, 100],
-                    repeatRows=1
-                )
-                threat_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0,0), (-1,0), HexColor('#f7ead1')),
-                    ('TEXTCOLOR', (0,0), (-1,0), colors.white),
-                    ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-                    ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-                    ('GRID', (0,0), (-1,-1), 1, HexColor('#ecf0f1')),
-                    ('ROWBACKGROUNDS', (0,1), (-1,-1), [HexColor('#ffffff'), HexColor('#f8f9fa')]),
-                    ('BOX', (0,0), (-1,-1), 2, self.accent_color),
-                ]))
-                elements.append(threat_table)
-                elements.append(Spacer(1, 0.5*inch))
-                
-            elif element.name in ['ul', 'ol']:
-                bullet_style = 'bullet' if element.name == 'ul' else '1'
-                list_items = []
-                for li in element.find_all('li'):
-                    list_items.append(ListItem(Paragraph(li.get_text(), self.styles['BulletPoint'])))
-                elements.append(ListFlowable(
-                    list_items,
-                    bulletType=bullet_style,
-                    leftIndent=25,
-                    bulletColor=self.secondary_color
-                ))
+        for element in root:
+            if element.tag in HEADING_STYLES:
+                elements.append(Paragraph(self._inline(element), self.styles[HEADING_STYLES[element.tag]]))
+
+            elif element.tag == 'table':
+                if element.find('.//tr') is not None:
+                    elements.append(self._table(element))
+                    elements.append(Spacer(1, 0.5*inch))
+
+            elif element.tag in ['ul', 'ol']:
+                elements.append(self._list(element))
                 elements.append(Spacer(1, 0.3*inch))
-                
-            elif element.name == 'p':
-                text = element.get_text()
-                if text.strip():
+
+            elif element.tag == 'p':
+                text = self._inline(element)
+                if text:
                     elements.append(Paragraph(text, self.styles['BodyText']))
                     elements.append(Spacer(1, 0.2*inch))
-                    
+
+            elif element.tag == 'pre':
+                code = ''.join(element.itertext())
+                elements.append(Preformatted(html.unescape(self._text(code, escaped=True)), self.styles['Code']))
+                elements.append(Spacer(1, 0.2*inch))
+
+            elif element.tag in ['blockquote', 'div']:
+                elements += self._process_content(element)
+
         return elements
 
     def generate(self, title, content, created_at):
@@ -223,19 +380,20 @@ class CyberSecurityReport:
             topMargin=70,
             bottomMargin=50
         )
-        
+
         story = self._create_cover(title)
         story.append(Paragraph(f"<b>Report Generated:</b> {created_at}", self.styles['BodyText']))
         story.append(Spacer(1, 0.3*inch))
-        
-        processed_content = self._process_content(markdown.markdown(content, extensions=['tables']))
-        story += processed_content
-        
+
+        root = parse_markdown(content)
+        self._stash = _markdown().htmlStash.rawHtmlBlocks
+        story += self._process_content(root)
+
         doc.build(
             story,
             onFirstPage=self._header_footer,
             onLaterPages=self._header_footer
         )
-        
+
         self.buffer.seek(0)
-        return self.buffer
\ No newline at end of file
+        return self.buffer
@@ -0,0 +1,175 @@
+import logging
+import os
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PROMPT_TOKEN_BUDGET = int(os.getenv('PROMPT_TOKEN_BUDGET', 12000))  # Per prompt, template included
+
+# Fields are shrunk in this order until the prompt fits: web search results go
+# first, the input data itself last
+TRUNCATION_ORDER = ("search_results", "keywords", "numeric_values", "data")
+# Tokens a field keeps in the first pass, before the input data is shortened
+FIELD_FLOORS = {"search_results": 0, "keywords": 60, "numeric_values": 400, "data": 0}
+
+# Labels of the advanced report form fields, in prompt order
+FORM_LABELS = {
+    "reportType": "Report type",
+    "projectName": "Project",
+    "clientName": "Client",
+    "assessmentDate": "Assessment date",
+    "assessorName": "Assessor",
+    "complianceType": "Compliance framework",
+    "findings": "Findings",
+    "riskAnalysis": "Risk analysis",
+    "recommendations": "Recommendations",
+}
+
+_WORD_PATTERN = re.compile(r'[^\W\d_]+')
+_SYMBOL_PATTERN = re.compile(r'[^\w\s]|[\d_]')
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of Gemini tokens in `text`: one per word plus one per
+    further eight letters, and one per digit and punctuation mark. Logs and
+    scan output, dense with addresses, ports and timestamps, take about twice
+    as many tokens per character as prose, which a flat four characters per
+    token underestimates.
+    """
+    if not text:
+        return 0
+    words = sum(1 + (len(word) - 1) // 8 for word in _WORD_PATTERN.findall(text))
+    return words + len(_SYMBOL_PATTERN.findall(text))
+
+
+def _omitted(count: int, unit: str) -> str:
+    return f"[... {count} more {unit} omitted]"
+
+
+def truncate_lines(text: str, max_tokens: Optional[int]) -> str:
+    """Keep the leading lines of `text` that fit in `max_tokens`."""
+    if max_tokens is None or estimate_tokens(text) <= max_tokens:
+        return text
+    lines = text.splitlines()
+    kept, used = [], 0
+    for line in lines:
+        cost = estimate_tokens(line) + 1
+        if used + cost > max_tokens:
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept)
+
+
+def truncate_middle(text: str, max_tokens: Optional[int]) -> str:
+    """
+    Shorten `text` to `max_tokens` by dropping whole lines from the middle,
+    keeping about two thirds of the budget for the beginning and one third for
+    the end, where logs and reports often hold their conclusions.
+    """
+    if max_tokens is None or estimate_tokens(text) <= max_tokens:
+        return text
+    lines = text.splitlines()
+    costs = [estimate_tokens(line) + 1 for line in lines]
+    budget = max(0, max_tokens - 12)  # Room for the omission marker
+    head, used = 0, 0
+    while head < len(lines) and used + costs[head] <= budget * 2 // 3:
+        used += costs[head]
+        head += 1
+    tail = len(lines)
+    while tail > head and used + costs[tail - 1] <= budget:
+        tail -= 1
+        used += costs[tail]
+    return "\n".join(lines[:head] + [_omitted(tail - head, "lines")] + lines[tail:])
+
+
+def format_keywords(keywords: List[str], max_tokens: Optional[int] = None) -> str:
+    """Keywords as one comma-separated line, most frequent first."""
+    kept, used = [], 0
+    for keyword in keywords:
+        cost = estimate_tokens(keyword) + 1
+        if max_tokens is not None and used + cost > max_tokens:
+            break
+        kept.append(keyword)
+        used += cost
+    return ", ".join(kept)
+
+
+def format_entities(numeric_values: Dict[str, Dict[str, int]], max_tokens: Optional[int] = None) -> str:
+    """
+    Entities as one line per type, "ip: 10.0.0.5 (12), 10.0.0.7 (3)". To fit
+    `max_tokens`, fewer of the most frequent values are kept for every type,
+    with a count of those left out.
+    """
+    def render(limit: int) -> str:
+        lines = []
+        for kind, values in numeric_values.items():
+            items = list(values.items())
+            shown = ", ".join(f"{value} ({count})" if count > 1 else value for value, count in items[:limit])
+            if len(items) > limit:
+                shown += f" (+{len(items) - limit} more)"
+            lines.append(f"{kind}: {shown}")
+        return "\n".join(lines)
+
+    longest = max((len(values) for values in numeric_values.values()), default=0)
+    text = render(longest)
+    if max_tokens is None:
+        return text
+    limit = longest
+    while limit > 1 and estimate_tokens(text) > max_tokens:
+        limit = limit // 2 if limit > 8 else limit - 1
+        text = render(limit)
+    return truncate_lines(text, max_tokens)
+
+
+def format_form_data(data: dict) -> str:
+    """
+    Serialize advanced report form data as labelled lines, skipping empty
+    fields. Multi-line values follow their label on their own lines.
+    """
+    lines = []
+    for key, label in FORM_LABELS.items():
+        value = str(data.get(key) or "").strip()
+        if not value:
+            continue
+        lines.append(f"{label}:\n{value}" if "\n" in value else f"{label}: {value}")
+    return "\n".join(lines)
+
+
+def fit_prompt(
+    fields: Dict[str, Callable[[Optional[int]], str]],
+    template_tokens: int,
+    budget: int = PROMPT_TOKEN_BUDGET,
+) -> Tuple[Dict[str, str], Dict[str, int]]:
+    """
+    Render the variable fields of a prompt so that, with the template, they fit
+    in `budget` tokens. Over budget, fields are shrunk in TRUNCATION_ORDER: first
+    down to their FIELD_FLOORS, then, if still needed, as far as necessary.
+
+    Args:
+        fields: Renderers by field name; each is called with a token limit, or
+            None for the full value.
+        template_tokens: Tokens of the prompt template without its fields.
+        budget: Maximum tokens for the whole prompt.
+
+    Returns:
+        Tuple[Dict[str, str], Dict[str, int]]: The rendered fields and their token counts.
+    """
+    rendered = {name: render(None) for name, render in fields.items()}
+    sizes = {name: estimate_tokens(text) for name, text in rendered.items()}
+    order = [name for name in TRUNCATION_ORDER if name in fields] + \
+            [name for name in fields if name not in TRUNCATION_ORDER]
+    for floors in (FIELD_FLOORS, {}):
+        for name in order:
+            excess = template_tokens + sum(sizes.values()) - budget
+            if excess <= 0:
+                break
+            limit = max(floors.get(name, 0), sizes[name] - excess)
+            if limit < sizes[name]:
+                rendered[name] = fields[name](limit)
+                sizes[name] = estimate_tokens(rendered[name])
+    return rendered, sizes
@@ -0,0 +1,217 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import requests
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from search_enrichment import SearchProvider
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _prompt_text(messages: List[BaseMessage]) -> str:
+    return "\n".join(f"{message.type}: {message.content}" for message in messages)
+
+
+def _chunk_text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+
+
+class ReplayStore:
+    """
+    Recorded LLM and search responses in a JSON Lines file, one response per
+    line, keyed on a hash of the prompt or query. Every recording keeps its
+    timing so it can be replayed at the original speed.
+
+    LLM lines: {"kind": "llm", "key", "prompt_chars", "chunks": [[seconds, text], ...]}
+    Search lines: {"kind": "search", "key", "query", "seconds", "results": [...]}
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str], dict] = {}
+        self._llm_entries: List[dict] = []
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as handle:
+                for line in handle:
+                    if line.strip():
+                        self._index(json.loads(line))
+        logger.info(f"Replay store {path}: {len(self._entries)} recorded responses.")
+
+    def _index(self, entry: dict) -> None:
+        self._entries[(entry["kind"], entry["key"])] = entry
+        if entry["kind"] == "llm":
+            self._llm_entries.append(entry)
+
+    def get(self, kind: str, key: str) -> Optional[dict]:
+        return self._entries.get((kind, key))
+
+    def nearest_llm(self, prompt_chars: int) -> Optional[dict]:
+        """The LLM recording whose prompt length is closest to `prompt_chars`."""
+        with self._lock:
+            entries = list(self._llm_entries)
+        return min(entries, key=lambda entry: abs(entry["prompt_chars"] - prompt_chars), default=None)
+
+    def add(self, entry: dict) -> None:
+        """
+        Append a recording. Each line is written with a single append so that
+        several gunicorn workers can record into the same file.
+        """
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._index(entry)
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as handle:
+                handle.write(line)
+
+
+class RecordingChatModel(BaseChatModel):
+    """
+    Wraps a real chat model and records every response, with the time each
+    chunk arrived, into a ReplayStore.
+    """
+
+    inner: BaseChatModel
+    store: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return f"recording-{self.inner._llm_type}"
+
+    def _record(self, prompt: str, chunks: List[Tuple[float, str]]) -> None:
+        self.store.add({"kind": "llm", "key": _key(prompt), "prompt_chars": len(prompt), "chunks": chunks})
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        started = time.perf_counter()
+        text = _chunk_text(self.inner.invoke(messages, stop=stop, **kwargs).content)
+        self._record(_prompt_text(messages), [[round(time.perf_counter() - started, 4), text]])
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        started = time.perf_counter()
+        chunks = []
+        for chunk in self.inner.stream(messages, stop=stop, **kwargs):
+            text = _chunk_text(chunk.content)
+            chunks.append([round(time.perf_counter() - started, 4), text])
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text))
+        self._record(_prompt_text(messages), chunks)  # Only complete responses are recorded
+
+
+class ReplayChatModel(BaseChatModel):
+    """
+    Serves recorded responses instead of calling Gemini, sleeping so that each
+    chunk arrives at its recorded time (divided by `speed`). A prompt that was
+    never recorded gets the recording with the closest prompt length.
+    """
+
+    store: Any
+    speed: float = 1.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def _lookup(self, messages: List[BaseMessage]) -> dict:
+        prompt = _prompt_text(messages)
+        entry = self.store.get("llm", _key(prompt))
+        if entry is None:
+            entry = self.store.nearest_llm(len(prompt))
+            if entry is None:
+                raise RuntimeError(f"No recorded LLM responses in {self.store.path}.")
+            logger.warning(f"No recording for this prompt ({len(prompt)} chars); replaying the closest one.")
+        return entry
+
+    def _replay(self, entry: dict) -> Iterator[str]:
+        started = time.perf_counter()
+        for offset, text in entry["chunks"]:
+            delay = offset / self.speed - (time.perf_counter() - started)
+            if delay > 0:
+                time.sleep(delay)
+            yield text
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        text = "".join(self._replay(self._lookup(messages)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        for text in self._replay(self._lookup(messages)):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text))
+
+
+class RecordingSearchProvider(SearchProvider):
+    """
+    Wraps a search provider and records each query's results and duration.
+    """
+
+    def __init__(self, inner: SearchProvider, store: ReplayStore):
+        self.inner = inner
+        self.store = store
+        self.name = f"record-{inner.name}"
+
+    def search(self, query: str, session: requests.Session, timeout: Tuple[float, float]) -> List[str]:
+        started = time.perf_counter()
+        results = self.inner.search(query, session, timeout)
+        self.store.add({"kind": "search", "key": _key(query), "query": query,
+                        "seconds": round(time.perf_counter() - started, 4), "results": results})
+        return results
+
+
+class ReplaySearchProvider(SearchProvider):
+    """
+    Serves recorded search results after the recorded delay. Queries that were
+    never recorded return no results, like a search that found nothing.
+    """
+
+    name = "replay"
+
+    def __init__(self, store: ReplayStore, speed: float = 1.0):
+        self.store = store
+        self.speed = speed
+
+    def search(self, query: str, session: requests.Session, timeout: Tuple[float, float]) -> List[str]:
+        entry = self.store.get("search", _key(query))
+        if entry is None:
+            return []
+        time.sleep(entry["seconds"] / self.speed)
+        return list(entry["results"])
@@ -0,0 +1,214 @@
+import html
+import logging
+import re
+from abc import ABC, abstractmethod
+from typing import Dict, List
+
+from sqlalchemy import DateTime, Float, Integer, LargeBinary, String, text
+from sqlalchemy.engine import Connection, Engine
+
+from compressed_text import decompress_text
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Snippet highlight markers; replaced by <mark> tags after the snippet is escaped
+MARK_START = "\x02"
+MARK_END = "\x03"
+
+QUERY_TERM_PATTERN = re.compile(r'[^\s"]+')
+
+# Result types, so created_at is a datetime on every backend
+RESULT_COLUMNS = {"id": Integer, "title": String, "created_at": DateTime, "rank": Float}
+
+
+def snippet_html(snippet: str) -> str:
+    """Escape a snippet and turn its highlight markers into <mark> tags."""
+    escaped = html.escape(snippet or "", quote=False)
+    return escaped.replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+
+class ReportSearch(ABC):
+    """
+    Full-text index over report titles and content, kept in the report's
+    database and updated in the same transaction as the report itself.
+
+    Both backends take the same plain-text queries (every term must match,
+    prefixes are not expanded) and return results ranked by relevance, with
+    the title weighted above the content.
+    """
+
+    @abstractmethod
+    def create_schema(self, connection: Connection) -> bool:
+        """
+        Create the index if needed.
+
+        Returns:
+            bool: True if the index was created and has to be filled.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def index(self, connection: Connection, report_id: int, user_id: int, title: str, content: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def remove(self, connection: Connection, report_id: int) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def search(self, connection: Connection, user_id: int, query: str, limit: int = 20) -> List[Dict]:
+        """
+        Return a user's reports matching `query`, most relevant first.
+
+        Returns:
+            List[Dict]: Results with "report_id", "title", "created_at", "rank"
+            and "snippet" (HTML with matches in <mark> tags) keys.
+        """
+        raise NotImplementedError
+
+
+class SqliteReportSearch(ReportSearch):
+    """
+    An FTS5 virtual table keyed on the report id, ranked with bm25. The table
+    stores its own uncompressed copy of each report, which snippet() reads;
+    report.content is compressed, so it cannot serve as external content.
+    """
+
+    def create_schema(self, connection: Connection) -> bool:
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'report_fts'")
+        ).first()
+        if exists:
+            return False
+        connection.execute(text(
+            "CREATE VIRTUAL TABLE report_fts USING fts5("
+            "title, content, user_id UNINDEXED, tokenize = 'porter unicode61')"
+        ))
+        return True
+
+    def index(self, connection: Connection, report_id: int, user_id: int, title: str, content: str) -> None:
+        self.remove(connection, report_id)
+        connection.execute(
+            text("INSERT INTO report_fts (rowid, title, content, user_id) VALUES (:id, :title, :content, :user_id)"),
+            {"id": report_id, "title": title, "content": content, "user_id": user_id},
+        )
+
+    def remove(self, connection: Connection, report_id: int) -> None:
+        connection.execute(text("DELETE FROM report_fts WHERE rowid = :id"), {"id": report_id})
+
+    @staticmethod
+    def match_expression(query: str) -> str:
+        # Quote every term so user input cannot use FTS5 query syntax; a quoted
+        # term like "2.4.49" is matched as a phrase of its tokens.
+        return " ".join(f'"{term}"' for term in QUERY_TERM_PATTERN.findall(query))
+
+    def search(self, connection: Connection, user_id: int, query: str, limit: int = 20) -> List[Dict]:
+        expression = self.match_expression(query)
+        if not expression:
+            return []
+        rows = connection.execute(
+            text(
+                "SELECT report.id, report.title, report.created_at, bm25(report_fts, 10.0, 1.0) AS rank, "
+                "snippet(report_fts, 1, :start, :end, '...', 24) AS snippet "
+                "FROM report_fts JOIN report ON report.id = report_fts.rowid "
+                "WHERE report_fts MATCH :expression AND report_fts.user_id = :user_id "
+                "ORDER BY rank LIMIT :limit"
+            ).columns(snippet=String, **RESULT_COLUMNS),
+            {"expression": expression, "user_id": user_id, "limit": limit, "start": MARK_START, "end": MARK_END},
+        )
+        return [
+            # bm25 scores are negative, lower is better
+            {"report_id": row.id, "title": row.title, "created_at": row.created_at,
+             "rank": -row.rank, "snippet": snippet_html(row.snippet)}
+            for row in rows
+        ]
+
+
+class PostgresReportSearch(ReportSearch):
+    """
+    A side table holding a weighted tsvector per report with a GIN index,
+    ranked with ts_rank_cd and highlighted with ts_headline.
+    """
+
+    config = "english"
+
+    def create_schema(self, connection: Connection) -> bool:
+        exists = connection.execute(text("SELECT to_regclass('report_search')")).scalar()
+        if exists:
+            return False
+        connection.execute(text(
+            "CREATE TABLE report_search ("
+            "report_id INTEGER PRIMARY KEY REFERENCES report (id) ON DELETE CASCADE, "
+            "user_id INTEGER NOT NULL, "
+            "document TSVECTOR NOT NULL)"
+        ))
+        connection.execute(text("CREATE INDEX ix_report_search_document ON report_search USING GIN (document)"))
+        connection.execute(text("CREATE INDEX ix_report_search_user ON report_search (user_id)"))
+        return True
+
+    def index(self, connection: Connection, report_id: int, user_id: int, title: str, content: str) -> None:
+        connection.execute(
+            text(
+                "INSERT INTO report_search (report_id, user_id, document) VALUES (:id, :user_id, "
+                "setweight(to_tsvector(CAST(:config AS regconfig), :title), 'A') || "
+                "setweight(to_tsvector(CAST(:config AS regconfig), :content), 'B')) "
+                "ON CONFLICT (report_id) DO UPDATE SET user_id = EXCLUDED.user_id, document = EXCLUDED.document"
+            ),
+            {"id": report_id, "user_id": user_id, "title": title, "content": content, "config": self.config},
+        )
+
+    def remove(self, connection: Connection, report_id: int) -> None:
+        connection.execute(text("DELETE FROM report_search WHERE report_id = :id"), {"id": report_id})
+
+    def search(self, connection: Connection, user_id: int, query: str, limit: int = 20) -> List[Dict]:
+        terms = QUERY_TERM_PATTERN.findall(query)
+        if not terms:
+            return []
+        params = {"config": self.config, "query": " ".join(terms), "user_id": user_id, "limit": limit}
+        rows = connection.execute(
+            text(
+                "SELECT report.id, report.title, report.created_at, ts_rank_cd(document, query) AS rank, "
+                "report.content "
+                "FROM report_search JOIN report ON report.id = report_search.report_id, "
+                "plainto_tsquery(CAST(:config AS regconfig), :query) AS query "
+                "WHERE report_search.user_id = :user_id AND document @@ query "
+                "ORDER BY rank DESC LIMIT :limit"
+            ).columns(content=LargeBinary, **RESULT_COLUMNS),
+            params,
+        ).all()
+        if not rows:
+            return []
+
+        # Report content is stored compressed, so it is decompressed here and
+        # sent back for ts_headline in one round trip.
+        snippets = connection.execute(
+            text(
+                "SELECT ts_headline(CAST(:config AS regconfig), document, "
+                "plainto_tsquery(CAST(:config AS regconfig), :query), :options) "
+                "FROM unnest(CAST(:documents AS text[])) WITH ORDINALITY AS documents (document, position) "
+                "ORDER BY position"
+            ),
+            dict(
+                params,
+                documents=[decompress_text(row.content) for row in rows],
+                options=f"StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=30, MinWords=10, MaxFragments=2",
+            ),
+        ).scalars().all()
+        return [
+            {"report_id": row.id, "title": row.title, "created_at": row.created_at,
+             "rank": row.rank, "snippet": snippet_html(snippet)}
+            for row, snippet in zip(rows, snippets)
+        ]
+
+
+def create_report_search(engine: Engine) -> ReportSearch:
+    """
+    Return the full-text search backend for the database behind `engine`.
+    """
+    if engine.dialect.name == "postgresql":
+        return PostgresReportSearch()
+    if engine.dialect.name == "sqlite":
+        return SqliteReportSearch()
+    raise ValueError(f"Full-text search is not supported on {engine.dialect.name}")
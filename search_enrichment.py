@@ -0,0 +1,211 @@
+import json
+import logging
+import re
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from disk_cache import DiskCache
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CVE_PATTERN = re.compile(r'\bCVE-\d{4}-\d{4,7}\b', re.IGNORECASE)
+PRODUCT_VERSION_PATTERN = re.compile(r'\b([A-Za-z][A-Za-z0-9_\-]{2,})[ /]v?(\d+\.\d+(?:\.\d+){0,2})\b')
+
+
+class SearchProvider(ABC):
+    """
+    A web search backend. Implementations return result titles for one query.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def search(self, query: str, session: requests.Session, timeout: Tuple[float, float]) -> List[str]:
+        raise NotImplementedError
+
+
+class GoogleSearchProvider(SearchProvider):
+    """
+    Scrape result titles from a Google search results page.
+    """
+
+    name = "google"
+    headers = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+    }
+    title_pattern = re.compile(r'<h3[^>]*>(.*?)<\/h3>')
+    tag_pattern = re.compile(r'<[^>]+>')
+
+    def search(self, query: str, session: requests.Session, timeout: Tuple[float, float]) -> List[str]:
+        response = session.get(
+            "https://www.google.com/search",
+            params={"q": query},
+            headers=self.headers,
+            timeout=timeout,
+        )
+        response.raise_for_status()  # Raise an error for bad status codes
+        return [self.tag_pattern.sub('', match) for match in self.title_pattern.findall(response.text)]
+
+
+class StubSearchProvider(SearchProvider):
+    """
+    An offline backend returning canned results, for tests and benchmarks.
+    """
+
+    name = "stub"
+
+    def __init__(self, results: Optional[Dict[str, List[str]]] = None, latency: float = 0.0):
+        """
+        Args:
+            results: Results per normalized query. Unknown queries get generated titles.
+            latency: Seconds to sleep per query to simulate the network.
+        """
+        self.results = results or {}
+        self.latency = latency
+
+    def search(self, query: str, session: requests.Session, timeout: Tuple[float, float]) -> List[str]:
+        if self.latency:
+            time.sleep(self.latency)
+        if query in self.results:
+            return list(self.results[query])
+        return [f"Result {i} for {query}" for i in range(1, 4)]
+
+
+class NullSearchProvider(SearchProvider):
+    """
+    A backend that never returns results, to disable web enrichment.
+    """
+
+    name = "none"
+
+    def search(self, query: str, session: requests.Session, timeout: Tuple[float, float]) -> List[str]:
+        return []
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def build_queries(text: str, keywords: List[str], numeric_values: Dict, max_queries: int = 4) -> List[str]:
+    """
+    Build a few focused search queries instead of one query containing every keyword.
+
+    Args:
+        text: The source text, scanned for CVE IDs and product/version pairs.
+        keywords: Extracted keywords, most relevant first.
+        numeric_values: Extracted numeric values; CVE IDs under "cve" are used as queries.
+        max_queries: Upper bound on the number of queries.
+
+    Returns:
+        List[str]: Distinct queries, most specific first.
+    """
+    queries = []
+    cves = list(numeric_values.get("cve", [])) + CVE_PATTERN.findall(text or "")
+    for cve in dict.fromkeys(match.upper() for match in cves):
+        queries.append(f"{cve} vulnerability exploit mitigation")
+    for product, version in dict.fromkeys(PRODUCT_VERSION_PATTERN.findall(text or "")):
+        queries.append(f"{product} {version} vulnerability")
+    if keywords:
+        queries.append(f"Cybersecurity trends and insights related to: {', '.join(keywords[:5])}")
+
+    distinct = list(dict.fromkeys(normalize_query(query) for query in queries))
+    return distinct[:max_queries]
+
+
+class SearchEnricher:
+    """
+    Run search queries concurrently through a pooled session with strict
+    timeouts and an on-disk cache, degrading to empty results on any failure.
+    """
+
+    def __init__(
+        self,
+        provider: SearchProvider,
+        cache: Optional[DiskCache] = None,
+        connect_timeout: float = 3.0,
+        read_timeout: float = 5.0,
+        total_timeout: float = 8.0,
+        workers: int = 4,
+        results_per_query: int = 3,
+    ):
+        """
+        Args:
+            provider: Backend that performs a single search.
+            cache: Cache of results per normalized query, or None to disable caching.
+            connect_timeout: Seconds to establish a connection.
+            read_timeout: Seconds to wait for response data.
+            total_timeout: Overall deadline for one enrichment, across all queries.
+            workers: Maximum number of queries in flight.
+            results_per_query: Number of result titles kept per query.
+        """
+        self.provider = provider
+        self.cache = cache
+        self.timeout = (connect_timeout, read_timeout)
+        self.total_timeout = total_timeout
+        self.results_per_query = results_per_query
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="search")
+
+    def search(self, query: str) -> List[str]:
+        """
+        Return result titles for one query, from the cache when possible.
+        Errors are logged and yield an empty list. Empty results are not
+        cached, so a transient empty response is retried on the next report.
+        """
+        query = normalize_query(query)
+        if self.cache:
+            cached = self.cache.get(query)
+            if cached is not None:
+                return json.loads(cached)
+        try:
+            results = self.provider.search(query, self.session, self.timeout)[:self.results_per_query]
+        except Exception as e:
+            logger.error(f"Search failed for '{query}' ({self.provider.name}): {str(e)}")
+            return []
+        if self.cache and results:
+            self.cache.set(query, json.dumps(results))
+        return results
+
+    def enrich(self, queries: List[str]) -> str:
+        """
+        Run `queries` concurrently and return the distinct result titles, one per line.
+        Queries still running at the overall deadline are dropped.
+        """
+        if not queries:
+            return ""
+        futures = [self._executor.submit(self.search, query) for query in queries]
+        done, not_done = wait(futures, timeout=self.total_timeout)
+        for future in not_done:
+            future.cancel()
+        if not_done:
+            logger.warning(f"Search enrichment timed out for {len(not_done)} of {len(futures)} queries.")
+
+        results = []
+        for future in futures:  # Keep query order, most specific first
+            if future in done:
+                results.extend(future.result())
+        return "\n".join(dict.fromkeys(results))
+
+
+def create_provider(name: str, stub_latency: float = 0.0) -> SearchProvider:
+    """
+    Return the search provider configured by name: "google", "stub" or "none".
+    """
+    name = (name or "google").lower()
+    if name == "google":
+        return GoogleSearchProvider()
+    if name == "stub":
+        return StubSearchProvider(latency=stub_latency)
+    if name == "none":
+        return NullSearchProvider()
+    raise ValueError(f"Unknown search provider: {name}")
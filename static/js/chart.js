@@ -1,11 +1,22 @@
 // Register the datalabels plugin
 Chart.register(ChartDataLabels);
 
-document.addEventListener('DOMContentLoaded', () => {
-    // Function to generate random data
-    function getRandomData(length, min, max) {
-        return Array.from({ length }, () => Math.floor(Math.random() * (max - min + 1)) + min);
+document.addEventListener('DOMContentLoaded', async () => {
+    // Chart data comes from the per-user findings counters
+    let stats = { severity: {}, categories: {}, monthly_findings: {} };
+    try {
+        const response = await fetch('/api/stats');
+        if (!response.ok) {
+            throw new Error(`Failed to load stats (${response.status})`);
+        }
+        stats = await response.json();
+    } catch (error) {
+        console.error('Error:', error);
     }
+    const severity = (level) => stats.severity[level] || 0;
+    const category = (name) => stats.categories[name] || 0;
+    const months = Object.keys(stats.monthly_findings);
+    const monthLabels = months.map(month => new Date(`${month}-01T00:00:00`).toLocaleString('default', { month: 'short' }));
 
     // Vulnerability Chart (Bar)
     const vulnerabilityCtx = document.getElementById('vulnerabilityChart').getContext('2d');
@@ -15,7 +26,7 @@ document.addEventListener('DOMContentLoaded', () => {
             labels: ['Critical', 'High', 'Medium', 'Low'],
             datasets: [{
                 label: 'Vulnerability Severity',
-                data: getRandomData(4, 5, 25),
+                data: ['critical', 'high', 'medium', 'low'].map(severity),
                 backgroundColor: [
                     'rgba(255, 99, 132, 0.8)',
                     'rgba(54, 162, 235, 0.8)',
@@ -62,7 +73,7 @@ document.addEventListener('DOMContentLoaded', () => {
             labels: ['Phishing', 'Ransomware', 'Malware', 'DDoS'],
             datasets: [{
                 label: 'Threat Distribution',
-                data: getRandomData(4, 10, 50),
+                data: ['phishing', 'ransomware', 'malware', 'ddos'].map(category),
                 backgroundColor: [
                     'rgba(255, 99, 132, 0.8)',
                     'rgba(54, 162, 235, 0.8)',
@@ -100,10 +111,10 @@ document.addEventListener('DOMContentLoaded', () => {
     const incidentTrendsChart = new Chart(incidentTrendsCtx, {
         type: 'line',
         data: {
-            labels: ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun'],
+            labels: monthLabels,
             datasets: [{
                 label: 'Incident Trends',
-                data: getRandomData(6, 5, 30),
+                data: months.map(month => stats.monthly_findings[month]),
                 backgroundColor: 'rgba(75, 192, 192, 0.2)',
                 borderColor: 'rgba(75, 192, 192, 1)',
                 borderWidth: 2,
@@ -145,7 +156,7 @@ document.addEventListener('DOMContentLoaded', () => {
             labels: ['High', 'Medium', 'Low'],
             datasets: [{
                 label: 'Risk Levels',
-                data: getRandomData(3, 10, 60),
+                data: [severity('critical') + severity('high'), severity('medium'), severity('low')],
                 backgroundColor: [
                     'rgba(255, 99, 132, 0.8)',
                     'rgba(54, 162, 235, 0.8)',
@@ -185,7 +196,7 @@ document.addEventListener('DOMContentLoaded', () => {
             labels: ['Phishing', 'Ransomware', 'Malware', 'DDoS', 'Brute Force'],
             datasets: [{
                 label: 'Attack Types',
-                data: getRandomData(5, 10, 50),
+                data: ['phishing', 'ransomware', 'malware', 'ddos', 'brute_force'].map(category),
                 backgroundColor: 'rgba(255, 99, 132, 0.2)',
                 borderColor: 'rgba(255, 99, 132, 1)',
                 borderWidth: 2
@@ -221,7 +232,7 @@ document.addEventListener('DOMContentLoaded', () => {
             labels: ['Login Attempts', 'Firewall Alerts', 'Malware Detections', 'Data Breaches'],
             datasets: [{
                 label: 'Security Events',
-                data: getRandomData(4, 10, 50),
+                data: ['authentication', 'network', 'malware', 'data_breach'].map(category),
                 backgroundColor: [
                     'rgba(255, 99, 132, 0.8)',
                     'rgba(54, 162, 235, 0.8)',
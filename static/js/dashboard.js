@@ -0,0 +1,119 @@
+document.addEventListener('DOMContentLoaded', () => {
+    const reportsGrid = document.getElementById('reportsGrid');
+    const sentinel = document.getElementById('reportsSentinel');
+    let nextCursor = reportsGrid.dataset.nextCursor;
+    let loading = false;
+
+    function actionLink(href, icon, label) {
+        const link = document.createElement('a');
+        link.href = href;
+        link.className = 'btn-secondary';
+        const iconElement = document.createElement('i');
+        iconElement.className = `fas ${icon}`;
+        link.append(iconElement, ` ${label}`);
+        return link;
+    }
+
+    // Mirror the server-rendered report card; text is set with textContent
+    function reportCard(report) {
+        const card = document.createElement('div');
+        card.className = 'report-card';
+        card.id = `report-${report.id}`;
+
+        const title = document.createElement('h2');
+        title.textContent = report.title;
+        const date = document.createElement('p');
+        date.className = 'report-date';
+        date.textContent = report.created_at;
+
+        const actions = document.createElement('div');
+        actions.className = 'report-actions';
+        const deleteButton = document.createElement('button');
+        deleteButton.className = 'btn-danger delete-report';
+        deleteButton.dataset.reportId = report.id;
+        const deleteIcon = document.createElement('i');
+        deleteIcon.className = 'fas fa-trash';
+        deleteButton.append(deleteIcon, ' Delete');
+        actions.append(
+            actionLink(report.report_url, 'fa-eye', 'View'),
+            actionLink(report.download_url, 'fa-download', 'Download'),
+            deleteButton
+        );
+
+        card.append(title, date, actions);
+        return card;
+    }
+
+    async function loadNextPage() {
+        if (loading || !nextCursor) {
+            return;
+        }
+        loading = true;
+        try {
+            const params = new URLSearchParams({ cursor: nextCursor });
+            const response = await fetch(`${reportsGrid.dataset.listUrl}?${params}`);
+            if (!response.ok) {
+                throw new Error(`Failed to load reports (${response.status})`);
+            }
+            const page = await response.json();
+            page.reports.forEach(report => reportsGrid.appendChild(reportCard(report)));
+            nextCursor = page.next_cursor;
+            if (!nextCursor) {
+                observer.disconnect();
+            }
+        } catch (error) {
+            console.error('Error:', error);
+        } finally {
+            loading = false;
+        }
+    }
+
+    const observer = new IntersectionObserver((entries) => {
+        if (entries.some(entry => entry.isIntersecting)) {
+            loadNextPage();
+        }
+    }, { rootMargin: '400px' });
+
+    if (nextCursor) {
+        observer.observe(sentinel);
+    }
+
+    // Full-text search; snippets are escaped by the server apart from <mark> tags
+    const searchForm = document.getElementById('reportSearch');
+    const searchInput = document.getElementById('reportSearchInput');
+    const searchResults = document.getElementById('searchResults');
+
+    searchForm.addEventListener('submit', async (event) => {
+        event.preventDefault();
+        const query = searchInput.value.trim();
+        searchResults.replaceChildren();
+        if (!query) {
+            return;
+        }
+        try {
+            const params = new URLSearchParams({ q: query });
+            const response = await fetch(`${searchForm.dataset.searchUrl}?${params}`);
+            if (!response.ok) {
+                throw new Error(`Search failed (${response.status})`);
+            }
+            const { results } = await response.json();
+            if (!results.length) {
+                const empty = document.createElement('p');
+                empty.textContent = 'No matching reports.';
+                searchResults.appendChild(empty);
+                return;
+            }
+            results.forEach(result => {
+                const card = reportCard(result);
+                const snippet = document.createElement('p');
+                snippet.className = 'search-snippet';
+                snippet.innerHTML = result.snippet;
+                card.insertBefore(snippet, card.querySelector('.report-actions'));
+                card.querySelector('.delete-report').remove();  // Deleting is done from the report list
+                searchResults.appendChild(card);
+            });
+        } catch (error) {
+            console.error('Error:', error);
+        }
+    });
+});
@@ -31,6 +31,7 @@ document.addEventListener('DOMContentLoaded', function () {
             try {
                 // Create FormData object from the form
                 const formData = new FormData(this);
+                formData.append('stream', 'true'); // Follow the report live as it is generated
 
                 // Send form data directly to the backend
                 const response = await fetch('/generate-report', {
@@ -38,28 +39,13 @@ document.addEventListener('DOMContentLoaded', function () {
                     body: formData, // Send FormData directly
                 });
 
-                if (!response.ok) {
+                if (response.status !== 202) {
                     throw new Error('Network response was not ok');
                 }
 
-                // Check if the response is a redirect
-                if (response.redirected) {
-                    // Redirect to the URL provided by Flask
-                    window.location.href = response.url;
-                } else {
-                    // Handle JSON response (if any)
-                    const data = await response.json();
-                    if (data.success) {
-                        // Flash success message (assuming you have a flash function)
-                        flash('Report generated successfully!', 'success');
-                        // Redirect to the report page after a slight delay
-                        setTimeout(() => {
-                            window.location.href = `/report/${data.report_id}`;
-                        }, 1000); // Add a slight delay for a smooth transition
-                    } else {
-                        throw new Error(data.message || 'Failed to generate report');
-                    }
-                }
+                // The report is generated in the background; follow it live on the job page
+                const job = await response.json();
+                window.location.href = job.status_url;
             } catch (error) {
                 console.error('Error:', error);
                 // Flash error message (assuming you have a flash function)
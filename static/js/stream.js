@@ -0,0 +1,42 @@
+document.addEventListener('DOMContentLoaded', () => {
+    const streamContent = document.getElementById('streamContent');
+    const streamStatus = document.getElementById('streamStatus');
+    const source = new EventSource(streamContent.dataset.streamUrl);
+    let markdownText = '';
+    let renderPending = false;
+
+    // Re-render at most once per animation frame while tokens arrive
+    function scheduleRender() {
+        if (renderPending) {
+            return;
+        }
+        renderPending = true;
+        requestAnimationFrame(() => {
+            renderPending = false;
+            streamContent.innerHTML = marked.parse(markdownText);
+        });
+    }
+
+    source.addEventListener('token', (e) => {
+        markdownText += JSON.parse(e.data).text;
+        scheduleRender();
+    });
+
+    // The server is retrying generation; start over
+    source.addEventListener('reset', () => {
+        markdownText = '';
+        scheduleRender();
+    });
+
+    source.addEventListener('done', (e) => {
+        source.close();
+        streamStatus.textContent = 'Report generated. Opening...';
+        window.location.href = JSON.parse(e.data).report_url; // Saved report page
+    });
+
+    source.addEventListener('failed', (e) => {
+        source.close();
+        console.error('Error:', JSON.parse(e.data).error);
+        window.location.href = '/error'; // Redirect to error page
+    });
+});
@@ -4,7 +4,7 @@ document.addEventListener('DOMContentLoaded', () => {
     const filePreview = document.getElementById('filePreview');
     const clearFilesButton = document.getElementById('clearFilesButton');
     const generateReportButton = document.getElementById('generateReportButton');
-    const extractedTextInput = document.getElementById('extractedText');
+    const uploadTokenInput = document.getElementById('uploadToken');
     const fullScreenSpinner = document.getElementById('fullScreenSpinner');
     const progressBarContainer = document.getElementById('progressBarContainer');
     const progressBar = document.getElementById('progressBar');
@@ -15,7 +15,7 @@ document.addEventListener('DOMContentLoaded', () => {
     document.body.appendChild(fileNameInput); // Append it to the body
 
     // Allowed file types
-    const allowedFileTypes = ['csv', 'txt', 'log', 'pdf', 'doc', 'docx', 'html', 'xml', 'json'];
+    const allowedFileTypes = ['csv', 'txt', 'log', 'pdf', 'doc', 'docx', 'html', 'xml', 'json', 'zip', 'tar', 'gz', 'tgz', 'bz2', 'tbz2', 'xz', 'txz'];
 
     // Drag-and-Drop Functionality
     uploadArea.addEventListener('dragover', (e) => {
@@ -38,7 +38,7 @@ document.addEventListener('DOMContentLoaded', () => {
     clearFilesButton.addEventListener('click', () => {
         fileInput.value = ''; // Clear the file input
         filePreview.innerHTML = '<p>No files selected</p>'; // Reset the preview
-        extractedTextInput.value = ''; // Clear the extracted text
+        uploadTokenInput.value = ''; // Clear the staged upload token
         fileNameInput.value = ''; // Clear the file name
     });
 
@@ -74,11 +74,25 @@ document.addEventListener('DOMContentLoaded', () => {
                 const data = await response.text();
                 const parser = new DOMParser();
                 const doc = parser.parseFromString(data, 'text/html');
-                const extractedText = doc.querySelector('#extractedText').value;
+                const uploadToken = doc.querySelector('#uploadToken').value;
+                const preview = doc.querySelector('#extractedPreview');
                 const fileNameWithExtension = fileInput.files[0].name; // Get the file name with extension
-                const fileName = fileNameWithExtension.split('.').slice(0, -1).join('.'); // Remove the extension
-                filePreview.innerHTML = `<pre>${extractedText}</pre>`; // Display extracted text
-                extractedTextInput.value = extractedText; // Store extracted text in hidden input
+                // The server names batch uploads (archive name or file count); fall back to the file name
+                const serverFileName = doc.querySelector('#fileName');
+                const fileName = (serverFileName && serverFileName.value) ||
+                    fileNameWithExtension.split('.').slice(0, -1).join('.'); // Remove the extension
+                if (!uploadToken) {
+                    throw new Error('File upload failed');
+                }
+
+                // Display the beginning of the extracted text; the full text stays on the server
+                const previewText = document.createElement('pre');
+                previewText.textContent = preview.value;
+                if (preview.dataset.truncated === 'true') {
+                    previewText.textContent += '\n\n[Preview truncated]';
+                }
+                filePreview.replaceChildren(previewText);
+                uploadTokenInput.value = uploadToken; // Store the staged upload token in hidden input
                 fileNameInput.value = fileName; // Store file name (without extension) in hidden input
             } else {
                 throw new Error('File upload failed');
@@ -95,11 +109,11 @@ document.addEventListener('DOMContentLoaded', () => {
     generateReportButton.addEventListener('click', async (e) => {
         e.preventDefault(); // Prevent form submission
 
-        const extractedText = extractedTextInput.value;
+        const uploadToken = uploadTokenInput.value;
         const fileName = fileNameInput.value; // Get the file name (without extension)
 
-        if (!extractedText || !fileName) {
-            window.location.href = '/error'; // Redirect to error page if no extracted text or file name
+        if (!uploadToken || !fileName) {
+            window.location.href = '/error'; // Redirect to error page if no staged upload or file name
             return;
         }
 
@@ -127,17 +141,19 @@ document.addEventListener('DOMContentLoaded', () => {
                 headers: {
                     'Content-Type': 'application/x-www-form-urlencoded',
                 },
-                body: `extracted_text=${encodeURIComponent(extractedText)}&fileName=${encodeURIComponent(fileName)}`,
+                body: `upload_token=${encodeURIComponent(uploadToken)}&fileName=${encodeURIComponent(fileName)}&stream=true`,
             });
 
-            if (response.redirected) {
-                // Wait for the progress bar to complete before redirecting
-                setTimeout(() => {
-                    window.location.href = response.url; // Redirect to the report page
-                }, 1000); // Add a slight delay for a smooth transition
-            } else {
+            if (response.status !== 202) {
                 throw new Error('Report generation failed');
             }
+
+            // The report is generated in the background; follow it live on the job page
+            const job = await response.json();
+            clearInterval(interval);
+            progressBar.style.width = '100%';
+            progressText.textContent = '100%';
+            window.location.href = job.status_url;
         } catch (error) {
             console.error('Error:', error);
             window.location.href = '/error'; // Redirect to error page
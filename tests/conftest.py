@@ -0,0 +1,61 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The app reads its configuration at import time, so point it at a throwaway
+# directory before any test imports it.
+WORKDIR = tempfile.mkdtemp(prefix="cyberapp-tests-")
+os.environ.update({
+    "SECRET_KEY": "test",
+    "SQLITE_PATH": os.path.join(WORKDIR, "test.db"),
+    "CACHE_PATH": os.path.join(WORKDIR, "cache.db"),
+    "PDF_CACHE_FOLDER": os.path.join(WORKDIR, "pdf_cache"),
+    "SEARCH_PROVIDER": "none",
+})
+os.chdir(WORKDIR)  # The upload folder is relative to the working directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def app_module():
+    import app as app_module
+    app_module.app.config["TESTING"] = True
+    return app_module
+
+
+@pytest.fixture
+def foreign_keys(app_module):
+    """Enforce foreign keys on SQLite, as PostgreSQL does in production."""
+    from sqlalchemy import event
+
+    def enable(connection, _):
+        connection.execute("PRAGMA foreign_keys=ON")
+
+    with app_module.app.app_context():
+        engine = app_module.db.engine
+        app_module.db.session.remove()
+        engine.dispose()  # Open new connections, which get the pragma
+        event.listen(engine, "connect", enable)
+        yield
+        event.remove(engine, "connect", enable)
+        app_module.db.session.remove()
+        engine.dispose()
+
+
+@pytest.fixture
+def client(app_module):
+    """A test client logged in as a fresh user."""
+    import uuid
+
+    name = uuid.uuid4().hex[:12]
+    with app_module.app.app_context():
+        user = app_module.User(username=name, email=f"{name}@example.com", password="secret")
+        app_module.db.session.add(user)
+        app_module.db.session.commit()
+        user_id = user.id
+    client = app_module.app.test_client()
+    client.post("/login", data={"username": name, "password": "secret"}, follow_redirects=True)
+    client.user_id = user_id
+    return client
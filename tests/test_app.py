@@ -0,0 +1,48 @@
+import json
+
+
+def create_job_report(app_module, user_id):
+    """A report created by a finished background job, as run_report_job leaves it."""
+    with app_module.app.app_context():
+        db = app_module.db
+        report = app_module.Report(title="Job report", content="# Findings", user_id=user_id)
+        db.session.add(report)
+        db.session.flush()
+        job = app_module.Job(user_id=user_id, title=report.title, payload=json.dumps({}),
+                             status="done", report_id=report.id)
+        db.session.add(job)
+        db.session.commit()
+        return report.id, job.id
+
+
+def test_delete_job_report_with_foreign_keys(app_module, foreign_keys, client):
+    report_id, job_id = create_job_report(app_module, client.user_id)
+
+    response = client.post(f"/delete-report/{report_id}", follow_redirects=True)
+
+    assert b"Report deleted successfully." in response.data
+    with app_module.app.app_context():
+        assert app_module.db.session.get(app_module.Report, report_id) is None
+        assert app_module.db.session.get(app_module.Job, job_id).report_id is None
+
+
+def test_job_of_deleted_report_redirects_to_dashboard(app_module, client):
+    report_id, job_id = create_job_report(app_module, client.user_id)
+    client.post(f"/delete-report/{report_id}")
+
+    response = client.get(f"/jobs/{job_id}", headers={"Accept": "text/html"})
+
+    assert response.status_code == 302
+    assert response.headers["Location"].endswith("/dashboard")
+
+
+def test_job_status_polling_does_not_flash(app_module, client):
+    report_id, job_id = create_job_report(app_module, client.user_id)
+
+    for _ in range(3):
+        status = client.get(f"/jobs/{job_id}", headers={"Accept": "application/json"}).get_json()
+        assert status["status"] == "done"
+    client.get(f"/jobs/{job_id}", headers={"Accept": "text/html"})
+
+    with client.session_transaction() as session:
+        assert session["_flashes"] == [("success", "Report generated successfully!")]
@@ -0,0 +1,48 @@
+import random
+
+from log_templates import LOG_SUMMARY_MAX_TEMPLATES, compact_log_text
+
+EVENT_WORDS = ["kernel", "audit", "sshd", "sudo", "cron", "nginx", "postfix", "dhclient",
+               "denied", "opened", "closed", "changed", "escalated", "rejected", "mounted", "loaded",
+               "root", "shadow", "module", "policy", "certificate", "tunnel", "session", "firewall"]
+
+
+def repeated_lines(count):
+    return [f"2024-01-01T10:{index // 60 % 60:02d}:{index % 60:02d}Z sshd[{1000 + index}]: "
+            f"Accepted publickey for deploy from 10.0.{index % 250}.{index % 7} port {40000 + index}"
+            for index in range(count)]
+
+
+def rare_lines(count):
+    rng = random.Random(7)
+    lines = []
+    for index in range(count):
+        words = rng.sample(EVENT_WORDS, rng.randint(3, 9))
+        lines.append(f"2024-01-01T11:00:00Z event{chr(65 + index % 26)}{chr(65 + index // 26 % 26)} " + " ".join(words))
+    return lines
+
+
+def test_repetitive_log_is_compacted():
+    summary = compact_log_text("\n".join(repeated_lines(5000)) + "\n")
+    assert summary is not None
+    assert "5000 lines clustered" in summary
+
+
+def mixed_log(rare_count):
+    lines = repeated_lines(5000) + rare_lines(rare_count)
+    random.Random(1).shuffle(lines)
+    return "\n".join(lines) + "\n"
+
+
+def test_log_with_more_templates_than_the_summary_is_sent_verbatim():
+    # 300 one-off events need more templates than a summary holds
+    assert compact_log_text(mixed_log(300)) is None
+
+
+def test_rare_lines_survive_compaction():
+    summary = compact_log_text(mixed_log(LOG_SUMMARY_MAX_TEMPLATES // 4))
+
+    assert summary is not None
+    assert "omitted" not in summary
+    for line in rare_lines(LOG_SUMMARY_MAX_TEMPLATES // 4):
+        assert " ".join(line.split()[1:]) in summary
@@ -0,0 +1,21 @@
+import pytest
+
+from metrics import Counter, Histogram, Metric
+
+
+def test_incomplete_metric_fails_when_instantiated():
+    class Incomplete(Metric):
+        kind = "untyped"
+
+    with pytest.raises(TypeError):
+        Incomplete("incomplete", "A metric without samples")
+
+
+def test_counter_and_histogram_render():
+    counter = Counter("test_requests_total", "Requests", labels=("route",))
+    counter.inc(route="/login")
+    histogram = Histogram("test_latency_seconds", "Latency", buckets=(0.1, 1.0))
+    histogram.observe(0.5)
+
+    assert 'test_requests_total{route="/login"} 1' in counter.render()
+    assert "test_latency_seconds_count 1" in histogram.render()
@@ -0,0 +1,38 @@
+import os
+
+from pdf_cache import PdfCache
+
+REPORT = {"report_id": 1, "title": "Weekly scan", "content": "# Findings\n\nNone.", "created_at": "2024-01-01 10:00:00"}
+
+
+def test_render_keeps_a_pdf_larger_than_the_cache(tmp_path):
+    cache = PdfCache(str(tmp_path), max_bytes=1)
+
+    path = cache.render(**REPORT)
+
+    assert os.path.exists(path)
+
+
+def test_render_evicts_least_recently_used(tmp_path):
+    cache = PdfCache(str(tmp_path), max_bytes=1)
+    first = cache.render(**REPORT)
+
+    second = cache.render(**dict(REPORT, report_id=2))
+
+    assert not os.path.exists(first)
+    assert os.path.exists(second)
+
+
+def test_open_renders_again_when_evicted_after_lookup(tmp_path, monkeypatch):
+    cache = PdfCache(str(tmp_path))
+    path = cache.render(**REPORT)
+    lookup = cache.get
+
+    def evicted_meanwhile(*args):
+        found = lookup(*args)
+        os.remove(path)  # Another process evicts it before it is opened
+        return found
+
+    monkeypatch.setattr(cache, "get", evicted_meanwhile)
+    with cache.open(**REPORT) as pdf:
+        assert pdf.read(5) == b"%PDF-"
@@ -0,0 +1,29 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from report_search import ReportSearch, SqliteReportSearch, create_report_search
+
+
+def test_incomplete_backend_fails_when_instantiated():
+    class Incomplete(ReportSearch):
+        def create_schema(self, connection):
+            return False
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_sqlite_backend_finds_indexed_report():
+    engine = create_engine("sqlite://")
+    search = create_report_search(engine)
+    assert isinstance(search, SqliteReportSearch)
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE report (id INTEGER PRIMARY KEY, title TEXT, created_at DATETIME)"))
+        connection.execute(text("INSERT INTO report VALUES (1, 'Apache scan', '2024-01-01 10:00:00')"))
+        assert search.create_schema(connection)
+        search.index(connection, 1, 7, "Apache scan", "Path traversal in Apache 2.4.49 (CVE-2021-41773).")
+
+        results = search.search(connection, 7, "traversal")
+
+    assert [result["report_id"] for result in results] == [1]
+    assert "<mark>traversal</mark>" in results[0]["snippet"].lower()
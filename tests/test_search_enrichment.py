@@ -0,0 +1,45 @@
+import pytest
+
+from disk_cache import DiskCache
+from search_enrichment import SearchEnricher, SearchProvider, StubSearchProvider
+
+
+class FlakyProvider(SearchProvider):
+    """Returns nothing on the first call, then real results."""
+
+    name = "flaky"
+
+    def __init__(self):
+        self.calls = 0
+
+    def search(self, query, session, timeout):
+        self.calls += 1
+        return [] if self.calls == 1 else [f"Advisory for {query}"]
+
+
+def test_incomplete_provider_fails_when_instantiated():
+    class Incomplete(SearchProvider):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_empty_results_are_not_cached(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.db"), "search", ttl=3600, max_entries=10)
+    enricher = SearchEnricher(FlakyProvider(), cache=cache)
+
+    assert enricher.search("CVE-2021-41773") == []
+    assert enricher.search("CVE-2021-41773") == ["Advisory for cve-2021-41773"]
+    assert enricher.search("CVE-2021-41773") == ["Advisory for cve-2021-41773"]
+    assert enricher.provider.calls == 2
+
+
+def test_results_are_cached(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.db"), "search", ttl=3600, max_entries=10)
+    enricher = SearchEnricher(StubSearchProvider(), cache=cache)
+    first = enricher.search("apache 2.4.49 vulnerability")
+
+    enricher.provider = StubSearchProvider(results={"apache 2.4.49 vulnerability": []})
+
+    assert enricher.search("apache 2.4.49 vulnerability") == first
@@ -0,0 +1,157 @@
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from typing import Iterable, Optional, Tuple
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class UploadExpired(LookupError):
+    """Raised when a staged upload does not exist, has expired or belongs to another user."""
+
+
+class UploadStore:
+    """
+    Stage extracted upload text on disk under an opaque token, so it does not
+    have to round-trip through the browser before a report is generated.
+
+    Each upload is a text file plus a small JSON metadata file. Expired uploads
+    are removed by `cleanup`, which also runs periodically on `save`.
+    """
+
+    CLEANUP_INTERVAL = 300  # Seconds between opportunistic cleanups
+
+    def __init__(self, directory: str, ttl: float):
+        """
+        Args:
+            directory: Folder the staged uploads are written to.
+            ttl: Seconds a staged upload stays available.
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self._last_cleanup = 0.0
+        self._cleanup_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, token: str) -> Tuple[str, str]:
+        if not token or not all(char.isalnum() or char in "-_" for char in token):
+            raise UploadExpired("Invalid upload token.")
+        base = os.path.join(self.directory, token)
+        return base + ".txt", base + ".json"
+
+    def save(self, chunks: Iterable[str], user_id: int, filename: str) -> Tuple[str, int]:
+        """
+        Write text chunks to a new staged upload.
+
+        Returns:
+            Tuple[str, int]: The upload token and the number of characters stored.
+        """
+        self._maybe_cleanup()
+        token = secrets.token_urlsafe(24)
+        text_path, meta_path = self._paths(token)
+        size = 0
+        try:
+            with open(text_path, "w", encoding="utf-8") as staged:
+                for chunk in chunks:
+                    staged.write(chunk)
+                    size += len(chunk)
+        except Exception:
+            self._remove(token)
+            raise
+        with open(meta_path, "w", encoding="utf-8") as meta:
+            json.dump({"user_id": user_id, "filename": filename, "expires_at": time.time() + self.ttl}, meta)
+        return token, size
+
+    def _metadata(self, token: str, user_id: Optional[int]) -> dict:
+        _, meta_path = self._paths(token)
+        try:
+            with open(meta_path, encoding="utf-8") as meta:
+                metadata = json.load(meta)
+        except (OSError, ValueError):
+            raise UploadExpired("Upload not found or expired.")
+        if metadata["expires_at"] < time.time() or (user_id is not None and metadata["user_id"] != user_id):
+            raise UploadExpired("Upload not found or expired.")
+        return metadata
+
+    def read(self, token: str, user_id: Optional[int] = None) -> str:
+        """
+        Return the full staged text.
+
+        Raises:
+            UploadExpired: If the upload is missing, expired or owned by another user.
+        """
+        self._metadata(token, user_id)
+        text_path, _ = self._paths(token)
+        try:
+            with open(text_path, encoding="utf-8") as staged:
+                return staged.read()
+        except OSError:
+            raise UploadExpired("Upload not found or expired.")
+
+    def filename(self, token: str, user_id: Optional[int] = None) -> str:
+        """Return the file name the upload was staged under."""
+        return self._metadata(token, user_id)["filename"]
+
+    def preview(self, token: str, limit: int, user_id: Optional[int] = None) -> str:
+        """
+        Return at most the first `limit` characters of the staged text.
+        """
+        self._metadata(token, user_id)
+        text_path, _ = self._paths(token)
+        with open(text_path, encoding="utf-8") as staged:
+            return staged.read(limit)
+
+    def _remove(self, token: str):
+        for path in self._paths(token):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def cleanup(self) -> int:
+        """
+        Delete expired uploads.
+
+        Returns:
+            int: The number of uploads removed.
+        """
+        removed = 0
+        now = time.time()
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".txt") and not os.path.exists(path[:-len(".txt")] + ".json"):
+                # Left behind by an interrupted save
+                if os.path.getmtime(path) + self.ttl < now:
+                    os.remove(path)
+                continue
+            if not name.endswith(".json"):
+                continue
+            token = name[:-len(".json")]
+            try:
+                with open(os.path.join(self.directory, name), encoding="utf-8") as meta:
+                    expired = json.load(meta)["expires_at"] < now
+            except (OSError, ValueError, KeyError):
+                expired = True
+            if expired:
+                self._remove(token)
+                removed += 1
+        if removed:
+            logger.info(f"Removed {removed} expired staged uploads.")
+        return removed
+
+    def _maybe_cleanup(self):
+        now = time.time()
+        if now - self._last_cleanup < self.CLEANUP_INTERVAL or not self._cleanup_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_cleanup = now
+            self.cleanup()
+        except OSError as e:
+            logger.error(f"Staged upload cleanup failed: {str(e)}")
+        finally:
+            self._cleanup_lock.release()